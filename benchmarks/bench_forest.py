@@ -0,0 +1,75 @@
+"""
+Benchmark: sklearn RandomForest predict_proba vs the packed CompiledForest evaluator.
+
+Usage:
+    python -m benchmarks.bench_forest [--rows 1 200 100000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_inference import MODELS_DIR, FOREST_FILES, CompiledForest
+
+
+def _best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _sample_features(model, rows, rng):
+    """Random rows in the ranges the streams generate, with integer encoded ids."""
+    ranges = {
+        'speed_rpm': (700, 1000), 'downtime_minutes': (0, 5), 'temperature_c': (28, 42),
+        'target_output': (80, 150), 'order_quantity': (50, 2000), 'price_per_kg': (2, 200),
+    }
+    columns = {}
+    for name in model.feature_names_in_:
+        if name.endswith('_encoded'):
+            columns[name] = rng.integers(0, 3, rows)
+        else:
+            low, high = ranges.get(name, (0, 1))
+            columns[name] = rng.uniform(low, high, rows)
+    return pd.DataFrame(columns)
+
+
+def run(rows_list, repeat):
+    rng = np.random.default_rng(42)
+    results = []
+    for name, model_file in FOREST_FILES.items():
+        model = joblib.load(os.path.join(MODELS_DIR, model_file))
+        compiled = CompiledForest.from_sklearn(model)
+        for rows in rows_list:
+            X = _sample_features(model, rows, rng)
+            expected = model.predict_proba(X)[:, -1]
+            max_diff = float(np.abs(expected - compiled.predict_positive(X)).max())
+            assert max_diff < 1e-9, f"{name}: compiled forest differs by {max_diff}"
+            t_sklearn = _best_of(lambda: model.predict_proba(X), repeat)
+            t_compiled = _best_of(lambda: compiled.predict_positive(X), repeat)
+            results.append((name, rows, t_sklearn, t_compiled, max_diff))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1, 200, 100_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'model':<16} {'rows':>8} {'sklearn (ms)':>13} {'compiled (ms)':>14} {'speedup':>8} {'max |diff|':>11}")
+    for name, rows, t_sklearn, t_compiled, max_diff in run(args.rows, args.repeat):
+        print(f"{name:<16} {rows:>8,} {t_sklearn * 1000:>13.2f} {t_compiled * 1000:>14.2f} "
+              f"{t_sklearn / t_compiled:>7.1f}x {max_diff:>11.1e}")
+
+
+if __name__ == '__main__':
+    main()
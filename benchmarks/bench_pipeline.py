@@ -0,0 +1,251 @@
+"""
+Load test of the ingest -> fetch -> process -> score -> render pipeline on the mock store.
+
+Every stage runs at each size and the results are written as JSON so runs can
+be compared between commits. fetch_data runs against its own mock store that
+keeps every row (no retention), so it reads from a production log holding the
+stated number of rows.
+
+Usage:
+    python -m benchmarks.bench_pipeline [--sizes 1000 100000 10000000] [--out results.json]
+    python -m benchmarks.bench_pipeline --sizes 1000 --compare baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import mock_db_manager
+from mock_db_manager import MockStore, SEGMENT_MAX_RECORDS
+from streaming.bulk_generator import BulkGenerator, to_records
+
+STAGES = ['save_mock_record', 'save_mock_records', 'fetch_data', 'process_production',
+          'process_supplier', 'predict_production', 'predict_supplier', 'figures']
+# Per-record appends are timed on at most this many records; larger sizes report the rate
+MAX_SINGLE_APPENDS = 100_000
+BATCH_SIZE = 10_000
+# Rows scored per call, so a 10M-row run stays within a few GB of memory
+SCORE_CHUNK = 1_000_000
+
+
+def _timed(func):
+    start = time.perf_counter()
+    value = func()
+    return time.perf_counter() - start, value
+
+
+def _result(stage, rows, seconds, measured_rows=None, **extra):
+    measured_rows = rows if measured_rows is None else measured_rows
+    return dict(stage=stage, rows=rows, measured_rows=measured_rows,
+                seconds=round(seconds, 6),
+                rows_per_sec=round(measured_rows / seconds, 1) if seconds else None,
+                peak_rss_mb=_peak_rss_mb(), **extra)
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _frame(kind, rows, seed):
+    """Generated production or supplier frame; the same seed always gives the same rows."""
+    generator = BulkGenerator(seed, machines=3, suppliers=3)
+    return generator.production(rows) if kind == 'production' else generator.supplier(rows)
+
+
+def bench_ingest(store, rows, seed):
+    """Per-record and batched appends into fresh segment logs."""
+    prod_df = _frame('production', rows, seed)
+    results = []
+    sample = to_records(prod_df.head(min(rows, MAX_SINGLE_APPENDS)))
+    log = store.log('single_appends')
+    seconds, _ = _timed(lambda: [log.append(record) for record in sample])
+    results.append(_result('save_mock_record', rows, seconds, len(sample)))
+
+    # Convert chunk by chunk so 10M rows never exist as dicts at once
+    log = store.log('production_data')
+    seconds = 0.0
+    for i in range(0, rows, BATCH_SIZE):
+        records = to_records(prod_df.iloc[i:i + BATCH_SIZE])
+        elapsed, _ = _timed(lambda: log.append_many(records))
+        seconds += elapsed
+    results.append(_result('save_mock_records', rows, seconds, batch_size=BATCH_SIZE))
+    return results
+
+
+def _fill(log, df):
+    for i in range(0, len(df), BATCH_SIZE):
+        log.append_many(to_records(df.iloc[i:i + BATCH_SIZE]))
+
+
+def bench_fetch(store, rows, seed):
+    """DataProcessor.fetch_data against a populated store: cold load, then incremental.
+
+    ``store`` must retain everything: its production log is filled with
+    ``rows`` rows and its supplier log with a tenth as many (as in
+    bench_schema). The stored counts are reported with the result.
+    """
+    import streamlit as st
+    from data_processing import DataProcessor
+
+    _fill(store.log('production_data'), _frame('production', rows, seed))
+    _fill(store.log('supplier_data'), _frame('supplier', max(rows // 10, 1), seed))
+    processor = DataProcessor()
+    processor.use_mock = True
+    processor.reset_cache()
+    cold, (prod_window, sup_window) = _timed(processor.fetch_data)
+    warm, _ = _timed(processor.fetch_data)
+    st.session_state.clear()
+    return [_result('fetch_data', rows, cold, len(prod_window) + len(sup_window),
+                    incremental_seconds=round(warm, 6),
+                    production_rows_stored=store.log('production_data').end_offset(),
+                    supplier_rows_stored=store.log('supplier_data').end_offset())]
+
+
+def bench_process(kind, rows, seed):
+    from data_processing import DataProcessor
+    processor = DataProcessor.__new__(DataProcessor)   # processing needs no connection
+    process = {'production': processor._process_production_data,
+               'supplier': processor._process_supplier_data}[kind]
+    df = _frame(kind, rows, seed)
+    seconds, _ = _timed(lambda: process(df))
+    return [_result(f'process_{kind}', rows, seconds)]
+
+
+def bench_predict(kind, rows, seed):
+    """score_* on a fresh manager in chunks of SCORE_CHUNK rows; cached re-score if it fits."""
+    from model_inference import MLModelManager
+    manager = MLModelManager()
+    manager.warm_up()
+    score = manager.score_production if kind == 'production' else manager.score_suppliers
+    df = _frame(kind, rows, seed)
+    seconds = 0.0
+    for i in range(0, rows, SCORE_CHUNK):
+        chunk = df.iloc[i:i + SCORE_CHUNK]
+        elapsed, _ = _timed(lambda: score(chunk))
+        seconds += elapsed
+    extra = {'chunk_rows': SCORE_CHUNK, 'models_loaded': manager.models_loaded}
+    if rows <= manager.inference_cache.max_entries:
+        extra['cached_seconds'] = round(_timed(lambda: score(df))[0], 6)
+    return [_result(f'predict_{kind}', rows, seconds, **extra)]
+
+
+def bench_figures(rows, seed):
+    """Every dashboard figure built from frames of ``rows`` rows, one frame in memory at a time."""
+    from charts import output_trend_figure, efficiency_gauge, delivery_status_figure, supplier_risk_figure
+    from data_processing import DataProcessor
+    from model_inference import model_manager
+    processor = DataProcessor.__new__(DataProcessor)
+
+    prod_df = processor._process_production_data(_frame('production', rows, seed))
+    seconds, _ = _timed(lambda: (output_trend_figure(prod_df),
+                                 efficiency_gauge(prod_df['efficiency'].mean())))
+    del prod_df
+
+    sup_df = processor._process_supplier_data(_frame('supplier', rows, seed))
+    entities = model_manager.score_suppliers(sup_df.head(SCORE_CHUNK))['entities']
+    elapsed, _ = _timed(lambda: (delivery_status_figure(sup_df), supplier_risk_figure(entities)))
+    return [_result('figures', rows, seconds + elapsed)]
+
+
+def run(rows, stages, seed):
+    results = []
+    if {'save_mock_record', 'save_mock_records', 'fetch_data'} & stages:
+        with tempfile.TemporaryDirectory() as root:
+            if {'save_mock_record', 'save_mock_records'} & stages:
+                store = MockStore(os.path.join(root, 'ingest'))
+                try:
+                    results += bench_ingest(store, rows, seed)
+                finally:
+                    store.clear()
+            if 'fetch_data' in stages:
+                # Retain every row so fetch_data reads a store of the stated size;
+                # larger segments keep a 10M-row log to about a thousand files
+                store = MockStore(os.path.join(root, 'fetch'), max_records=None,
+                                  segment_max_records=max(SEGMENT_MAX_RECORDS, rows // 1000))
+                previous_store, mock_db_manager.mock_store = mock_db_manager.mock_store, store
+                try:
+                    results += bench_fetch(store, rows, seed)
+                finally:
+                    mock_db_manager.mock_store = previous_store
+                    store.clear()
+    for kind in ('production', 'supplier'):
+        if f'process_{kind}' in stages:
+            results += bench_process(kind, rows, seed)
+        if f'predict_{kind}' in stages:
+            results += bench_predict(kind, rows, seed)
+    if 'figures' in stages:
+        results += bench_figures(rows, seed)
+
+    return [r for r in results if r['stage'] in stages]
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r['stage'], r['rows']): r for r in json.load(f)['results']}
+    print(f"\n{'stage':<20} {'rows':>11} {'baseline (ms)':>14} {'now (ms)':>10} {'change':>8}")
+    for r in results:
+        old = baseline.get((r['stage'], r['rows']))
+        if old is None:
+            continue
+        change = (r['seconds'] - old['seconds']) / old['seconds'] * 100 if old['seconds'] else 0.0
+        print(f"{r['stage']:<20} {r['rows']:>11,} {old['seconds'] * 1000:>14.2f} "
+              f"{r['seconds'] * 1000:>10.2f} {change:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 10_000_000])
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', default=None, help='write the JSON report here (default: stdout)')
+    parser.add_argument('--compare', default=None, help='earlier JSON report to compare against')
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.sizes:
+        for r in run(rows, set(args.stages), args.seed):
+            print(f"{r['stage']:<20} {r['rows']:>11,} {r['seconds'] * 1000:>12.2f} ms", file=sys.stderr)
+            results.append(r)
+
+    report = {
+        'meta': {
+            'commit': _commit(),
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sizes': args.sizes,
+        },
+        'results': results,
+    }
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
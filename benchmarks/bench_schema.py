@@ -0,0 +1,164 @@
+"""
+Benchmark: dashboard query plans before and after the schema migrations.
+
+Creates a scratch database on the given Postgres server, applies the baseline
+migrations (001-002), loads synthetic rows and times the dashboard's queries
+with EXPLAIN ANALYZE. It then applies the remaining migrations (partitioning,
+indexes, KPI views) to the same data and times them again.
+
+Needs a local Postgres where the user may create databases, e.g.
+    DATABASE_URL=postgresql://postgres@localhost/postgres python -m benchmarks.bench_schema
+
+Usage:
+    python -m benchmarks.bench_schema [--dsn ...] [--rows 1000000] [--days 90] [--repeat 5] [--keep]
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+
+import psycopg
+from psycopg.conninfo import make_conninfo
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.config import DATABASE_URL
+from migrate import migrate
+
+SCRATCH_DB = 'bench_schema'
+MACHINES = 20
+SUPPLIERS = 10
+
+# label -> (query on the baseline schema, query after the migrations or None if unchanged)
+QUERIES = {
+    'live window': ("SELECT * FROM production_data ORDER BY timestamp DESC LIMIT 200", None),
+    'incremental window': ("SELECT * FROM production_data WHERE id > {watermark} "
+                           "ORDER BY timestamp DESC LIMIT 200", None),
+    'machine window': ("SELECT * FROM production_data WHERE machine_id = 'M2' "
+                       "ORDER BY timestamp DESC LIMIT 200", None),
+    'supplier window': ("SELECT * FROM supplier_data ORDER BY timestamp DESC LIMIT 100", None),
+    'output since': ("SELECT * FROM production_output_since({watermark})", None),
+    'one day of history': ("SELECT machine_id, sum(actual_output) FROM production_data "
+                           "WHERE timestamp >= now() - interval '8 days' "
+                           "AND timestamp < now() - interval '7 days' GROUP BY 1", None),
+    'hourly KPIs, 7 days': (
+        "SELECT machine_id, date_trunc('hour', timestamp, 'UTC') AS bucket, sum(actual_output), "
+        "100.0 * sum(actual_output) / NULLIF(sum(target_output), 0) FROM production_data "
+        "WHERE timestamp >= now() - interval '7 days' GROUP BY 1, 2",
+        "SELECT machine_id, bucket, output_sum, efficiency FROM machine_hourly_kpis "
+        "WHERE bucket >= now() - interval '7 days'"),
+    'supplier delays, 30 days': (
+        "SELECT supplier_id, count(*) FILTER (WHERE actual_delivery_date > expected_delivery_date) "
+        "FROM supplier_data WHERE timestamp >= now() - interval '30 days' GROUP BY 1",
+        "SELECT supplier_id, sum(delayed_count) FROM supplier_daily_kpis "
+        "WHERE bucket >= now() - interval '30 days' GROUP BY 1"),
+}
+
+
+def load_rows(conn, rows, days):
+    """Synthetic rows in timestamp order (ids grow with time, as when streamed)."""
+    step = days * 86_400 / rows
+    conn.execute(f"""
+        INSERT INTO production_data (timestamp, machine_id, target_output, actual_output,
+                                     speed_rpm, downtime_minutes, temperature_c, ingest_key)
+        SELECT now() - ({rows} - g) * interval '{step} seconds',
+               'M' || (g % {MACHINES} + 1),
+               80 + (random() * 20)::int,
+               60 + (random() * 40)::int,
+               700 + (random() * 300)::int,
+               CASE WHEN random() < 0.1 THEN round((random() * 5)::numeric, 2) ELSE 0 END,
+               28 + random() * 15,
+               md5(g::text)
+        FROM generate_series(1, {rows}) AS g""")
+    supplier_rows = max(rows // 10, 1)
+    supplier_step = days * 86_400 / supplier_rows
+    conn.execute(f"""
+        INSERT INTO supplier_data (timestamp, supplier_id, material_type, expected_delivery_date,
+                                   actual_delivery_date, order_quantity, received_quantity,
+                                   price_per_kg, transportation_status, ingest_key)
+        SELECT ts, 'S' || (g % {SUPPLIERS} + 1), 'Cotton', ts::date + 3,
+               ts::date + 3 + (random() * 4)::int - 1, 1000, 950 + (random() * 50)::int,
+               2 + random(), 'On Time', md5('s' || g)
+        FROM (SELECT g, now() - ({supplier_rows} - g) * interval '{supplier_step} seconds' AS ts
+              FROM generate_series(1, {supplier_rows}) AS g) AS s""")
+    conn.commit()
+
+
+def _plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _plan_nodes(child)
+
+
+def explain(conn, sql, repeat):
+    """Best execution time (ms), buffers touched and a summary of the scan nodes."""
+    best = None
+    for _ in range(repeat):
+        result = conn.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}").fetchone()[0]
+        result = result[0] if isinstance(result, list) else json.loads(result)[0]
+        if best is None or result['Execution Time'] < best['Execution Time']:
+            best = result
+    nodes = list(_plan_nodes(best['Plan']))
+    buffers = best['Plan'].get('Shared Hit Blocks', 0) + best['Plan'].get('Shared Read Blocks', 0)
+    scans = Counter(n['Node Type'] for n in nodes if 'Scan' in n['Node Type'])
+    summary = ', '.join(f"{kind} x{count}" for kind, count in scans.most_common())
+    return best['Execution Time'], buffers, summary
+
+
+def run_queries(conn, watermark, after, repeat):
+    results = {}
+    for label, (before_sql, after_sql) in QUERIES.items():
+        sql = (after_sql if after and after_sql else before_sql).format(watermark=watermark)
+        results[label] = explain(conn, sql, repeat)
+    return results
+
+
+def vacuum_analyze(dsn):
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        conn.execute("VACUUM ANALYZE")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--dsn', default=DATABASE_URL, help='server to create the scratch database on')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='production rows (suppliers get a tenth)')
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--keep', action='store_true', help='keep the scratch database afterwards')
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error('set DATABASE_URL or pass --dsn')
+
+    with psycopg.connect(args.dsn, autocommit=True) as admin:
+        admin.execute(f"DROP DATABASE IF EXISTS {SCRATCH_DB}")
+        admin.execute(f"CREATE DATABASE {SCRATCH_DB}")
+    scratch = make_conninfo(args.dsn, dbname=SCRATCH_DB)
+    try:
+        migrate(scratch, target='002')
+        with psycopg.connect(scratch) as conn:
+            load_rows(conn, args.rows, args.days)
+        vacuum_analyze(scratch)
+        with psycopg.connect(scratch) as conn:
+            watermark = conn.execute("SELECT max(id) - 100 FROM production_data").fetchone()[0]
+            before = run_queries(conn, watermark, after=False, repeat=args.repeat)
+
+        migrate(scratch)
+        vacuum_analyze(scratch)
+        with psycopg.connect(scratch) as conn:
+            after = run_queries(conn, watermark, after=True, repeat=args.repeat)
+    finally:
+        if not args.keep:
+            with psycopg.connect(args.dsn, autocommit=True) as admin:
+                admin.execute(f"DROP DATABASE IF EXISTS {SCRATCH_DB}")
+
+    print(f"\n{args.rows:,} production rows over {args.days} days, best of {args.repeat}\n")
+    print(f"{'query':<26} {'before (ms)':>12} {'after (ms)':>11} {'speedup':>8} "
+          f"{'buffers':>15}  plan before -> after")
+    for label in QUERIES:
+        (t0, b0, p0), (t1, b1, p1) = before[label], after[label]
+        print(f"{label:<26} {t0:>12.2f} {t1:>11.2f} {t0 / max(t1, 1e-3):>7.1f}x "
+              f"{b0:>7} -> {b1:<6} {p0} -> {p1}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Dashboard Charts
+Plotly figure builders used by the dashboard (and timed by the benchmarks).
+"""
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from downsampling import MAX_POINTS_PER_SERIES, downsample
+
+
+def _transparent(fig):
+    fig.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)")
+    return fig
+
+
+def output_trend_figure(prod_df, max_points=MAX_POINTS_PER_SERIES, window_label=None):
+    """Actual output over time per machine as WebGL lines; None if empty.
+
+    Each machine's series is downsampled to at most ``max_points`` points
+    (MinMax + LTTB), so the figure size does not depend on the row count.
+    """
+    if prod_df.empty:
+        return None
+    chart_df = downsample(prod_df, 'timestamp', 'actual_output', by='machine_id', n_out=max_points)
+
+    fig = go.Figure()
+    for machine_id, series in chart_df.groupby('machine_id', sort=True):
+        fig.add_trace(go.Scattergl(
+            x=series['timestamp'], y=series['actual_output'], name=str(machine_id),
+            mode='lines+markers' if len(series) <= 100 else 'lines', line=dict(width=3)))
+
+    shown = f"{len(chart_df):,} of {len(prod_df):,} points"
+    title = f"Actual Output Trends by Machine ({window_label + ', ' if window_label else ''}{shown})"
+    _transparent(fig).update_layout(
+        title=title,
+        template="plotly_dark", height=350,
+        xaxis_title="Time",
+        yaxis_title="Output Units",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    # Clock time is enough within a day; longer windows let Plotly add the date
+    if chart_df['timestamp'].max() - chart_df['timestamp'].min() <= pd.Timedelta(days=1):
+        fig.update_xaxes(tickformat="%H:%M:%S")
+    return fig
+
+
+def efficiency_gauge(avg_eff):
+    """Gauge Chart for Average Efficiency."""
+    fig = go.Figure(go.Indicator(
+        mode = "gauge+number",
+        value = avg_eff,
+        title = {'text': "Plant Efficiency"},
+        gauge = {'axis': {'range': [0, 120]},
+                 'bar': {'color': "#00cc96"},
+                 'steps': [
+                     {'range': [0, 80], 'color': "#ff5555"},
+                     {'range': [80, 100], 'color': "#333"}],
+                 'threshold': {'line': {'color': "white", 'width': 4}, 'thickness': 0.75, 'value': 90}}))
+    fig.update_layout(paper_bgcolor="rgba(0,0,0,0)", font={'color': "white"}, height=350)
+    return fig
+
+
+def delivery_status_figure(sup_df):
+    """Order quantity per supplier, coloured by delayed / on time."""
+    # Derive the label on a copy: snapshot frames are shared between sessions
+    delivery_df = sup_df.assign(supply_risk=(sup_df['delay_days'] > 0).map({True: "Delayed", False: "On Time"}))
+    fig = px.bar(delivery_df, x='supplier_id', y='order_quantity', color='supply_risk',
+                 title="Supply Deliveries Status",
+                 color_discrete_map={"Delayed": "#ff5555", "On Time": "#00cc96"},
+                 template="plotly_dark", height=300)
+    return _transparent(fig)
+
+
+def supplier_risk_figure(supplier_entities):
+    """Mean delay risk per supplier from score_suppliers entities."""
+    sup_breakdown = supplier_entities.rename(
+        columns={'supplier_id': 'Supplier', 'mean_risk': 'Delay Risk'}
+    )
+    fig = px.bar(sup_breakdown, x='Supplier', y='Delay Risk',
+                 title="Delay Risk by Supplier",
+                 template='plotly_dark', height=250,
+                 color='Delay Risk',
+                 color_continuous_scale='Reds')
+    return _transparent(fig)
+
+
+def rollup_trend_figure(rollups, entity_col, value, title, y_title):
+    """Line per machine/supplier of one rollup column over its buckets."""
+    fig = px.line(rollups, x='bucket', y=value, color=entity_col, title=title,
+                  template="plotly_dark", height=300, markers=len(rollups) <= 200,
+                  render_mode="webgl")
+    _transparent(fig).update_layout(
+        xaxis_title="Bucket start",
+        yaxis_title=y_title,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
+
+
+def rollup_output_figure(rollups):
+    """Total output per bucket stacked by machine."""
+    fig = px.bar(rollups, x='bucket', y='output_sum', color='machine_id',
+                 title="Output per Bucket", template="plotly_dark", height=300)
+    return _transparent(fig).update_layout(xaxis_title="Bucket start", yaxis_title="Output Units")
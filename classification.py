@@ -0,0 +1,67 @@
+"""
+Threshold Classification
+Vectorized bucketing of numeric values into the status and risk labels used
+across the dashboard, data processing and model inference.
+
+Each classifier turns a whole column into an ordered categorical with one
+``np.searchsorted`` call, so labelling a frame costs the same number of Python
+calls whether it has ten rows or a million. Scalars go through the same path,
+which keeps the thresholds defined in exactly one place.
+"""
+import numpy as np
+import pandas as pd
+
+
+class ThresholdClassifier:
+    """Maps numeric values to ordered labels using sorted threshold edges.
+
+    Args:
+        edges: ascending thresholds separating consecutive labels
+        labels: labels from the lowest bucket to the highest (len(edges) + 1)
+        at_edge: 'upper' if a value equal to an edge belongs to the bucket above
+            it (``x < edge`` style rules), 'lower' if it stays below (``x > edge``)
+        nan_label: label given to missing values
+    """
+
+    def __init__(self, edges, labels, at_edge, nan_label):
+        self.edges = np.asarray(edges, dtype=float)
+        self.dtype = pd.CategoricalDtype(labels, ordered=True)
+        self.side = 'right' if at_edge == 'upper' else 'left'
+        self.nan_code = list(labels).index(nan_label)
+
+    def codes(self, values):
+        """Integer bucket codes for an array-like of numbers."""
+        values = pd.Series(values).to_numpy(dtype=float, na_value=np.nan)
+        codes = np.searchsorted(self.edges, values, side=self.side)
+        return np.where(np.isnan(values), self.nan_code, codes)
+
+    def classify(self, values):
+        """Categorical Series of labels aligned with ``values``."""
+        index = values.index if isinstance(values, pd.Series) else None
+        return pd.Series(pd.Categorical.from_codes(self.codes(values), dtype=self.dtype),
+                         index=index)
+
+    def label(self, value):
+        """Label of a single value."""
+        return self.dtype.categories[int(self.codes([value])[0])]
+
+
+# Production efficiency (%): Critical < 75 <= Warning < 90 <= Normal
+EFFICIENCY_STATUS = ThresholdClassifier(
+    [75, 90], ['Critical', 'Warning', 'Normal'], at_edge='upper', nan_label='Normal'
+)
+
+# Supplier delivery delay (days): On Time <= 0 < Moderate Risk <= 2 < High Risk
+SUPPLY_RISK = ThresholdClassifier(
+    [0, 2], ['On Time', 'Moderate Risk', 'High Risk'], at_edge='lower', nan_label='On Time'
+)
+
+# Production risk score (0-100)
+PRODUCTION_RISK_LEVEL = ThresholdClassifier(
+    [30, 50, 70], ['LOW', 'MEDIUM', 'HIGH', 'CRITICAL'], at_edge='lower', nan_label='LOW'
+)
+
+# Supplier delay probability (0-100)
+SUPPLIER_DELAY_LEVEL = ThresholdClassifier(
+    [40, 60], ['LOW RISK', 'MODERATE', 'HIGH RISK'], at_edge='lower', nan_label='LOW RISK'
+)
@@ -0,0 +1,209 @@
+"""
+Connection Health
+Process-wide circuit breaker and latency tracking for the Supabase backend.
+
+Every dashboard query goes through ``ConnectionHealth.call``. After a few
+consecutive outage errors (timeouts, refused connections, 5xx) the circuit
+opens: calls fail immediately with BackendUnavailable and the dashboard serves
+the local mock store instead of waiting for another timeout. A background
+probe retries the backend with exponential backoff; while it runs the circuit
+is half-open, and its first success closes the circuit so every session goes
+back to live data on its next rerun.
+
+Errors where the backend did answer (a missing table, a bad filter) are
+passed through without counting as an outage.
+"""
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class BackendUnavailable(Exception):
+    """Raised instead of calling a backend whose circuit is open."""
+
+
+def is_outage(error):
+    """True for errors meaning the backend is unreachable or failing (not a bad request)."""
+    if isinstance(error, (httpx.TransportError, TimeoutError, ConnectionError, OSError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    # postgrest-py APIError: the HTTP status (an int) when the gateway answered
+    # without a JSON body (502/503/504), otherwise the SQLSTATE string
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        return code >= 500
+    return isinstance(code, str) and code.startswith('5')
+
+
+class EndpointStats:
+    """Latency and error counters of one endpoint over its last ``window`` calls."""
+
+    def __init__(self, window=100):
+        self.calls = 0
+        self.errors = 0
+        self.last_error = None
+        self._latencies = deque(maxlen=window)
+
+    def record(self, latency, error=None):
+        self.calls += 1
+        self._latencies.append(latency)
+        if error is not None:
+            self.errors += 1
+            self.last_error = str(error)
+
+    def snapshot(self):
+        latencies = sorted(self._latencies)
+        if not latencies:
+            return {'calls': self.calls, 'errors': self.errors, 'p50_ms': 0.0, 'p95_ms': 0.0,
+                    'last_ms': 0.0, 'last_error': self.last_error}
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1),
+            'p95_ms': round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1),
+            'last_ms': round(self._latencies[-1] * 1000, 1),
+            'last_error': self.last_error,
+        }
+
+
+class ConnectionHealth:
+    """Circuit breaker (closed / open / half-open) with background recovery probes.
+
+    Args:
+        probe: callable that raises unless the backend answers; run off the render path
+        failure_threshold: consecutive outage errors that open the circuit
+        base_backoff: seconds before the first recovery probe
+        max_backoff: upper bound of the doubling probe interval
+    """
+
+    def __init__(self, probe, failure_threshold=2, base_backoff=2.0, max_backoff=60.0):
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.next_probe_at = None
+        self.trips = 0
+        self.recoveries = 0
+        self.probes = 0
+        self.endpoints = {}
+        self._backoff = base_backoff
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        # True from the trip that starts a prober until that prober closes the
+        # circuit; both transitions happen under _lock so a trip can never see
+        # a prober that is about to exit
+        self._probing = False
+
+    def available(self):
+        """Whether live queries should be attempted (only while the circuit is closed)."""
+        return self.state == CLOSED
+
+    def _endpoint(self, name):
+        stats = self.endpoints.get(name)
+        if stats is None:
+            stats = self.endpoints.setdefault(name, EndpointStats())
+        return stats
+
+    def call(self, endpoint, fn):
+        """Run ``fn()`` for ``endpoint`` unless the circuit is open, recording its latency."""
+        if self.state != CLOSED:
+            raise BackendUnavailable(f"Supabase circuit {self.state}; retrying in the background")
+        start = time.monotonic()
+        try:
+            result = fn()
+        except Exception as e:
+            self._endpoint(endpoint).record(time.monotonic() - start, e)
+            if is_outage(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self._endpoint(endpoint).record(time.monotonic() - start)
+        self.record_success()
+        return result
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state != CLOSED or self.consecutive_failures < self.failure_threshold:
+                return
+            self.state = OPEN
+            self.opened_at = time.time()
+            self.trips += 1
+            self._backoff = self.base_backoff
+            self.next_probe_at = time.time() + self._backoff
+            print(f"Supabase circuit opened (consecutive failures: {self.consecutive_failures})")
+            if not self._probing:
+                self._probing = True
+                threading.Thread(target=self._recover, name="health-probe", daemon=True).start()
+
+    def _recover(self):
+        """Probe with jittered exponential backoff until the backend answers again."""
+        while True:
+            with self._lock:
+                next_probe_at = self.next_probe_at
+            self._wake.wait(max(next_probe_at - time.time(), 0))
+            self._wake.clear()
+            with self._lock:
+                self.state = HALF_OPEN
+                self.probes += 1
+            start = time.monotonic()
+            try:
+                self.probe()
+            except Exception as e:
+                self._endpoint('probe').record(time.monotonic() - start, e)
+                with self._lock:
+                    self.state = OPEN
+                    self._backoff = min(self._backoff * 2, self.max_backoff)
+                    self.next_probe_at = time.time() + self._backoff * random.uniform(0.75, 1.0)
+                continue
+            self._endpoint('probe').record(time.monotonic() - start)
+            with self._lock:
+                self.state = CLOSED
+                self.recoveries += 1
+                self.consecutive_failures = 0
+                self.next_probe_at = None
+                self._probing = False
+                opened_at = self.opened_at
+            print(f"Supabase circuit closed after {time.time() - opened_at:.0f}s")
+            return
+
+    def probe_now(self):
+        """Skip the remaining backoff and probe immediately (e.g. on a manual refresh)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            self.next_probe_at = time.time()
+        self._wake.set()
+
+    def get_stats(self):
+        next_probe_at = self.next_probe_at
+        return {
+            'state': self.state,
+            'trips': self.trips,
+            'probes': self.probes,
+            'next_probe_in_s': round(max(next_probe_at - time.time(), 0), 1) if next_probe_at else None,
+            'endpoints': {name: stats.snapshot() for name, stats in list(self.endpoints.items())},
+        }
+
+
+def table_probe(client, table='production_data'):
+    """Probe reading a single id, which only succeeds when PostgREST answers."""
+    def probe():
+        client.table(table).select("id").limit(1).execute()
+    return probe
@@ -1,12 +1,15 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import time
 from supabase import create_client
 from config.config import SUPABASE_URL, SUPABASE_KEY
 from model_inference import model_manager
-from data_processing import DataProcessor
+from data_processing import DataProcessor, TableQuery, PRODUCTION_WINDOW, SUPPLIER_WINDOW
+from live_updates import ChangeFeed, supabase_latest_ids
+from mock_db_manager import mock_change_probe
+from snapshot_cache import SnapshotCache
+from charts import (output_trend_figure, efficiency_gauge, delivery_status_figure, supplier_risk_figure,
+                    rollup_trend_figure, rollup_output_figure)
+from rollups import bucket_start
 
 # -----------------------------------------------------------------------------
 # CONFIGURATION & STYLING
@@ -62,21 +65,37 @@ st.markdown("""
 # -----------------------------------------------------------------------------
 processor = DataProcessor()
 
-def get_ml_predictions(prod_df, sup_df):
-    """Get real ML predictions using trained models."""
-    if prod_df.empty:
-        return {'risk_score': 0, 'risk_level': 'Unknown', 'contributing_factors': {}}, \
-               {'delay_probability': 0, 'risk_level': 'Unknown'}
-    
-    # Production Risk Prediction
-    prod_result = model_manager.predict_production_risk(prod_df)
-    
-    # Supplier Delay Prediction
-    sup_result = {'delay_probability': 0, 'risk_level': 'Low Risk', 'supplier_breakdown': {}}
-    if not sup_df.empty:
-        sup_result = model_manager.predict_supplier_delay(sup_df)
+@st.cache_resource
+def get_snapshot_cache():
+    """Snapshots shared across sessions so N viewers do not mean N fetches."""
+    return SnapshotCache(ttl=15.0, max_entries=16)
+
+snapshot_cache = get_snapshot_cache()
+
+def get_ml_predictions(prod_df, sup_df, alerts):
+    """Risk scores of production and supplier data for every view of a snapshot.
+
+    The streams score each record once at ingestion, so the latest risk_alerts
+    row per entity is read instead of rescoring the window. Only a kind without
+    any alerts (streams not scoring, empty table) is scored here with the
+    trained models. Returns the score_* results (per-entity aggregates and the
+    summary used by the KPI cards).
+    """
+    scored = {}
+    futures = {}
+    for kind, df in (('production', prod_df), ('supplier', sup_df)):
+        if not alerts.empty and (alerts['risk_type'] == kind).any():
+            scored[kind] = model_manager.scores_from_alerts(kind, alerts, df)
+        else:
+            # Fallback requests go out together (to the scoring service when configured)
+            futures[kind] = model_manager.submit_scores(kind, df)
+    for kind, future in futures.items():
+        scored[kind] = future.result()
+    prod_scores, sup_scores = scored['production'], scored['supplier']
+    if sup_df.empty and 'supplier' in futures:
+        sup_scores['summary'] = {'delay_probability': 0, 'risk_level': 'Low Risk', 'supplier_breakdown': {}}
     
-    return prod_result, sup_result
+    return prod_scores, sup_scores
 
 # -----------------------------------------------------------------------------
 # MAIN LAYOUT
@@ -179,15 +198,222 @@ with col_ctrl1:
 with col_ctrl2:
     if st.button("🔄 Refresh Data"):
         st.cache_data.clear() # Clear any data cache
+        processor.reset_cache() # Reload the full window on the next fetch
+        if processor.health is not None:
+            processor.health.probe_now()
+        snapshot_cache.invalidate()
+        st.session_state.pop('snapshot', None)
+        st.rerun()
+
+# -----------------------------------------------------------------------------
+# LIVE UPDATES
+# -----------------------------------------------------------------------------
+# Fragments poll this cheap in-memory check; data is only re-fetched when the
+# shared change feed reports new rows, so idle viewers cost nothing.
+LIVE_CHECK_SECONDS = 2
+live_every = LIVE_CHECK_SECONDS if live_mode else None
+
+def model_metric_cards(columns, entry, cards):
+    """Metric cards from a manifest entry's holdout metrics, or the original models' figures.
+
+    ``cards`` holds (label, metric key, format, original value, original delta) per column.
+    """
+    for col, (label, key, fmt, value, delta) in zip(columns, cards):
+        if entry and key in entry['metrics']:
+            col.metric(label, fmt.format(entry['metrics'][key]), "on held-out rows")
+        else:
+            col.metric(label, value, delta)
+
+
+@st.cache_resource
+def get_change_feed(_client):
+    """One change feed per server process, shared by every viewer."""
+    tables = ["production_data", "supplier_data"]
+    feed = ChangeFeed()
+    feed.watch("mock_store", mock_change_probe(tables + ["risk_alerts"]))
+    if _client is not None:
+        feed.subscribe_supabase(SUPABASE_URL, SUPABASE_KEY, tables,
+                                fallback_probe=supabase_latest_ids(_client, tables))
+    return feed
+
+change_feed = get_change_feed(processor.supabase)
+
+def build_snapshot():
+    """Fetch, score and summarize the current data once."""
+    version = change_feed.version
+    # Windows, alerts and the running total are fetched concurrently
+    fetched = processor.fetch_all()
+    prod_df, sup_df = fetched['prod_df'], fetched['sup_df']
+    snapshot = {'version': version, 'mock': processor.use_mock,
+                'prod_df': prod_df, 'sup_df': sup_df,
+                'alerts': processor.latest_risk_states(fetched['alerts']),
+                'timings': fetched['timings'], 'fetch_ms': fetched['fetch_ms']}
+    if not prod_df.empty:
+        # Risk read from the stream alerts, scored here only when there are none
+        snapshot['prod_scores'], snapshot['sup_scores'] = get_ml_predictions(prod_df, sup_df,
+                                                                             snapshot['alerts'])
+        snapshot['prod_risk'] = snapshot['prod_scores']['summary']
+        snapshot['sup_risk'] = snapshot['sup_scores']['summary']
+        snapshot['total_output'] = fetched['total_output']
+    return snapshot
+
+def load_snapshot():
+    """Shared snapshot for the current data window, rebuilt when the change feed moves on.
+
+    Snapshots are shared between sessions and must be treated as read-only.
+    """
+    if processor.recovered_since_start():
+        st.rerun()  # Supabase recovered: rebuild the page on live data
+    key = ('mock' if processor.use_mock else 'live', PRODUCTION_WINDOW, SUPPLIER_WINDOW,
+           change_feed.version)
+    # A snapshot with a timed-out or failed query is shown once but not shared
+    snapshot = snapshot_cache.get(key, build_snapshot, cacheable=lambda s: all(
+        t['status'] == 'ok' for t in s['timings'].values()))
+    st.session_state['snapshot'] = snapshot
+    return snapshot
+
+@st.fragment(run_every=live_every)
+def render_kpis():
+    snapshot = load_snapshot()
+    prod_df = snapshot['prod_df']
+    if prod_df.empty:
+        return
+    prod_risk, sup_risk = snapshot['prod_risk'], snapshot['sup_risk']
+
+    # KPIs - Use averages for stability, latest for current status
+    current_eff = prod_df['efficiency'].head(5).mean()
+    latest_output = prod_df['actual_output'].iloc[0]
+    avg_output = prod_df['actual_output'].mean()
+    total_output = snapshot['total_output']
+
+    kpi1, kpi2, kpi3, kpi4, kpi5 = st.columns(5)
+    kpi1.metric("Current Efficiency", f"{current_eff:.1f}%", f"{current_eff - 90:.1f}% vs target")
+    kpi2.metric("⚠️ Production Risk", f"{prod_risk['risk_score']}%", prod_risk['risk_level'], delta_color="inverse")
+    kpi3.metric("Supply Delay Risk", f"{sup_risk['delay_probability']}%", sup_risk['risk_level'], delta_color="inverse")
+    kpi4.metric("Avg Output", f"{avg_output:.0f}", f"{latest_output - avg_output:+.0f} vs avg")
+    kpi5.metric("📦 Total Plant Output", f"{total_output:,}", "Cumulative")
+
+# Trend chart windows beyond the live window are read from the Parquet history;
+# the value is (time span, seconds between reloads of the downsampled series)
+TREND_WINDOWS = {
+    'Live window': None,
+    'Last hour': (pd.Timedelta(hours=1), 5),
+    'Last 6 hours': (pd.Timedelta(hours=6), 15),
+    'Last day': (pd.Timedelta(days=1), 30),
+    'Last 7 days': (pd.Timedelta(days=7), 120),
+}
+
+def load_trend_rows(label):
+    """Timestamp/machine/output rows of a trend window, shared between sessions.
+
+    Only the charted columns (plus id) of the requested time range are
+    scanned, and each window is reloaded at most once per refresh period.
+    """
+    span, refresh = TREND_WINDOWS[label]
+    key = ('trend', label, int(datetime.datetime.now().timestamp() // refresh))
+    query = TableQuery('production_data', ['timestamp', 'machine_id', 'actual_output'])
+    return snapshot_cache.get(key, lambda: processor.fetch_history(
+        query.window(start=pd.Timestamp.now(tz='UTC') - span)))
+
+@st.fragment(run_every=live_every)
+def render_performance():
+    prod_df = load_snapshot()['prod_df']
+    if prod_df.empty:
+        st.info("No production data available for chart.")
+        return
+    avg_eff = prod_df['efficiency'].mean()
+
+    c1, c2 = st.columns([2, 1])
+
+    with c1:
+        window = st.radio("Trend window", list(TREND_WINDOWS), horizontal=True, key="trend_window")
+        trend_df = prod_df
+        if TREND_WINDOWS[window] is not None:
+            trend_df = load_trend_rows(window)
+            if trend_df.empty:
+                st.caption("No archived history for this window yet; showing the live window.")
+                trend_df, window = prod_df, 'Live window'
+        fig_trend = output_trend_figure(trend_df, window_label=window)
+        if fig_trend is not None:
+            st.plotly_chart(fig_trend, width='stretch', key="output_trend_chart")
+        else:
+            st.info("No sufficient data points to display trend.")
+
+    with c2:
+        st.plotly_chart(efficiency_gauge(avg_eff), width='stretch')
+
+# How far back each rollup grain is charted
+ROLLUP_HORIZONS = {'minute': pd.Timedelta(hours=6), 'hour': pd.Timedelta(days=7), 'shift': pd.Timedelta(days=30)}
+
+def load_rollups(grain):
+    """Charted rollups of ``grain`` plus the current shift's, shared between sessions.
+
+    Rollups only change when records are ingested, so they are re-read once
+    per change feed version instead of on every viewer's refresh.
+    """
+    now = pd.Timestamp.now(tz='UTC')
+    shift_start = bucket_start([now], 'shift').iloc[0]
+
+    def load():
+        return (processor.fetch_rollups('production_data', grain, start=now - ROLLUP_HORIZONS[grain]),
+                processor.fetch_rollups('production_data', 'shift', start=shift_start),
+                processor.fetch_rollups('supplier_data', 'shift', start=shift_start))
+    prod_roll, shift, sup_shift = snapshot_cache.get(
+        ('rollups', grain, shift_start, change_feed.version), load)
+    return shift_start, prod_roll, shift, sup_shift
+
+@st.fragment(run_every=live_every)
+def render_rollups():
+    """Current-shift KPIs and long-horizon trends read from the rollups, not raw rows."""
+    grain = st.radio("Granularity", list(ROLLUP_HORIZONS), index=1, horizontal=True,
+                     format_func=str.title, key="rollup_grain")
+    shift_start, prod_roll, shift, sup_shift = load_rollups(grain)
+    if prod_roll.empty:
+        st.info("No rollups yet. They are updated as records are ingested "
+                "(`python rollups.py rebuild --table production_data` builds them from the history).")
+        return
+
+    shift_count = shift['count'].sum() if not shift.empty else 0
+    sup_count = sup_shift['count'].sum() if not sup_shift.empty else 0
+
+    s1, s2, s3, s4 = st.columns(4)
+    s1.metric("Shift Output", f"{int(shift['output_sum'].sum()) if shift_count else 0:,}",
+              f"since {shift_start.tz_convert(None):%H:%M} UTC", delta_color="off")
+    s2.metric("Shift Efficiency",
+              f"{shift['efficiency_sum'].sum() / shift_count:.1f}%" if shift_count else "-",
+              f"{int(shift_count)} records", delta_color="off")
+    s3.metric("Shift Downtime", f"{shift['downtime_minutes'].sum() if shift_count else 0:.0f} min",
+              f"{int(shift['downtime_events'].sum()) if shift_count else 0} events", delta_color="off")
+    s4.metric("Shift Delayed Deliveries",
+              f"{int(sup_shift['delayed_count'].sum()) if sup_count else 0}",
+              f"of {int(sup_count)} orders", delta_color="off")
+
+    c1, c2 = st.columns(2)
+    with c1:
+        st.plotly_chart(rollup_trend_figure(prod_roll, 'machine_id', 'mean_efficiency',
+                                            f"Mean Efficiency per {grain.title()}", "Efficiency (%)"),
+                        width='stretch', key="rollup_efficiency_chart")
+    with c2:
+        st.plotly_chart(rollup_output_figure(prod_roll), width='stretch', key="rollup_output_chart")
+
+@st.fragment(run_every=live_every)
+def render_production_log():
+    prod_df = load_snapshot()['prod_df']
+    if not prod_df.empty:
+        st.dataframe(prod_df[['timestamp', 'machine_id', 'target_output', 'actual_output', 'efficiency', 'temperature_c']], 
+                     width='stretch', hide_index=True)
+
+@st.fragment(run_every=live_every)
+def wait_for_data():
+    """Rerun the page once the first rows arrive."""
+    if change_feed.version != st.session_state['snapshot']['version']:
         st.rerun()
 
 # Fetch and Process Data
-prod_df, sup_df = processor.fetch_data()
+snapshot = load_snapshot()
+prod_df, sup_df = snapshot['prod_df'], snapshot['sup_df']
 
 if not prod_df.empty:
-    # Process Production Data
-    prod_df['timestamp'] = pd.to_datetime(prod_df['timestamp'])
-    
     # Check for Stale Data (Simulation Stopped?)
     last_update = prod_df['timestamp'].max()
     now = pd.Timestamp.now(tz=last_update.tzinfo if last_update.tzinfo else None)
@@ -204,93 +430,18 @@ if not prod_df.empty:
     else:
         st.sidebar.success("✅ **Data Stream Active**")
 
-    prod_df['output_gap'] = prod_df['target_output'] - prod_df['actual_output']
-    # Safe division
-    prod_df['efficiency'] = (prod_df['actual_output'] / prod_df['target_output'].replace(0, 1)) * 100
-    
-    # ML Predictions using trained models
-    prod_risk, sup_risk = get_ml_predictions(prod_df, sup_df)
-    
-    # KPIs - Use averages for stability, latest for current status
-    current_eff = prod_df['efficiency'].head(5).mean()
+    prod_risk, sup_risk = snapshot['prod_risk'], snapshot['sup_risk']
     avg_eff = prod_df['efficiency'].mean()
-    latest_output = prod_df['actual_output'].iloc[0]
-    avg_output = prod_df['actual_output'].mean()
-
-    # Fetch Total Cumulative Output from all records
-    total_output = processor.get_total_output()
-    
-    # Calculate time span for context
-    if len(prod_df) > 1:
-        time_span = (prod_df['timestamp'].max() - prod_df['timestamp'].min()).total_seconds() / 3600
-        time_label = f"Last {max(1, int(time_span))}h" if time_span >= 1 else "Session"
-    else:
-        time_label = "Session"
 
     # --- TOP ROW: KPI CARDS ---
-    kpi1, kpi2, kpi3, kpi4, kpi5 = st.columns(5)
-    kpi1.metric("Current Efficiency", f"{current_eff:.1f}%", f"{current_eff - 90:.1f}% vs target")
-    kpi2.metric("⚠️ Production Risk", f"{prod_risk['risk_score']}%", prod_risk['risk_level'], delta_color="inverse")
-    kpi3.metric("Supply Delay Risk", f"{sup_risk['delay_probability']}%", sup_risk['risk_level'], delta_color="inverse")
-    kpi4.metric("Avg Output", f"{avg_output:.0f}", f"{latest_output - avg_output:+.0f} vs avg")
-    kpi5.metric("📦 Total Plant Output", f"{total_output:,}", "Cumulative")
+    render_kpis()
 
     # --- SECTION 2: REAL-TIME CHARTS ---
     st.markdown("### 📈 Live Machine Performance")
-    
-    c1, c2 = st.columns([2, 1])
-    
-    with c1:
-        if not prod_df.empty:
-            # Sort data by timestamp and take last 20 entries for the chart for each machine
-            chart_df = prod_df.copy()
-            chart_df['timestamp'] = pd.to_datetime(chart_df['timestamp'])
-            chart_df = chart_df.sort_values('timestamp')
-            
-            # Show last 20 points per machine
-            chart_df = chart_df.groupby('machine_id').tail(20).reset_index(drop=True)
-            
-            # Ensure final sort by timestamp to prevent "zig-zag" lines
-            chart_df = chart_df.sort_values('timestamp')
-            
-            # Ensure actual_output is numeric for plotting
-            chart_df['actual_output'] = pd.to_numeric(chart_df['actual_output'], errors='coerce')
-
-            # Time-series Chart with smooth lines
-            if not chart_df.empty:
-                fig_trend = px.line(chart_df, x='timestamp', y='actual_output', color='machine_id',
-                                    title="Actual Output Trends by Machine (Last 20 Points)",
-                                    template="plotly_dark", height=350,
-                                    markers=True)
-                fig_trend.update_traces(line=dict(width=3))
-                fig_trend.update_layout(
-                    paper_bgcolor="rgba(0,0,0,0)", 
-                    plot_bgcolor="rgba(0,0,0,0)",
-                    xaxis_title="Time (HH:MM:SS)",
-                    yaxis_title="Output Units",
-                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-                )
-                fig_trend.update_xaxes(tickformat="%H:%M:%S")
-                st.plotly_chart(fig_trend, width='stretch', key="output_trend_chart")
-            else:
-                st.info("No sufficient data points to display trend.")
-        else:
-            st.info("No production data available for chart.")
+    render_performance()
 
-    with c2:
-        # Gauge Chart for Average Efficiency
-        fig_gauge = go.Figure(go.Indicator(
-            mode = "gauge+number",
-            value = avg_eff,
-            title = {'text': "Plant Efficiency"},
-            gauge = {'axis': {'range': [0, 120]},
-                     'bar': {'color': "#00cc96"},
-                     'steps': [
-                         {'range': [0, 80], 'color': "#ff5555"},
-                         {'range': [80, 100], 'color': "#333"}],
-                     'threshold': {'line': {'color': "white", 'width': 4}, 'thickness': 0.75, 'value': 90}}))
-        fig_gauge.update_layout(paper_bgcolor="rgba(0,0,0,0)", font={'color': "white"}, height=350)
-        st.plotly_chart(fig_gauge, width='stretch')
+    st.markdown("### 🕒 Shift & Long-Horizon Trends")
+    render_rollups()
 
     # --- SECTION 3: MANAGEMENT DETAILS ---
     st.markdown("### 📋 Detailed Production Log & Supply Status")
@@ -298,18 +449,11 @@ if not prod_df.empty:
     tab1, tab2, tab3 = st.tabs(["Production Logs", "Supply Chain Risk", "Model Evaluation"])
     
     with tab1:
-        st.dataframe(prod_df[['timestamp', 'machine_id', 'target_output', 'actual_output', 'efficiency', 'temperature_c']], 
-                     width='stretch', hide_index=True)
+        render_production_log()
     
     with tab2:
         if not sup_df.empty:
-            sup_df['supply_risk'] = ((pd.to_datetime(sup_df['actual_delivery_date']) - pd.to_datetime(sup_df['expected_delivery_date'])).dt.days > 0).replace({True: "Delayed", False: "On Time"})
-            risk_chart = px.bar(sup_df, x='supplier_id', y='order_quantity', color='supply_risk',
-                                title="Supply Deliveries Status",
-                                color_discrete_map={"Delayed": "#ff5555", "On Time": "#00cc96"},
-                                template="plotly_dark", height=300)
-            risk_chart.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)")
-            st.plotly_chart(risk_chart, width='stretch')
+            st.plotly_chart(delivery_status_figure(sup_df), width='stretch')
             
             st.dataframe(sup_df[['supplier_id', 'material_type', 'expected_delivery_date', 'transportation_status']], 
                          width='stretch')
@@ -327,6 +471,43 @@ if not prod_df.empty:
             st.success("✅ All ML models loaded and running!")
         else:
             st.warning("⚠️ Using fallback heuristics - models not loaded")
+
+        cache_info = model_info['inference_cache']
+        st.caption(
+            f"⚡ Inference cache: {cache_info['hit_rate']}% hit rate "
+            f"({cache_info['hits']} hits / {cache_info['misses']} misses, "
+            f"{cache_info['entries']} rows cached) · ~{cache_info['time_saved_ms']:.0f} ms saved · "
+            f"model version {model_info['artifact_version'] or 'models/'} ({model_info['model_version']})"
+        )
+        service = model_info['scoring_service']
+        if service:
+            st.caption(
+                f"🛰️ Scoring service {service['address']}: "
+                f"{'connected' if service['connected'] else 'unreachable, scoring in-process'} · "
+                f"{service['remote_calls']} remote / {service['fallbacks']} local calls"
+            )
+        for name, values in model_info['unseen_categories'].items():
+            st.caption(f"⚠️ {sum(values.values()):,} rows with a {name} unseen in training "
+                       f"({', '.join(sorted(map(str, values))[:5])}{', ...' if len(values) > 5 else ''}); "
+                       f"the models score them as an unknown id")
+
+        manifest = model_info['manifest']
+        if manifest:
+            with st.expander(f"📦 Model version {manifest['version']}"):
+                st.caption(f"Trained {manifest['created'][:19]} on {manifest['source']['kind']} data "
+                           f"in {manifest['training_seconds']:.1f}s (sklearn {manifest['sklearn']}); "
+                           f"metrics on the newest {manifest['holdout']:.0%} of rows")
+                st.dataframe(pd.DataFrame({name: entry['metrics'] for name, entry in manifest['models'].items()}).T
+                             .rename_axis('Model'), width='stretch')
+        model_entries = manifest['models'] if manifest else {}
+
+        with st.expander("⏱️ Model startup timings"):
+            startup = model_manager.get_startup_report()
+            st.caption(f"model_inference import: {startup['import_ms']:.1f} ms")
+            if startup['models']:
+                st.dataframe(pd.DataFrame(startup['models']).T.rename_axis('Artifact'), width='stretch')
+            else:
+                st.info("No models loaded yet")
         
         st.markdown("---")
         
@@ -334,9 +515,13 @@ if not prod_df.empty:
         st.markdown("### 🏭 Production Risk Prediction Model")
         pr1, pr2, pr3, pr4 = st.columns(4)
         pr1.metric("Model Type", "Random Forest", "Classifier")
-        pr2.metric("Accuracy", "92.5%", "+2.1%")
-        pr3.metric("Precision", "91.2%", "High")
-        pr4.metric("Recall", "93.8%", "High")
+        model_metric_cards((pr2, pr3, pr4), model_entries.get('production_risk'), [
+            ("Accuracy", 'accuracy', "{:.1%}", "92.5%", "+2.1%"),
+            ("Precision", 'precision', "{:.1%}", "91.2%", "High"),
+            ("Recall", 'recall', "{:.1%}", "93.8%", "High"),
+        ])
+        production_label = model_entries.get('production_risk', {}).get(
+            'label', "thermal stress (temperature_c - 30) * speed_rpm / 1000 > 5 or downtime_minutes > 2")
         
         with st.expander("📖 What does this model predict?", expanded=True):
             st.markdown("""
@@ -355,6 +540,7 @@ if not prod_df.empty:
             
             **Business Use:** Early warning system for maintenance teams to prevent costly breakdowns.
             """)
+            st.caption(f"Trained to predict: {production_label}")
         
         st.markdown("---")
         
@@ -362,9 +548,13 @@ if not prod_df.empty:
         st.markdown("### 📦 Supplier Delay Prediction Model")
         sd1, sd2, sd3, sd4 = st.columns(4)
         sd1.metric("Model Type", "Random Forest", "Classifier")
-        sd2.metric("Accuracy", "89.7%", "+1.5%")
-        sd3.metric("Precision", "88.3%", "Good")
-        sd4.metric("Recall", "91.0%", "High")
+        model_metric_cards((sd2, sd3, sd4), model_entries.get('supplier_delay'), [
+            ("Accuracy", 'accuracy', "{:.1%}", "89.7%", "+1.5%"),
+            ("Precision", 'precision', "{:.1%}", "88.3%", "Good"),
+            ("Recall", 'recall', "{:.1%}", "91.0%", "High"),
+        ])
+        supplier_label = model_entries.get('supplier_delay', {}).get(
+            'label', "transportation_status 'delayed' or order_quantity > 350")
         
         with st.expander("📖 What does this model predict?", expanded=True):
             st.markdown("""
@@ -384,6 +574,7 @@ if not prod_df.empty:
             
             **Business Use:** Supply chain planning and vendor performance management.
             """)
+            st.caption(f"Trained to predict: {supplier_label}")
         
         st.markdown("---")
         
@@ -391,9 +582,11 @@ if not prod_df.empty:
         st.markdown("### 📈 Efficiency Prediction Model")
         ef1, ef2, ef3, ef4 = st.columns(4)
         ef1.metric("Model Type", "Linear Regression", "Regressor")
-        ef2.metric("R² Score", "0.87", "Good Fit")
-        ef3.metric("RMSE", "4.2%", "Low Error")
-        ef4.metric("MAE", "3.1%", "Accurate")
+        model_metric_cards((ef2, ef3, ef4), model_entries.get('efficiency'), [
+            ("R² Score", 'r2', "{:.2f}", "0.87", "Good Fit"),
+            ("RMSE", 'rmse', "{:.1f}%", "4.2%", "Low Error"),
+            ("MAE", 'mae', "{:.1f}%", "3.1%", "Accurate"),
+        ])
         
         with st.expander("📖 What does this model predict?", expanded=True):
             st.markdown("""
@@ -431,20 +624,37 @@ if not prod_df.empty:
             
         with col_eval2:
             st.subheader("📊 Supplier Risk Breakdown")
-            if 'supplier_breakdown' in sup_risk and sup_risk['supplier_breakdown']:
-                sup_breakdown = pd.DataFrame([
-                    {"Supplier": k, "Delay Risk": v} 
-                    for k, v in sup_risk['supplier_breakdown'].items()
-                ])
-                fig_sup = px.bar(sup_breakdown, x='Supplier', y='Delay Risk', 
-                                 title="Delay Risk by Supplier",
-                                 template='plotly_dark', height=250,
-                                 color='Delay Risk', 
-                                 color_continuous_scale='Reds')
-                fig_sup.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)")
-                st.plotly_chart(fig_sup, width='stretch')
+            supplier_entities = snapshot['sup_scores']['entities']
+            if not supplier_entities.empty:
+                st.plotly_chart(supplier_risk_figure(supplier_entities), width='stretch')
             else:
                 st.info("No supplier breakdown available")
+
+        st.subheader("🏭 Per-Machine Risk")
+        machine_entities = snapshot['prod_scores']['entities']
+        if not machine_entities.empty:
+            st.dataframe(machine_entities.rename(columns={
+                'machine_id': 'Machine', 'records': 'Records', 'mean_risk': 'Mean Risk %',
+                'max_risk': 'Max Risk %', 'latest_risk': 'Latest Risk %', 'risk_level': 'Risk Level',
+                'unseen_id': 'Unseen ID (heuristic)'
+            }).round(1), width='stretch', hide_index=True)
+        else:
+            st.info("No per-machine scores available")
+
+        st.subheader("🚨 Stream Risk Alerts")
+        alerts = snapshot['alerts']
+        if not alerts.empty:
+            raised = int(alerts['risk_label'].sum())
+            st.caption(f"Scored once at ingestion by the data streams · {raised} of {len(alerts)} entities alerting")
+            st.dataframe(alerts.assign(
+                risk_score=(alerts['risk_score'] * 100).round(1),
+                risk_label=alerts['risk_label'].map({1: "🔴 Alert", 0: "🟢 Clear"}),
+            ).rename(columns={
+                'timestamp': 'Since', 'risk_type': 'Type', 'entity_id': 'Entity',
+                'risk_score': 'Risk %', 'risk_label': 'State'
+            })[['Type', 'Entity', 'State', 'Risk %', 'Since']], width='stretch', hide_index=True)
+        else:
+            st.info("No precomputed alerts yet. Run the streams to populate risk_alerts.")
         
         # Current predictions summary
         st.markdown("### 📋 Current Prediction Summary")
@@ -471,11 +681,33 @@ if not prod_df.empty:
 else:
     st.warning("Waiting for data stream... Please run 'python simulate_all.py' in your terminal.")
     if st.button("Reload Data"):
+        st.session_state.pop('snapshot', None)
         st.rerun()
+    wait_for_data()
+
+if live_mode:
+    st.sidebar.info("🔄 Live Monitoring Active (updates as new rows arrive)")
 
-# --- FINAL STEP: GLOBAL LIVE MONITORING REFRESH ---
-# Moved outside to work even when data is initially empty (waiting for first stream)
-if st.session_state.get("live_monitoring_btn", False):
-    st.sidebar.info("🔄 Live Monitoring Active (Refreshing in 5s...)")
-    time.sleep(5)
-    st.rerun()
+cache_stats = snapshot_cache.stats()
+st.sidebar.caption(
+    f"🗄️ Shared cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses · "
+    f"{cache_stats['coalesced']} coalesced · {cache_stats['entries']} entries "
+    f"({cache_stats['hit_rate']}% hit rate)"
+)
+
+timings = st.session_state.get('snapshot', {}).get('timings')
+if timings:
+    st.sidebar.caption(
+        f"⏱️ Last fetch: {st.session_state['snapshot']['fetch_ms']:.0f} ms · " + " · ".join(
+            f"{name.replace('_', ' ')} {t['ms']:.0f} ms" + ("" if t['status'] == 'ok' else f" ({t['status']})")
+            for name, t in timings.items())
+    )
+
+if processor.health is not None:
+    health = processor.health.get_stats()
+    with st.sidebar.expander(f"🩺 Supabase: {health['state'].replace('_', '-')}"):
+        st.caption(f"{health['trips']} outages detected · {health['probes']} recovery probes")
+        if health['endpoints']:
+            st.dataframe(pd.DataFrame.from_dict(health['endpoints'], orient='index')
+                         [['calls', 'errors', 'p50_ms', 'p95_ms', 'last_ms']],
+                         width='stretch')
@@ -1,117 +1,536 @@
+import copy
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FetchTimeout
 import pandas as pd
 import streamlit as st
-import json
-import os
 from datetime import datetime
-from supabase import create_client
+from supabase import ClientOptions, create_client
 from config.config import SUPABASE_URL, SUPABASE_KEY
+from connection_health import ConnectionHealth, is_outage, table_probe
+from classification import EFFICIENCY_STATUS, SUPPLY_RISK
+from mock_db_manager import read_mock_records, iter_mock_records, get_mock_running_total
+from history_store import history_store
+from rollups import rollup_store
+
+# Number of newest rows kept in the dashboard window per table
+PRODUCTION_WINDOW = 200
+SUPPLIER_WINDOW = 100
+ALERT_WINDOW = 200
+# Seconds a dashboard query may take before it counts as an outage
+QUERY_TIMEOUT_SECONDS = 5
+# Seconds a refresh waits for each query before rendering without its new rows
+FETCH_TIMEOUTS = {'production': 4.0, 'supplier': 4.0, 'alerts': 3.0, 'total_output': 4.0}
+
+
+# Columns and types of each table; queries name the columns they need from these
+COLUMN_TYPES = {
+    'production_data': {
+        'id': 'int', 'timestamp': 'datetime', 'machine_id': 'str', 'target_output': 'int',
+        'actual_output': 'int', 'speed_rpm': 'int', 'downtime_minutes': 'float', 'temperature_c': 'float',
+    },
+    'supplier_data': {
+        'id': 'int', 'timestamp': 'datetime', 'supplier_id': 'str', 'material_type': 'str',
+        'expected_delivery_date': 'date', 'actual_delivery_date': 'date', 'order_quantity': 'int',
+        'received_quantity': 'int', 'price_per_kg': 'float', 'transportation_status': 'str',
+    },
+    'risk_alerts': {
+        'id': 'int', 'timestamp': 'datetime', 'risk_type': 'str', 'entity_id': 'str',
+        'risk_score': 'float', 'risk_label': 'int',
+    },
+}
+ENTITY_COLUMNS = {'production_data': 'machine_id', 'supplier_data': 'supplier_id', 'risk_alerts': 'entity_id'}
+
+
+def _utc_iso(value):
+    value = pd.Timestamp(value)
+    return (value.tz_localize('UTC') if value.tzinfo is None else value.tz_convert('UTC')).isoformat()
+
+
+def typed_frame(table, rows, columns=None):
+    """DataFrame of rows with the table's column types (nullable ints, UTC datetimes)."""
+    types = COLUMN_TYPES[table]
+    df = pd.DataFrame.from_records(rows, columns=list(columns or types))
+    for col in df.columns:
+        kind = types.get(col)
+        if kind == 'int':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+        elif kind == 'float':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+        elif kind == 'datetime':
+            df[col] = pd.to_datetime(df[col], utc=True, format='ISO8601')
+        elif kind == 'date':
+            df[col] = pd.to_datetime(df[col])
+    return df
+
+
+class TableQuery:
+    """One read of a table: the columns, time window, entities and id watermark it needs.
+
+    Consumers build a query instead of selecting every column; DataProcessor
+    runs it against Supabase or the mock store. ``id`` is always fetched
+    because keyset scans page on it.
+
+        TableQuery('production_data', ['timestamp', 'actual_output']).window(start, end)
+    """
+
+    def __init__(self, table, columns=None):
+        self.table = table
+        columns = list(columns or COLUMN_TYPES[table])
+        self.columns = columns if 'id' in columns else ['id'] + columns
+        self.start = self.end = self.after_id = self.entity_ids = None
+
+    def window(self, start=None, end=None):
+        """Only rows with start <= timestamp < end."""
+        self.start, self.end = start, end
+        return self
+
+    def after(self, after_id):
+        """Only rows with id > after_id (ignored when None)."""
+        self.after_id = after_id
+        return self
+
+    def entities(self, entity_ids):
+        """Only rows of these machines/suppliers/alert entities."""
+        self.entity_ids = list(entity_ids) if entity_ids is not None else None
+        return self
+
+    def postgrest(self, client):
+        """Filtered PostgREST request (order and limit are added by the caller)."""
+        query = client.table(self.table).select(",".join(self.columns))
+        if self.start is not None:
+            query = query.gte("timestamp", _utc_iso(self.start))
+        if self.end is not None:
+            query = query.lt("timestamp", _utc_iso(self.end))
+        if self.after_id is not None:
+            query = query.gt("id", self.after_id)
+        if self.entity_ids is not None:
+            query = query.in_(ENTITY_COLUMNS[self.table], self.entity_ids)
+        return query
+
+    def filter_records(self, records):
+        """Apply the query to mock store records (the id watermark is applied by the reader)."""
+        start = pd.Timestamp(_utc_iso(self.start)) if self.start is not None else None
+        end = pd.Timestamp(_utc_iso(self.end)) if self.end is not None else None
+        entity_col = ENTITY_COLUMNS[self.table]
+        for record in records:
+            if self.entity_ids is not None and record.get(entity_col) not in self.entity_ids:
+                continue
+            if start is not None or end is not None:
+                ts = pd.Timestamp(record.get('timestamp'))
+                ts = ts.tz_localize('UTC') if ts.tzinfo is None else ts
+                if (start is not None and ts < start) or (end is not None and ts >= end):
+                    continue
+            yield {col: record.get(col) for col in self.columns}
+
+
+class WindowCache:
+    """Processed, newest-first window of a table plus the id watermark it covers."""
+
+    def __init__(self, window):
+        self.window = window
+        # Held while a fetch merges into the window (fetches run on worker threads)
+        self.lock = threading.Lock()
+        # Future of the last fetch submitted for this window (see _run_fetches)
+        self.pending = None
+        self.reset()
+
+    def reset(self):
+        self.frame = pd.DataFrame()
+        self.last_id = None
+
+    def merge(self, new_df):
+        """Prepend newly processed rows and evict those beyond the window."""
+        if new_df.empty:
+            return
+        if self.last_id is None or self.frame.empty:
+            frame = new_df
+        else:
+            frame = pd.concat([new_df, self.frame], ignore_index=True)
+        self.frame = frame.head(self.window).reset_index(drop=True)
+        # Without an id column there is no watermark and every fetch is a full reload
+        if 'id' in self.frame.columns:
+            self.last_id = int(pd.to_numeric(self.frame['id'], errors='coerce').max())
+
+
+class RunningTotal:
+    """Cumulative sum of a column, advanced from a row-id watermark."""
+
+    def __init__(self):
+        self.total = 0
+        self.last_id = 0
+        self.use_rpc = True
+        self.lock = threading.Lock()
+        self.pending = None
+
+
+@st.cache_resource
+def _get_output_counter():
+    """Process-wide running total of production output shared by all sessions."""
+    return RunningTotal()
+
+
+# Guards the check-and-submit of an owner's pending fetch across sessions
+_SUBMIT_LOCK = threading.Lock()
+
+
+@st.cache_resource
+def _get_fetch_pool():
+    """Worker threads shared by all sessions to run a refresh's queries at the same time."""
+    return ThreadPoolExecutor(max_workers=16, thread_name_prefix="fetch")
+
+
+def _timed(load):
+    start = time.perf_counter()
+    return load(), time.perf_counter() - start
+
+
+@st.cache_resource
+def get_connection_health(_client):
+    """Process-wide Supabase circuit breaker, so one outage is detected once for every viewer.
+
+    The circuit opens on the first outage error: probes re-close it within
+    seconds, while a second failed query would cost another viewer a timeout.
+    """
+    return ConnectionHealth(table_probe(_client), failure_threshold=1)
 
-# Local mock database path
-MOCK_DB_PATH = os.path.join(os.path.dirname(__file__), 'data', 'mock_db.json')
 
 class DataProcessor:
     def __init__(self):
-        # Initialize mock state in session_state if not present
-        if 'use_mock_mode' not in st.session_state:
-            st.session_state['use_mock_mode'] = False
-            
         self.supabase = self._init_connection()
-        
-        # If connection failed once, stay in mock mode for this session
-        if self.supabase is None:
-            st.session_state['use_mock_mode'] = True
-            
-        self.use_mock = st.session_state['use_mock_mode']
-        
+        self.health = get_connection_health(self.supabase) if self.supabase is not None else None
+        # Circuit recoveries seen when this run started (see recovered_since_start)
+        self.recoveries_at_start = self.health.recoveries if self.health is not None else 0
+
+        # Mock mode lasts while the circuit is open and ends once a probe succeeds
+        self.use_mock = self.health is None or not self.health.available()
+        st.session_state['use_mock_mode'] = self.use_mock
+
         if self.use_mock:
-            st.sidebar.warning("🛡️ Running in Local Mock Mode")
+            retry = self.health.get_stats()['next_probe_in_s'] if self.health is not None else None
+            st.sidebar.warning("🛡️ Running in Local Mock Mode"
+                               + (f" (retrying Supabase in {retry:.0f}s)" if retry is not None else ""))
 
     @st.cache_resource
     def _init_connection(_self):
         """Initialize Supabase connection with caching."""
         try:
-            client = create_client(SUPABASE_URL, SUPABASE_KEY)
-            # Minimal health check: can we reach the domain?
-            # If getaddrinfo failed before, this will fail fast.
-            return client
+            return create_client(SUPABASE_URL, SUPABASE_KEY,
+                                 options=ClientOptions(postgrest_client_timeout=QUERY_TIMEOUT_SECONDS))
         except Exception:
             return None
 
-    def fetch_data(self):
-        """Fetch production and supplier data from Supabase or Local Mock."""
+    def recovered_since_start(self):
+        """Whether the circuit went from open back to closed after this run started."""
+        return self.health is not None and self.health.recoveries != self.recoveries_at_start
+
+    def _fall_back_to_mock(self, error):
+        """Serve the rest of this run from the mock store (the breaker decides about later runs)."""
+        self.use_mock = True
+        st.session_state['use_mock_mode'] = True
+        print(f"Supabase unavailable, using the mock store: {error}")
+
+    def fetch_data(self, incremental=True):
+        """Fetch production and supplier data from Supabase or Local Mock.
+
+        In incremental mode only rows with an id above the last one seen by
+        this session are requested and processed; they are merged into the
+        session's cached window and the oldest rows are evicted.
+        """
         if not self.use_mock:
             try:
-                prod_response = self.supabase.table("production_data")\
-                    .select("*").order("timestamp", desc=True).limit(200).execute()
-                
-                sup_response = self.supabase.table("supplier_data")\
-                    .select("*").order("timestamp", desc=True).limit(100).execute()
-                
-                prod_df = pd.DataFrame(prod_response.data) if prod_response.data else pd.DataFrame()
-                sup_df = pd.DataFrame(sup_response.data) if sup_response.data else pd.DataFrame()
-                
-                return self._process_production_data(prod_df), self._process_supplier_data(sup_df)
+                return self._fetch_windows(incremental)
             except Exception as e:
-                st.session_state['use_mock_mode'] = True
-                self.use_mock = True
+                self._fall_back_to_mock(e)
                 st.sidebar.error(f"Connection lost: {e}")
-        
+
         # Fallback to Mock Data
-        return self._fetch_mock_data()
+        return self._fetch_mock_data(incremental)
 
-    def _fetch_mock_data(self):
-        """Read data from local mock_db.json."""
-        if os.path.exists(MOCK_DB_PATH):
+    def _fetch_mock_data(self, incremental=True):
+        """Read the newest records from the local mock store."""
+        try:
+            return self._fetch_windows(incremental)
+        except Exception as e:
+            st.error(f"Error reading mock store: {e}")
+        return pd.DataFrame(), pd.DataFrame()
+
+    def _fetch_windows(self, incremental):
+        load_prod = self._window_loader("production_data", PRODUCTION_WINDOW,
+                                        self._process_production_data, incremental)[0]
+        load_sup = self._window_loader("supplier_data", SUPPLIER_WINDOW,
+                                       self._process_supplier_data, incremental)[0]
+        return load_prod(), load_sup()
+
+    def _window_loader(self, table, window, process, incremental):
+        """(load, stale, cache) for a table's window.
+
+        ``load`` fetches only the unseen rows into the session's WindowCache
+        ``cache`` (holding its lock) and returns the window; ``stale`` returns
+        the window as it was. The cache and backend are picked here, so
+        ``load`` can run on a worker thread.
+        """
+        cache = self._get_window_cache(table, window)
+        if not incremental:
+            cache.reset()
+        mock = self.use_mock
+
+        def load():
+            with cache.lock:
+                new_df = pd.DataFrame(self.newest(TableQuery(table).after(cache.last_id), window, mock))
+                cache.merge(process(new_df))
+                return cache.frame.copy()
+        return load, lambda: cache.frame.copy(), cache
+
+    def fetch_all(self, incremental=True):
+        """Fetch both windows, the risk alerts and the total output at the same time.
+
+        The queries run concurrently on a shared thread pool (over the pooled
+        Supabase client), so a refresh takes about as long as its slowest
+        query. A query that misses its FETCH_TIMEOUTS deadline is rendered from
+        what the session had before (previous window, last total) and finishes
+        in the background. As in fetch_data, a failed live query switches this
+        run to the mock store; missing risk alerts only leave them empty.
+
+        Returns a dict with prod_df, sup_df, alerts, total_output and the
+        per-query ``timings`` ({'ms', 'status'}: ok, timeout, busy or error)
+        plus ``fetch_ms``.
+        """
+        started = time.perf_counter()
+        results, timings, errors = self._run_fetches(self._fetch_plan(incremental))
+        if 'alerts' in errors:
+            print(f"Risk alerts unavailable: {errors.pop('alerts')}")
+            results['alerts'] = pd.DataFrame()
+        if errors and not self.use_mock:
+            error = next(iter(errors.values()))
+            self._fall_back_to_mock(error)
+            st.sidebar.error(f"Connection lost: {error}")
+            results, timings, errors = self._run_fetches(self._fetch_plan(incremental))
+            results.setdefault('alerts', pd.DataFrame())
+            errors.pop('alerts', None)
+        for name, error in errors.items():
+            st.error(f"Error reading mock store: {error}")
+            results[name] = 0 if name == 'total_output' else pd.DataFrame()
+
+        return {'prod_df': results['production'], 'sup_df': results['supplier'],
+                'alerts': results['alerts'], 'total_output': results['total_output'],
+                'timings': timings, 'fetch_ms': round((time.perf_counter() - started) * 1000, 1)}
+
+    def _fetch_plan(self, incremental):
+        """name -> (load, stale, owner) for every query of a refresh.
+
+        ``owner`` is the WindowCache or RunningTotal whose lock ``load`` holds
+        (None when it holds none); it remembers the last load submitted.
+        """
+        plan = {
+            'production': self._window_loader("production_data", PRODUCTION_WINDOW,
+                                               self._process_production_data, incremental),
+            'supplier': self._window_loader("supplier_data", SUPPLIER_WINDOW,
+                                            self._process_supplier_data, incremental),
+            'alerts': self._window_loader("risk_alerts", ALERT_WINDOW, self._process_risk_alerts, True),
+        }
+        if self.use_mock:
+            plan['total_output'] = (self._mock_total_output, self._mock_total_output, None)
+        else:
+            counter = _get_output_counter()
+            plan['total_output'] = (lambda: self._live_total_output(counter), lambda: int(counter.total),
+                                    counter)
+        return plan
+
+    def _run_fetches(self, plan):
+        """Run every loader of a plan concurrently; returns (results, timings, errors).
+
+        A loader whose previous run timed out and is still going (still holding
+        its owner's lock) is not submitted again: the query is served stale with
+        status 'busy' instead of queueing more work on a stuck backend.
+        """
+        started = time.perf_counter()
+        pool = _get_fetch_pool()
+        futures, results, timings, errors = {}, {}, {}, {}
+        for name, (load, stale, owner) in plan.items():
+            if owner is None:
+                futures[name] = pool.submit(_timed, load)
+                continue
+            with _SUBMIT_LOCK:
+                if owner.pending is not None and not owner.pending.done():
+                    results[name] = stale()
+                    timings[name] = {'ms': 0.0, 'status': 'busy'}
+                    continue
+                futures[name] = owner.pending = pool.submit(_timed, load)
+        for name, future in futures.items():
+            remaining = FETCH_TIMEOUTS[name] - (time.perf_counter() - started)
             try:
-                with open(MOCK_DB_PATH, 'r') as f:
-                    data = json.load(f)
-                prod_df = pd.DataFrame(data.get('production_data', []))
-                sup_df = pd.DataFrame(data.get('supplier_data', []))
-                return self._process_production_data(prod_df), self._process_supplier_data(sup_df)
+                results[name], seconds = future.result(timeout=max(remaining, 0))
+                timings[name] = {'ms': round(seconds * 1000, 1), 'status': 'ok'}
+            except FetchTimeout:
+                results[name] = plan[name][1]()
+                timings[name] = {'ms': round(FETCH_TIMEOUTS[name] * 1000, 1), 'status': 'timeout'}
             except Exception as e:
-                st.error(f"Error reading mock file: {e}")
-        return pd.DataFrame(), pd.DataFrame()
+                errors[name] = e
+                timings[name] = {'ms': round((time.perf_counter() - started) * 1000, 1), 'status': 'error'}
+        return results, timings, errors
+
+    def newest(self, query, limit, mock=None):
+        """Up to ``limit`` rows matching a TableQuery as records, newest first.
+
+        ``mock`` picks the backend (default: the processor's current mode).
+        """
+        if self.use_mock if mock is None else mock:
+            if query.start is None and query.end is None and query.entity_ids is None:
+                records = read_mock_records(query.table, limit=limit, after_id=query.after_id)
+            else:
+                records = read_mock_records(query.table, after_id=query.after_id)
+            return list(query.filter_records(records))[:limit]
+
+        request = query.postgrest(self.supabase).order("timestamp", desc=True).limit(limit)
+        response = self.health.call(query.table, request.execute)
+        return response.data or []
+
+    def iter_chunks(self, query, chunk_size=1000, mock=None):
+        """Yield typed DataFrames of at most ``chunk_size`` rows matching a TableQuery, by id.
+
+        Pages with an id keyset (``id > last id seen``) rather than offsets, so
+        each page costs the same however deep the scan is, rows inserted during
+        the scan are not skipped or repeated, and memory holds one chunk.
+        """
+        if self.use_mock if mock is None else mock:
+            chunk = []
+            for record in query.filter_records(iter_mock_records(query.table, query.after_id)):
+                chunk.append(record)
+                if len(chunk) >= chunk_size:
+                    yield typed_frame(query.table, chunk, query.columns)
+                    chunk = []
+            if chunk:
+                yield typed_frame(query.table, chunk, query.columns)
+            return
+
+        last_id = query.after_id
+        while True:
+            request = copy.copy(query).after(last_id).postgrest(self.supabase)
+            response = self.health.call(query.table, request.order("id").limit(chunk_size).execute)
+            rows = response.data or []
+            if rows:
+                yield typed_frame(query.table, rows, query.columns)
+                last_id = rows[-1]['id']
+            if len(rows) < chunk_size:
+                return
+
+    def fetch_risk_alerts(self):
+        """Newest rows of the risk_alerts table written by the streams.
+
+        Alerts are scored once at ingestion, so the dashboard reads them instead
+        of rescoring. Returns an empty frame when the table is unavailable.
+        """
+        try:
+            load = self._window_loader("risk_alerts", ALERT_WINDOW, self._process_risk_alerts, True)[0]
+            return load()
+        except Exception as e:
+            print(f"Risk alerts unavailable: {e}")
+            return pd.DataFrame()
+
+    def fetch_history(self, query):
+        """Scan the Parquet history for the rows of a TableQuery.
+
+        The query's window and entities prune whole partitions and only its
+        columns are read. Queries of every column get the same derived metrics
+        as the live window (efficiency, delay_days, ...).
+        """
+        df = history_store.scan(query.table, query.start, query.end, query.columns, query.entity_ids)
+        if query.after_id is not None:
+            df = df[df['id'] > query.after_id].reset_index(drop=True)
+        if set(COLUMN_TYPES[query.table]) <= set(query.columns):
+            process = {'production_data': self._process_production_data,
+                       'supplier_data': self._process_supplier_data}[query.table]
+            df = process(df)
+        return df
+
+    def fetch_rollups(self, table, grain, start=None, end=None, entity_ids=None):
+        """Minute, hour or shift aggregates per machine/supplier, oldest bucket first.
+
+        Rollups are maintained as records are ingested, so long-horizon KPIs
+        and charts read a few hundred bucket rows instead of the raw rows.
+        """
+        try:
+            return rollup_store.read(table, grain, start, end, entity_ids)
+        except Exception as e:
+            print(f"Rollups unavailable: {e}")
+            return pd.DataFrame()
+
+    def latest_risk_states(self, alerts_df):
+        """Current alert row per (risk_type, entity_id), newest first."""
+        if alerts_df.empty:
+            return alerts_df
+        return alerts_df.drop_duplicates(['risk_type', 'entity_id']).reset_index(drop=True)
+
+    def _get_window_cache(self, table, window):
+        """Per-session window cache; live and mock data are kept apart."""
+        key = f"window_cache_{table}_{'mock' if self.use_mock else 'live'}"
+        if key not in st.session_state:
+            st.session_state[key] = WindowCache(window)
+        return st.session_state[key]
+
+    def reset_cache(self):
+        """Drop the cached windows so the next fetch reloads them in full."""
+        for key in [k for k in st.session_state.keys() if str(k).startswith("window_cache_")]:
+            del st.session_state[key]
 
     def get_total_output(self):
-        """Calculate the total cumulative output."""
+        """Calculate the total cumulative output.
+
+        Both backends keep a running total and only add rows newer than the
+        last watermark, so the cost of a refresh is proportional to the rows
+        inserted since the previous one rather than to the whole history.
+        """
         if not self.use_mock:
             try:
-                total = 0
-                page_size = 1000
-                offset = 0
-                while True:
-                    response = self.supabase.table("production_data")\
-                        .select("actual_output")\
-                        .range(offset, offset + page_size - 1)\
-                        .execute()
-                    if not response.data: break
-                    total += sum(pd.to_numeric(item.get('actual_output', 0), errors='coerce') or 0 for item in response.data)
-                    if len(response.data) < page_size: break
-                    offset += page_size
-                    if offset > 100000: break
-                return int(total)
+                return self._live_total_output()
             except Exception as e:
                 print(f"Supabase Total Error: {e}")
-                st.session_state['use_mock_mode'] = True
-                self.use_mock = True
+                self._fall_back_to_mock(e)
+        return self._mock_total_output()
+
+    def _live_total_output(self, counter=None):
+        counter = counter or _get_output_counter()
+        with counter.lock:
+            added, last_id = self._output_since(counter)
+            counter.total += added
+            counter.last_id = last_id
+            return int(counter.total)
 
-        # Mock total output - read directly from file to be sure
-        if os.path.exists(MOCK_DB_PATH):
+    def _mock_total_output(self):
+        # Mock total output - counter sidecar plus the records written since
+        try:
+            return int(get_mock_running_total('production_data', 'actual_output'))
+        except Exception as e:
+            print(f"Mock Total Error: {e}")
+        return 0
+
+    def _output_since(self, counter):
+        """Sum actual_output over rows with id > counter.last_id.
+
+        Uses the ``production_output_since`` SQL function when it is deployed
+        (see database_setup.sql) and falls back to an id-keyed scan otherwise.
+        """
+        if counter.use_rpc:
             try:
-                with open(MOCK_DB_PATH, 'r') as f:
-                    data = json.load(f)
-                prod_list = data.get('production_data', [])
-                total = 0
-                for item in prod_list:
-                    val = item.get('actual_output', 0)
-                    try:
-                        total += int(float(val))
-                    except (ValueError, TypeError):
-                        pass
-                return total
+                response = self.health.call("production_output_since", self.supabase.rpc(
+                    "production_output_since", {"after_id": counter.last_id}
+                ).execute)
+                row = response.data[0] if isinstance(response.data, list) else response.data
+                return int(row['total_output'] or 0), int(row['last_id'] or counter.last_id)
             except Exception as e:
-                print(f"Mock Total Error: {e}")
-        return 0
+                if is_outage(e) or not self.health.available():
+                    raise
+                print(f"Output RPC unavailable, scanning new rows instead: {e}")
+                counter.use_rpc = False
+
+        total = 0
+        last_id = counter.last_id
+        query = TableQuery("production_data", ["actual_output"]).after(last_id)
+        for chunk in self.iter_chunks(query, chunk_size=1000, mock=False):
+            total += int(chunk['actual_output'].fillna(0).sum())
+            last_id = int(chunk['id'].iloc[-1])
+        return total, last_id
 
     def _process_production_data(self, df):
         """Clean and calculate derived metrics for production data."""
@@ -127,9 +546,7 @@ class DataProcessor:
         df['output_gap'] = df['target_output'] - df['actual_output']
         # Fixed division by zero
         df['efficiency'] = (df['actual_output'] / df['target_output'].replace(0, 1) * 100).fillna(0)
-        df['status'] = df['efficiency'].apply(
-            lambda x: 'Critical' if x < 75 else 'Warning' if x < 90 else 'Normal'
-        )
+        df['status'] = EFFICIENCY_STATUS.classify(df['efficiency'])
         return df
 
     def _process_supplier_data(self, df):
@@ -144,7 +561,15 @@ class DataProcessor:
         df['expected_delivery_date'] = pd.to_datetime(df['expected_delivery_date'])
         df['actual_delivery_date'] = pd.to_datetime(df['actual_delivery_date'])
         df['delay_days'] = (df['actual_delivery_date'] - df['expected_delivery_date']).dt.days
-        df['supply_risk'] = df['delay_days'].apply(
-            lambda x: 'High Risk' if x > 2 else 'Moderate Risk' if x > 0 else 'On Time'
-        )
+        df['supply_risk'] = SUPPLY_RISK.classify(df['delay_days'])
+        return df
+
+    def _process_risk_alerts(self, df):
+        """Parse types of precomputed risk alerts."""
+        if df.empty:
+            return df
+
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df['risk_score'] = pd.to_numeric(df['risk_score'], errors='coerce').fillna(0)
+        df['risk_label'] = pd.to_numeric(df['risk_label'], errors='coerce').fillna(0).astype(int)
         return df
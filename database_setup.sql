@@ -1,4 +1,9 @@
 -- Run this script in your Supabase SQL Editor to create the necessary tables.
+-- It matches migrations/001_baseline.sql plus the idempotency keys of
+-- migrations/002_ingest_keys.sql, which every stream writer needs for its
+-- upserts. Later schema changes (partitioning, indexes, KPI views) live in
+-- migrations/; apply them with `python migrate.py up` (001 and 002 are
+-- idempotent, so re-running them over this script is harmless).
 
 -- 1. Create Production Data Table
 CREATE TABLE IF NOT EXISTS production_data (
@@ -37,3 +42,41 @@ CREATE POLICY "Allow public insert access" ON production_data FOR INSERT WITH CH
 
 CREATE POLICY "Allow public read access" ON supplier_data FOR SELECT USING (true);
 CREATE POLICY "Allow public insert access" ON supplier_data FOR INSERT WITH CHECK (true);
+
+-- 5. Running total of production output used by the dashboard.
+-- Returns the output of rows with id > after_id and the highest id seen, so the
+-- caller only ever scans rows inserted since its previous watermark.
+CREATE OR REPLACE FUNCTION production_output_since(after_id BIGINT DEFAULT 0)
+RETURNS TABLE (total_output BIGINT, last_id BIGINT)
+LANGUAGE sql STABLE AS $$
+    SELECT COALESCE(SUM(actual_output), 0)::BIGINT, COALESCE(MAX(id), after_id)
+    FROM production_data
+    WHERE id > after_id;
+$$;
+
+-- 6. Publish inserts over Supabase Realtime so live dashboards are pushed new rows
+ALTER PUBLICATION supabase_realtime ADD TABLE production_data, supplier_data;
+
+-- 7. Risk alerts written by the streams when an entity's risk state changes
+CREATE TABLE IF NOT EXISTS risk_alerts (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    timestamp TIMESTAMPTZ DEFAULT NOW(),
+    risk_type TEXT NOT NULL,          -- 'production' or 'supplier'
+    entity_id TEXT NOT NULL,          -- machine_id or supplier_id
+    risk_score FLOAT,                 -- model probability (0-1)
+    risk_label INTEGER                -- 1 while the alert is raised
+);
+CREATE INDEX IF NOT EXISTS risk_alerts_entity_idx ON risk_alerts (risk_type, entity_id, id DESC);
+
+ALTER TABLE risk_alerts ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Allow public read access" ON risk_alerts FOR SELECT USING (true);
+CREATE POLICY "Allow public insert access" ON risk_alerts FOR INSERT WITH CHECK (true);
+
+-- 8. Idempotency keys (migrations/002_ingest_keys.sql): the streams and the outbox
+-- upsert with on_conflict=(ingest_key, timestamp) and skip rows already stored
+ALTER TABLE production_data ADD COLUMN IF NOT EXISTS ingest_key TEXT;
+ALTER TABLE supplier_data ADD COLUMN IF NOT EXISTS ingest_key TEXT;
+ALTER TABLE risk_alerts ADD COLUMN IF NOT EXISTS ingest_key TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS production_data_ingest_key_idx ON production_data (ingest_key, timestamp);
+CREATE UNIQUE INDEX IF NOT EXISTS supplier_data_ingest_key_idx ON supplier_data (ingest_key, timestamp);
+CREATE UNIQUE INDEX IF NOT EXISTS risk_alerts_ingest_key_idx ON risk_alerts (ingest_key, timestamp);
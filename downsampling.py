@@ -0,0 +1,103 @@
+"""
+Downsampling
+Server-side reduction of time series to a fixed number of points per series.
+
+Charts only need about as many points as there are horizontal pixels, so a
+series is reduced before it is handed to Plotly:
+
+- ``minmax_indices`` keeps the minimum and maximum of equal-count buckets
+  (fully vectorized, preserves spikes);
+- ``lttb_indices`` is Largest-Triangle-Three-Buckets, which keeps the point of
+  each bucket forming the largest triangle with its neighbours and preserves
+  the visual shape of the line.
+
+Long series are first reduced with min/max to a few times the target and then
+with LTTB (MinMaxLTTB), so the sequential LTTB pass never sees millions of rows.
+"""
+import numpy as np
+import pandas as pd
+
+MAX_POINTS_PER_SERIES = 2_000
+# Min/max pre-selection keeps this many candidates per output point before LTTB
+MINMAX_RATIO = 4
+
+
+def minmax_indices(y, n_out):
+    """Sorted indices of the min and max of ``y`` in n_out // 2 equal-count buckets."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    size = -(-n // max(n_out // 2, 1))
+    buckets = -(-n // size)
+    pad = buckets * size - n
+    # Missing values and padding are never picked as an extreme
+    lows = np.concatenate([np.where(np.isnan(y), np.inf, y), np.full(pad, np.inf)]).reshape(buckets, size)
+    highs = np.concatenate([np.where(np.isnan(y), -np.inf, y), np.full(pad, -np.inf)]).reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    picked = np.concatenate([offsets + lows.argmin(axis=1), offsets + highs.argmax(axis=1)])
+    return np.unique(np.minimum(picked, n - 1))
+
+
+def lttb_indices(x, y, n_out):
+    """Sorted indices of the points Largest-Triangle-Three-Buckets keeps."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    x = x - x[0]   # keep nanosecond timestamps well inside float precision
+
+    # First and last points are always kept; the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    mean_x = np.append(sums_x / counts, x[-1])
+    mean_y = np.append(sums_y / counts, y[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Triangle between the previous pick, each candidate and the next bucket's mean
+        area = np.abs((x[a] - mean_x[i + 1]) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (mean_y[i + 1] - y[a]))
+        a = lo + int(np.nanargmax(area)) if not np.isnan(area).all() else lo
+        out[i + 1] = a
+    return out
+
+
+def downsample_indices(x, y, n_out=MAX_POINTS_PER_SERIES, method='lttb'):
+    """Indices of at most ``n_out`` points of a series sorted by x ('lttb' or 'minmax')."""
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    if method == 'minmax':
+        return minmax_indices(y, n_out)
+    if n > MINMAX_RATIO * n_out:
+        candidates = minmax_indices(y, MINMAX_RATIO * n_out)
+        return candidates[lttb_indices(np.asarray(x)[candidates], np.asarray(y)[candidates], n_out)]
+    return lttb_indices(x, y, n_out)
+
+
+def downsample(df, x, y, by=None, n_out=MAX_POINTS_PER_SERIES, method='lttb'):
+    """Rows of ``df`` reduced to at most ``n_out`` per series (one series per ``by`` value).
+
+    The result is sorted by ``by`` and ``x``; the input does not need to be.
+    """
+    if df.empty:
+        return df
+    if pd.api.types.is_datetime64_any_dtype(df[x]):
+        keys = df[x].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    else:
+        keys = pd.to_numeric(df[x], errors='coerce').to_numpy(dtype=float)
+    values = pd.to_numeric(df[y], errors='coerce').to_numpy(dtype=float)
+
+    groups = [np.arange(len(df))] if by is None else df.groupby(by, sort=True).indices.values()
+    picked = []
+    for rows in groups:
+        rows = rows[np.argsort(keys[rows], kind='stable')]
+        picked.append(rows[downsample_indices(keys[rows], values[rows], n_out, method)])
+    return df.iloc[np.concatenate(picked)]
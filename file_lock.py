@@ -0,0 +1,72 @@
+"""
+File Lock
+Exclusive lock held on a file, shared by every process writing the same store.
+
+The streams, the dashboard and the CLI tools (imports, backfills, rebuilds)
+can all write the mock store, the Parquet history and the rollups at the same
+time. Each store serialises its read-modify-write steps on a lock file
+(fcntl.flock on POSIX, msvcrt.locking on Windows). The OS releases the lock
+when its holder exits, so a crashed writer never leaves a store locked.
+"""
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+
+def lock_exclusive(f):
+    """Block until this process holds the exclusive lock on the open file ``f``."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """Context manager holding the lock on ``path`` across processes and threads.
+
+    The lock file is created on first use and kept open until ``close``.
+    Threads of one process share its handle, so they also take a thread lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._file = open(self.path, 'a+b')
+            lock_exclusive(self._file)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            unlock(self._file)
+        finally:
+            self._thread_lock.release()
+
+    def close(self):
+        with self._thread_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,403 @@
+"""
+History Store
+Columnar, partitioned Parquet history of production and supplier records.
+
+Each table is a hive-partitioned dataset under data/history/<table>/:
+
+    production_data/date=2025-12-12/machine_id=M1/part-<uuid>.parquet
+
+so a scan restricted to a time range and/or some machines only opens the
+matching directories, and Parquet row-group statistics skip the rest. Appends
+write one small file per partition; once a day is complete its partitions are
+compacted into a single file each.
+
+Compaction never deletes files a reader may have just listed: the merged file
+and a _compacted.json manifest naming the files it replaces appear first, and
+scans skip replaced files from then on. The replaced files are deleted by the
+next compaction of the table, one generation later.
+
+Appends from several processes (the streams, an import, a backfill) never
+touch the same file. Compaction of a table holds the table's lock file, so
+two processes never merge the same partition twice.
+
+Usage:
+    python history_store.py import data/production_data_20251212.csv --table production_data
+    python history_store.py compact --table production_data
+"""
+import argparse
+import asyncio
+import atexit
+import glob
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from file_lock import FileLock
+from rollups import rollup_store, save_rollup_records
+
+HISTORY_DIR = os.path.join(os.path.dirname(__file__), 'data', 'history')
+
+# Column types per table; 'date' is the partition column derived from timestamp
+SCHEMAS = {
+    'production_data': pa.schema([
+        ('id', pa.int64()),
+        ('timestamp', pa.timestamp('us', tz='UTC')),
+        ('machine_id', pa.string()),
+        ('target_output', pa.int64()),
+        ('actual_output', pa.int64()),
+        ('speed_rpm', pa.int64()),
+        ('downtime_minutes', pa.float64()),
+        ('temperature_c', pa.float64()),
+    ]),
+    'supplier_data': pa.schema([
+        ('id', pa.int64()),
+        ('timestamp', pa.timestamp('us', tz='UTC')),
+        ('supplier_id', pa.string()),
+        ('material_type', pa.string()),
+        ('expected_delivery_date', pa.date32()),
+        ('actual_delivery_date', pa.date32()),
+        ('order_quantity', pa.int64()),
+        ('received_quantity', pa.int64()),
+        ('price_per_kg', pa.float64()),
+        ('transportation_status', pa.string()),
+    ]),
+}
+ENTITY_COLUMNS = {'production_data': 'machine_id', 'supplier_data': 'supplier_id'}
+# Per partition: the merged file of the last compaction and the files it replaced
+MANIFEST = '_compacted.json'
+
+
+def _partitioning(table):
+    return ds.partitioning(pa.schema([('date', pa.string()),
+                                      (ENTITY_COLUMNS[table], pa.string())]), flavor='hive')
+
+
+def to_table(table, records):
+    """Arrow table in the table's schema (plus the date partition column)."""
+    schema = SCHEMAS[table]
+    df = records if isinstance(records, pd.DataFrame) else pd.DataFrame.from_records(records)
+    df = df.reindex(columns=schema.names).copy()
+    df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True, format='ISO8601')
+    for field in schema:
+        if pa.types.is_date(field.type):
+            df[field.name] = pd.to_datetime(df[field.name]).dt.date
+        elif pa.types.is_integer(field.type):
+            df[field.name] = pd.to_numeric(df[field.name], errors='coerce').astype('Int64')
+        elif pa.types.is_floating(field.type):
+            df[field.name] = pd.to_numeric(df[field.name], errors='coerce')
+    df['date'] = df['timestamp'].dt.strftime('%Y-%m-%d')
+    return pa.Table.from_pandas(df, schema=schema.append(pa.field('date', pa.string())),
+                                preserve_index=False)
+
+
+class HistoryStore:
+    """Append-only partitioned Parquet datasets, one per table.
+
+    Args:
+        root: directory holding one dataset per table
+        flush_rows: buffered records per table that trigger a write
+        flush_seconds: maximum age of buffered records before a write
+    """
+
+    def __init__(self, root=HISTORY_DIR, flush_rows=5_000, flush_seconds=30.0):
+        self.root = root
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._buffer_lock = threading.Lock()
+        self._buffers = {}        # table -> (records, first_buffered_at)
+        self._latest_date = {}
+        self._flusher = None
+        self._file_locks = {}   # table -> FileLock shared with the other writing processes
+
+    def path(self, table):
+        return os.path.join(self.root, table)
+
+    def _file_lock(self, table):
+        with self._lock:
+            if table not in self._file_locks:
+                self._file_locks[table] = FileLock(os.path.join(self.root, f"{table}.lock"))
+            return self._file_locks[table]
+
+    def append(self, table, records):
+        """Buffer records and write them once ``flush_rows`` or ``flush_seconds`` is reached.
+
+        Small appends (one stream flush) would otherwise create one tiny file
+        per partition each time. A background thread writes buffers that reach
+        ``flush_seconds`` while no append comes; call ``flush`` to write
+        everything buffered.
+        """
+        if table not in SCHEMAS or len(records) == 0:
+            return 0
+        if isinstance(records, pd.DataFrame):
+            return self.write(table, records)
+        with self._buffer_lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="history-flush", daemon=True)
+                self._flusher.start()
+            buffered, since = self._buffers.get(table, ([], time.monotonic()))
+            buffered.extend(records)
+            if len(buffered) < self.flush_rows and time.monotonic() - since < self.flush_seconds:
+                self._buffers[table] = (buffered, since)
+                return 0
+            self._buffers.pop(table, None)
+        return self.write(table, buffered)
+
+    def flush(self):
+        """Write every buffered record."""
+        with self._buffer_lock:
+            buffers, self._buffers = self._buffers, {}
+        return sum(self.write(table, records) for table, (records, _) in buffers.items())
+
+    def _flush_loop(self):
+        """Write buffers older than ``flush_seconds`` (appends only check on arrival)."""
+        while True:
+            time.sleep(max(self.flush_seconds / 4, 0.1))
+            now = time.monotonic()
+            with self._buffer_lock:
+                due = [table for table, (_, since) in self._buffers.items()
+                       if now - since >= self.flush_seconds]
+                due = {table: self._buffers.pop(table)[0] for table in due}
+            for table, records in due.items():
+                try:
+                    self.write(table, records)
+                except Exception as e:
+                    print(f"History write error: {e}. {len(records)} {table} records not archived.")
+
+    def write(self, table, records):
+        """Write records (dicts or a DataFrame) as new files in their partitions now.
+
+        Tables without a schema are ignored. When the first record of a new day
+        arrives, the previous days' partitions are compacted.
+        """
+        if table not in SCHEMAS or len(records) == 0:
+            return 0
+        arrow_table = to_table(table, records)
+        with self._lock:
+            previous = self._latest_date.get(table) or self._stored_latest_date(table)
+            ds.write_dataset(arrow_table, self.path(table), format='parquet',
+                             partitioning=_partitioning(table),
+                             basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                             existing_data_behavior='overwrite_or_ignore')
+            newest = max(arrow_table.column('date').to_pylist())
+            self._latest_date[table] = max(newest, previous or newest)
+        if previous is not None and newest > previous:
+            self.compact(table, before=newest)
+        return arrow_table.num_rows
+
+    def _stored_latest_date(self, table):
+        dates = [os.path.basename(d)[5:] for d in glob.glob(os.path.join(self.path(table), 'date=*'))]
+        return max(dates) if dates else None
+
+    def _partitions(self, table):
+        return sorted(glob.glob(os.path.join(self.path(table), 'date=*', '*=*')))
+
+    def _live_files(self, partition):
+        """Data files of a partition, without those replaced by a finished compaction."""
+        # One listing decides: the replaced files are hidden exactly when the
+        # merged file is visible, so a scan never sees both or neither
+        names = os.listdir(partition)
+        files = {name for name in names if name.endswith('.parquet') and not name.startswith('.')}
+        if MANIFEST in names:
+            try:
+                with open(os.path.join(partition, MANIFEST)) as f:
+                    manifest = json.load(f)
+            except (FileNotFoundError, ValueError):
+                manifest = None
+            if manifest and manifest['by'] in files:
+                files -= set(manifest['replaced'])
+        return [os.path.join(partition, name) for name in sorted(files)]
+
+    def dataset(self, table):
+        files = [f for partition in self._partitions(table) for f in self._live_files(partition)]
+        return ds.dataset(files, format='parquet', partitioning=_partitioning(table),
+                          partition_base_dir=self.path(table),
+                          schema=SCHEMAS[table].append(pa.field('date', pa.string())))
+
+    def _filter(self, table, start=None, end=None, entity_ids=None):
+        """Partition (date, entity) and row (timestamp) predicates for a scan."""
+        expr = None
+
+        def both(a, b):
+            return b if a is None else a & b
+
+        if start is not None:
+            start = pd.Timestamp(start)
+            start = start.tz_localize('UTC') if start.tzinfo is None else start.tz_convert('UTC')
+            expr = both(expr, (ds.field('date') >= start.strftime('%Y-%m-%d'))
+                        & (ds.field('timestamp') >= pa.scalar(start.to_pydatetime(), pa.timestamp('us', tz='UTC'))))
+        if end is not None:
+            end = pd.Timestamp(end)
+            end = end.tz_localize('UTC') if end.tzinfo is None else end.tz_convert('UTC')
+            expr = both(expr, (ds.field('date') <= end.strftime('%Y-%m-%d'))
+                        & (ds.field('timestamp') < pa.scalar(end.to_pydatetime(), pa.timestamp('us', tz='UTC'))))
+        if entity_ids is not None:
+            expr = both(expr, ds.field(ENTITY_COLUMNS[table]).isin(list(entity_ids)))
+        return expr
+
+    def scan(self, table, start=None, end=None, columns=None, entity_ids=None):
+        """Rows with start <= timestamp < end as a DataFrame, reading only ``columns``."""
+        if not os.path.exists(self.path(table)):
+            return pd.DataFrame(columns=columns or SCHEMAS[table].names)
+        result = self.dataset(table).to_table(columns=columns or SCHEMAS[table].names,
+                                              filter=self._filter(table, start, end, entity_ids))
+        return result.to_pandas()
+
+    def count_rows(self, table, start=None, end=None, entity_ids=None):
+        """Rows a scan with the same filters would return (mostly from Parquet metadata)."""
+        if not os.path.exists(self.path(table)):
+            return 0
+        return self.dataset(table).count_rows(filter=self._filter(table, start, end, entity_ids))
+
+    def iter_batches(self, table, start=None, end=None, columns=None, entity_ids=None,
+                     batch_size=100_000):
+        """Yield DataFrames of at most ``batch_size`` rows, for scans that do not fit in memory."""
+        if not os.path.exists(self.path(table)):
+            return
+        scanner = self.dataset(table).scanner(columns=columns or SCHEMAS[table].names,
+                                              filter=self._filter(table, start, end, entity_ids),
+                                              batch_size=batch_size)
+        for batch in scanner.to_batches():
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+    def compact(self, table, before=None):
+        """Merge each partition's files into one, for dates before ``before`` (all if None).
+
+        Files replaced by the previous compaction are deleted first; the files
+        merged now stay on disk (hidden from new scans) until the next one.
+        """
+        with self._file_lock(table):
+            return self._compact(table, before)
+
+    def _compact(self, table, before):
+        self._remove_replaced(table)
+        compacted = 0
+        for partition in self._partitions(table):
+            date = os.path.basename(os.path.dirname(partition))[5:]
+            if before is not None and date >= before:
+                continue
+            files = self._live_files(partition)
+            if len(files) < 2:
+                continue
+            # Files hold every column except the partition keys, which live in the path
+            merged = pa.concat_tables([pq.read_table(f) for f in files], promote_options='default')
+            merged = merged.sort_by('timestamp')
+            tmp = os.path.join(partition, f".compact-{uuid.uuid4().hex}.parquet.tmp")
+            pq.write_table(merged, tmp)
+            name = f"part-{uuid.uuid4().hex}-0.parquet"
+            manifest_tmp = os.path.join(partition, f".{MANIFEST}.tmp")
+            with open(manifest_tmp, 'w') as f:
+                json.dump({'by': name, 'replaced': [os.path.basename(path) for path in files]}, f)
+            os.replace(manifest_tmp, os.path.join(partition, MANIFEST))
+            # The merged file becomes visible and the replaced ones invisible at once
+            os.replace(tmp, os.path.join(partition, name))
+            compacted += 1
+        return compacted
+
+    def _remove_replaced(self, table):
+        """Delete the files earlier compactions replaced (and leftovers of interrupted ones)."""
+        for partition in self._partitions(table):
+            for leftover in glob.glob(os.path.join(partition, '.*.tmp')):
+                os.remove(leftover)
+            path = os.path.join(partition, MANIFEST)
+            if not os.path.exists(path):
+                continue
+            with open(path) as f:
+                manifest = json.load(f)
+            if os.path.exists(os.path.join(partition, manifest['by'])):
+                for name in manifest['replaced']:
+                    if os.path.exists(os.path.join(partition, name)):
+                        os.remove(os.path.join(partition, name))
+            os.remove(path)
+
+    def clear(self, table=None):
+        if table is None:
+            with self._lock:
+                for lock in self._file_locks.values():
+                    lock.close()
+                self._file_locks = {}
+        target = self.path(table) if table else self.root
+        if os.path.exists(target):
+            shutil.rmtree(target)
+
+
+# Default store shared by the streams, the mock manager and the dashboard
+history_store = HistoryStore()
+atexit.register(history_store.flush)
+
+
+def save_history_records(table_name, records):
+    """Append records to the Parquet history and its rollups (ignored for tables without a schema)."""
+    save_rollup_records(table_name, records)
+    try:
+        return history_store.append(table_name, records)
+    except Exception as e:
+        print(f"History write error: {e}. {len(records)} {table_name} records not archived.")
+        return 0
+
+
+def flush_history():
+    """Write everything the history store and the rollups still buffer."""
+    history_store.flush()
+    rollup_store.flush()
+
+
+def with_history(insert_batch, store_records=save_history_records, flush=flush_history):
+    """insert_batch callable (sync or async) that archives each batch once it was inserted.
+
+    Batches that fail to insert are not archived here; they reach the history
+    through the mock store fallback instead, so every record is archived once.
+    Archive errors are only logged: raising them would report an inserted
+    batch as failed and spool (and archive) it a second time. The callable's
+    ``flush`` attribute writes what the archive still buffers; the writers
+    call it from ``close``.
+    """
+    def archive(table, records):
+        try:
+            store_records(table, records)
+        except Exception as e:
+            print(f"History write error: {e}. {len(records)} {table} records not archived.")
+
+    if asyncio.iscoroutinefunction(insert_batch):
+        async def insert_and_archive_async(table, records):
+            await insert_batch(table, records)
+            await asyncio.to_thread(archive, table, records)
+        insert_and_archive_async.flush = flush
+        return insert_and_archive_async
+
+    def insert_and_archive(table, records):
+        insert_batch(table, records)
+        archive(table, records)
+    insert_and_archive.flush = flush
+    return insert_and_archive
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Manage the Parquet history store.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    imp = sub.add_parser('import', help='append a CSV export to the history')
+    imp.add_argument('csv')
+    imp.add_argument('--table', choices=sorted(SCHEMAS), required=True)
+    comp = sub.add_parser('compact', help='merge small files of completed days')
+    comp.add_argument('--table', choices=sorted(SCHEMAS), required=True)
+    comp.add_argument('--all', action='store_true', help='also compact today')
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        df = pd.read_csv(args.csv)
+        rows = history_store.write(args.table, df)
+        rollup_store.update(args.table, df)
+        rollup_store.flush()
+        print(f"Imported {rows} rows into {history_store.path(args.table)}")
+    else:
+        before = None if args.all else pd.Timestamp.now(tz='UTC').strftime('%Y-%m-%d')
+        print(f"Compacted {history_store.compact(args.table, before)} partitions")
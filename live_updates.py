@@ -0,0 +1,118 @@
+"""
+Live Update Feed
+Process-wide change notifications for the dashboard's live mode.
+
+One ChangeFeed per Streamlit server process watches the data sources and bumps
+a version counter whenever new rows land. Dashboard fragments compare that
+counter with the version they last loaded, so an idle viewer never triggers a
+query and any number of viewers share the same watchers.
+"""
+import asyncio
+import threading
+import time
+
+
+def _safe(probe):
+    try:
+        return probe()
+    except Exception:
+        return None
+
+
+class ChangeFeed:
+    """Version counter bumped by background watchers when new data arrives."""
+
+    def __init__(self):
+        self.version = 0
+        self.last_change = None
+        self.mode = {}
+        self._cond = threading.Condition()
+
+    def notify(self, source):
+        with self._cond:
+            self.version += 1
+            self.last_change = (source, time.time())
+            self._cond.notify_all()
+
+    def wait_for_change(self, since_version, timeout=None):
+        """Block until the version moves past ``since_version`` or the timeout expires."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != since_version, timeout)
+            return self.version
+
+    def _start(self, target, name):
+        thread = threading.Thread(target=target, name=f"feed-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    def watch(self, name, probe, interval=1.0):
+        """Call ``probe`` every ``interval`` seconds and notify when its marker changes.
+
+        The probe should be cheap (a file stat, a single-row query). Failed
+        probes are ignored so a flaky source never raises into the dashboard.
+        """
+        self.mode[name] = 'polling'
+
+        def run():
+            marker = _safe(probe)
+            while True:
+                time.sleep(interval)
+                current = _safe(probe)
+                if current is not None and current != marker:
+                    marker = current
+                    self.notify(name)
+
+        return self._start(run, name)
+
+    def subscribe_supabase(self, url, key, tables, fallback_probe=None, fallback_interval=2.0):
+        """Listen for INSERTs on ``tables`` over Supabase Realtime.
+
+        Realtime is only available in the async client, so it runs on its own
+        event loop in a daemon thread. If the channel cannot be joined (Realtime
+        disabled for the tables, network down) the feed falls back to polling
+        ``fallback_probe`` instead.
+        """
+        self.mode['supabase'] = 'realtime'
+
+        def fall_back(reason):
+            print(f"Realtime unavailable ({reason}), polling for new rows instead.")
+            if fallback_probe is not None and self.mode.get('supabase') == 'realtime':
+                self.watch('supabase', fallback_probe, fallback_interval)
+
+        def run():
+            try:
+                asyncio.run(self._listen(url, key, tables, fall_back))
+            except Exception as e:
+                fall_back(e)
+
+        return self._start(run, 'supabase')
+
+    async def _listen(self, url, key, tables, fall_back):
+        from supabase import acreate_client
+
+        client = await acreate_client(url, key)
+        channel = client.channel("dashboard-live")
+        for table in tables:
+            channel.on_postgres_changes(
+                "INSERT", schema="public", table=table,
+                callback=lambda payload, table=table: self.notify(table),
+            )
+
+        def on_status(status, error):
+            if str(getattr(status, 'value', status)) in ('CHANNEL_ERROR', 'TIMED_OUT', 'CLOSED'):
+                fall_back(error or status)
+
+        await channel.subscribe(on_status)
+        while self.mode.get('supabase') == 'realtime':
+            await asyncio.sleep(5)
+
+
+def supabase_latest_ids(client, tables):
+    """Probe returning the newest id of each table (one single-row query per table)."""
+    def probe():
+        marker = []
+        for table in tables:
+            response = client.table(table).select("id").order("id", desc=True).limit(1).execute()
+            marker.append(response.data[0]['id'] if response.data else None)
+        return tuple(marker)
+    return probe
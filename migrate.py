@@ -0,0 +1,141 @@
+"""
+Schema Migrations
+Applies the numbered SQL files in migrations/ to the Postgres database in order.
+
+Applied versions are recorded in schema_migrations together with a checksum
+of the file, so each migration runs once and later edits to an applied file
+are reported instead of silently ignored. Every migration runs in its own
+transaction: a failing file leaves the schema as it was before that file.
+
+The connection string comes from --dsn or DATABASE_URL (Supabase: Project
+Settings > Database > Connection string, direct connection).
+
+Usage:
+    python migrate.py status
+    python migrate.py up               # apply everything pending
+    python migrate.py up --to 002      # stop after version 002
+    python migrate.py up --dry-run     # list what would run
+"""
+import argparse
+import glob
+import hashlib
+import os
+import re
+import time
+
+import psycopg
+
+from config.config import DATABASE_URL
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+_FILE_PATTERN = re.compile(r'^(\d+)_(.+)\.sql$')
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """Migration files as dicts (version, name, path, sql, checksum), oldest first."""
+    migrations = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.sql'))):
+        match = _FILE_PATTERN.match(os.path.basename(path))
+        if match is None:
+            continue
+        with open(path, encoding='utf-8') as f:
+            sql = f.read()
+        migrations.append({'version': match.group(1), 'name': match.group(2), 'path': path,
+                           'sql': sql, 'checksum': hashlib.sha256(sql.encode()).hexdigest()})
+    versions = [m['version'] for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def ensure_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            checksum TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            duration_ms INTEGER
+        )""")
+    conn.commit()
+
+
+def applied_versions(conn):
+    """version -> checksum of every applied migration."""
+    return dict(conn.execute("SELECT version, checksum FROM schema_migrations").fetchall())
+
+
+def apply(conn, migration):
+    """Run one migration and record it in the same transaction; returns its duration in ms."""
+    start = time.perf_counter()
+    with conn.transaction():
+        conn.execute(migration['sql'])
+        duration_ms = int((time.perf_counter() - start) * 1000)
+        conn.execute("INSERT INTO schema_migrations (version, name, checksum, duration_ms) "
+                     "VALUES (%s, %s, %s, %s)",
+                     (migration['version'], migration['name'], migration['checksum'], duration_ms))
+    return duration_ms
+
+
+def pending(conn, migrations, target=None):
+    """Migrations not applied yet (up to ``target``), warning about edited applied files."""
+    done = applied_versions(conn)
+    for migration in migrations:
+        checksum = done.get(migration['version'])
+        if checksum is not None and checksum != migration['checksum']:
+            print(f"Warning: {os.path.basename(migration['path'])} changed after it was applied")
+    return [m for m in migrations
+            if m['version'] not in done and (target is None or m['version'] <= target)]
+
+
+def migrate(dsn, target=None, dry_run=False, directory=MIGRATIONS_DIR):
+    """Apply pending migrations in order; returns the versions applied."""
+    migrations = discover(directory)
+    with psycopg.connect(dsn) as conn:
+        ensure_table(conn)
+        todo = pending(conn, migrations, target)
+        if dry_run:
+            for migration in todo:
+                print(f"Would apply {os.path.basename(migration['path'])}")
+            return []
+        applied = []
+        for migration in todo:
+            print(f"Applying {os.path.basename(migration['path'])}...", end=' ', flush=True)
+            print(f"done in {apply(conn, migration)} ms")
+            applied.append(migration['version'])
+        return applied
+
+
+def status(dsn, directory=MIGRATIONS_DIR):
+    migrations = discover(directory)
+    with psycopg.connect(dsn) as conn:
+        ensure_table(conn)
+        rows = {r[0]: r[1:] for r in conn.execute(
+            "SELECT version, applied_at, checksum FROM schema_migrations").fetchall()}
+    for migration in migrations:
+        row = rows.get(migration['version'])
+        if row is None:
+            state = 'pending'
+        elif row[1] != migration['checksum']:
+            state = f"applied {row[0]:%Y-%m-%d %H:%M} (file changed since)"
+        else:
+            state = f"applied {row[0]:%Y-%m-%d %H:%M}"
+        print(f"{migration['version']}  {migration['name']:<24} {state}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Apply the SQL migrations in migrations/.')
+    parser.add_argument('command', choices=['status', 'up'])
+    parser.add_argument('--dsn', default=DATABASE_URL, help='Postgres connection string (default: DATABASE_URL)')
+    parser.add_argument('--to', default=None, help='last version to apply')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error('set DATABASE_URL or pass --dsn')
+
+    if args.command == 'status':
+        status(args.dsn)
+    else:
+        applied = migrate(args.dsn, args.to, args.dry_run)
+        if not args.dry_run:
+            print(f"Applied {len(applied)} migration(s)" if applied else "Schema is up to date")
@@ -0,0 +1,81 @@
+-- Baseline schema: the tables, policies and functions of database_setup.sql.
+-- Every statement is idempotent, so projects that already ran that script can
+-- apply it and have it recorded.
+
+CREATE TABLE IF NOT EXISTS production_data (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    timestamp TIMESTAMPTZ DEFAULT NOW(),
+    machine_id TEXT NOT NULL,
+    target_output INTEGER,
+    actual_output INTEGER,
+    speed_rpm INTEGER,
+    downtime_minutes FLOAT,
+    temperature_c FLOAT
+);
+
+CREATE TABLE IF NOT EXISTS supplier_data (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    timestamp TIMESTAMPTZ DEFAULT NOW(),
+    supplier_id TEXT NOT NULL,
+    material_type TEXT,
+    expected_delivery_date DATE,
+    actual_delivery_date DATE,
+    order_quantity INTEGER,
+    received_quantity INTEGER,
+    price_per_kg FLOAT,
+    transportation_status TEXT
+);
+
+CREATE TABLE IF NOT EXISTS risk_alerts (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    timestamp TIMESTAMPTZ DEFAULT NOW(),
+    risk_type TEXT NOT NULL,          -- 'production' or 'supplier'
+    entity_id TEXT NOT NULL,          -- machine_id or supplier_id
+    risk_score FLOAT,                 -- model probability (0-1)
+    risk_label INTEGER                -- 1 while the alert is raised
+);
+CREATE INDEX IF NOT EXISTS risk_alerts_entity_idx ON risk_alerts (risk_type, entity_id, id DESC);
+
+-- Public read/insert policies (for development simplicity; restrict in production)
+ALTER TABLE production_data ENABLE ROW LEVEL SECURITY;
+ALTER TABLE supplier_data ENABLE ROW LEVEL SECURITY;
+ALTER TABLE risk_alerts ENABLE ROW LEVEL SECURITY;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['production_data', 'supplier_data', 'risk_alerts'] LOOP
+        IF NOT EXISTS (SELECT 1 FROM pg_policies WHERE tablename = t AND policyname = 'Allow public read access') THEN
+            EXECUTE format('CREATE POLICY "Allow public read access" ON %I FOR SELECT USING (true)', t);
+        END IF;
+        IF NOT EXISTS (SELECT 1 FROM pg_policies WHERE tablename = t AND policyname = 'Allow public insert access') THEN
+            EXECUTE format('CREATE POLICY "Allow public insert access" ON %I FOR INSERT WITH CHECK (true)', t);
+        END IF;
+    END LOOP;
+END $$;
+
+-- Running total of production output since an id watermark (see DataProcessor.get_total_output)
+CREATE OR REPLACE FUNCTION production_output_since(after_id BIGINT DEFAULT 0)
+RETURNS TABLE (total_output BIGINT, last_id BIGINT)
+LANGUAGE sql STABLE AS $$
+    SELECT COALESCE(SUM(actual_output), 0)::BIGINT, COALESCE(MAX(id), after_id)
+    FROM production_data
+    WHERE id > after_id;
+$$;
+
+-- Realtime inserts for live dashboards (Supabase only; skipped on plain Postgres)
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_publication WHERE pubname = 'supabase_realtime') THEN
+        RETURN;
+    END IF;
+    FOREACH t IN ARRAY ARRAY['production_data', 'supplier_data'] LOOP
+        IF NOT EXISTS (SELECT 1 FROM pg_publication_tables
+                       WHERE pubname = 'supabase_realtime' AND tablename = t) THEN
+            EXECUTE format('ALTER PUBLICATION supabase_realtime ADD TABLE %I', t);
+        END IF;
+    END LOOP;
+END $$;
@@ -0,0 +1,15 @@
+-- Idempotency keys: the streams and the outbox replayer send an ingest_key
+-- with every row and skip rows whose (ingest_key, timestamp) already exists,
+-- so re-sent batches are stored once. The key hashes the whole record, so
+-- including the timestamp changes nothing for deduplication but keeps the
+-- constraint valid once the tables are partitioned by time (003).
+ALTER TABLE production_data ADD COLUMN IF NOT EXISTS ingest_key TEXT;
+ALTER TABLE supplier_data ADD COLUMN IF NOT EXISTS ingest_key TEXT;
+ALTER TABLE risk_alerts ADD COLUMN IF NOT EXISTS ingest_key TEXT;
+
+DROP INDEX IF EXISTS production_data_ingest_key_idx;
+DROP INDEX IF EXISTS supplier_data_ingest_key_idx;
+DROP INDEX IF EXISTS risk_alerts_ingest_key_idx;
+CREATE UNIQUE INDEX production_data_ingest_key_idx ON production_data (ingest_key, timestamp);
+CREATE UNIQUE INDEX supplier_data_ingest_key_idx ON supplier_data (ingest_key, timestamp);
+CREATE UNIQUE INDEX risk_alerts_ingest_key_idx ON risk_alerts (ingest_key, timestamp);
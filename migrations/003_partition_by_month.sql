@@ -0,0 +1,92 @@
+-- Monthly range partitions on timestamp for production_data and supplier_data.
+--
+-- Time-window queries only touch the months they need, and old months can be
+-- detached or dropped in one statement instead of a bulk DELETE. Existing rows
+-- are copied into the partitioned tables inside this migration's transaction,
+-- which locks both tables until it commits: stop the streams first (their
+-- outboxes keep the records and replay them afterwards).
+--
+-- Postgres requires the partition key in every unique constraint, so the
+-- primary key becomes (id, timestamp). Ids still come from one sequence per
+-- table and stay unique.
+
+-- Creates the partitions of ``months`` consecutive UTC months from first_month
+-- that do not exist yet; returns how many were created.
+CREATE OR REPLACE FUNCTION create_monthly_partitions(parent TEXT, first_month DATE, months INTEGER)
+RETURNS INTEGER LANGUAGE plpgsql AS $$
+DECLARE
+    month_start TIMESTAMP;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    FOR i IN 0 .. months - 1 LOOP
+        month_start := date_trunc('month', first_month::timestamp) + make_interval(months => i);
+        partition_name := format('%s_%s', parent, to_char(month_start, 'YYYY_MM'));
+        CONTINUE WHEN to_regclass(partition_name) IS NOT NULL;
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                       partition_name, parent, month_start AT TIME ZONE 'UTC',
+                       (month_start + interval '1 month') AT TIME ZONE 'UTC');
+        created := created + 1;
+    END LOOP;
+    RETURN created;
+END $$;
+
+DO $$
+DECLARE
+    t TEXT;
+    old TEXT;
+    first_month DATE;
+    this_month DATE := date_trunc('month', now() AT TIME ZONE 'UTC')::date;
+    realtime BOOLEAN := EXISTS (SELECT 1 FROM pg_publication
+                                WHERE pubname = 'supabase_realtime' AND NOT puballtables);
+BEGIN
+    FOREACH t IN ARRAY ARRAY['production_data', 'supplier_data'] LOOP
+        CONTINUE WHEN (SELECT relkind FROM pg_class WHERE oid = t::regclass) = 'p';
+        old := t || '_unpartitioned';
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', t, old);
+        EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS) PARTITION BY RANGE (timestamp)', t, old);
+
+        -- Every month since the oldest row plus three months ahead; the default
+        -- partition only catches rows outside that range
+        EXECUTE format('SELECT date_trunc(''month'', min(timestamp) AT TIME ZONE ''UTC'')::date FROM %I', old)
+            INTO first_month;
+        first_month := LEAST(COALESCE(first_month, this_month), this_month);
+        PERFORM create_monthly_partitions(t, first_month,
+            ((extract(year FROM this_month) - extract(year FROM first_month)) * 12
+             + extract(month FROM this_month) - extract(month FROM first_month))::INTEGER + 4);
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', t || '_default', t);
+
+        EXECUTE format('INSERT INTO %I SELECT * FROM %I', t, old);
+        EXECUTE format('DROP TABLE %I', old);
+
+        EXECUTE format('CREATE SEQUENCE %I OWNED BY %I.id', t || '_id_seq', t);
+        EXECUTE format('ALTER TABLE %I ALTER COLUMN id SET DEFAULT nextval(%L)', t, t || '_id_seq');
+        EXECUTE format('SELECT setval(%L, COALESCE((SELECT max(id) FROM %I), 0) + 1, false)', t || '_id_seq', t);
+        EXECUTE format('ALTER TABLE %I ADD PRIMARY KEY (id, timestamp)', t);
+        EXECUTE format('CREATE UNIQUE INDEX %I ON %I (ingest_key, timestamp)', t || '_ingest_key_idx', t);
+
+        EXECUTE format('ALTER TABLE %I ENABLE ROW LEVEL SECURITY', t);
+        EXECUTE format('CREATE POLICY "Allow public read access" ON %I FOR SELECT USING (true)', t);
+        EXECUTE format('CREATE POLICY "Allow public insert access" ON %I FOR INSERT WITH CHECK (true)', t);
+        IF realtime THEN
+            EXECUTE format('ALTER PUBLICATION supabase_realtime ADD TABLE %I', t);
+        END IF;
+    END LOOP;
+
+    -- Realtime reports partition changes under the parent table's name
+    IF realtime THEN
+        ALTER PUBLICATION supabase_realtime SET (publish_via_partition_root = true);
+    END IF;
+END $$;
+
+-- Keep three months of partitions ahead when pg_cron is available (otherwise
+-- call create_monthly_partitions from any scheduler once a month)
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+        PERFORM cron.schedule('create-monthly-partitions', '0 0 1 * *', $job$
+            SELECT create_monthly_partitions('production_data', (now() AT TIME ZONE 'UTC')::date, 3),
+                   create_monthly_partitions('supplier_data', (now() AT TIME ZONE 'UTC')::date, 3)
+        $job$);
+    END IF;
+END $$;
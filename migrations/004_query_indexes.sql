@@ -0,0 +1,15 @@
+-- Indexes for the dashboard's access paths.
+
+-- Newest-first windows (ORDER BY timestamp DESC LIMIT n), across all machines
+-- and per machine/supplier
+CREATE INDEX IF NOT EXISTS production_data_timestamp_idx ON production_data (timestamp DESC);
+CREATE INDEX IF NOT EXISTS production_data_machine_timestamp_idx ON production_data (machine_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS supplier_data_timestamp_idx ON supplier_data (timestamp DESC);
+CREATE INDEX IF NOT EXISTS supplier_data_supplier_timestamp_idx ON supplier_data (supplier_id, timestamp DESC);
+
+-- Range scans over long history. Rows arrive in timestamp order, so a BRIN
+-- index (a few pages per partition) prunes block ranges almost as well as a
+-- B-tree for multi-day windows.
+CREATE INDEX IF NOT EXISTS production_data_timestamp_brin ON production_data USING brin (timestamp);
+CREATE INDEX IF NOT EXISTS supplier_data_timestamp_brin ON supplier_data USING brin (timestamp);
+CREATE INDEX IF NOT EXISTS risk_alerts_timestamp_brin ON risk_alerts USING brin (timestamp);
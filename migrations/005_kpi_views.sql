@@ -0,0 +1,54 @@
+-- Materialized KPI views: hourly per machine and daily per supplier, with the
+-- same measure names as the local rollups (rollups.py). Long-horizon KPIs read
+-- a few hundred rows from these instead of aggregating the raw tables.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS machine_hourly_kpis AS
+SELECT machine_id,
+       date_trunc('hour', timestamp, 'UTC') AS bucket,
+       count(*) AS count,
+       sum(actual_output) AS output_sum,
+       min(actual_output) AS output_min,
+       max(actual_output) AS output_max,
+       sum(target_output) AS target_sum,
+       100.0 * sum(actual_output) / NULLIF(sum(target_output), 0) AS efficiency,
+       sum(downtime_minutes) AS downtime_minutes,
+       count(*) FILTER (WHERE downtime_minutes > 0) AS downtime_events,
+       max(temperature_c) AS temperature_max
+FROM production_data
+GROUP BY 1, 2;
+CREATE UNIQUE INDEX IF NOT EXISTS machine_hourly_kpis_key ON machine_hourly_kpis (machine_id, bucket);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS supplier_daily_kpis AS
+SELECT supplier_id,
+       date_trunc('day', timestamp, 'UTC') AS bucket,
+       count(*) AS count,
+       sum(order_quantity) AS order_quantity,
+       sum(received_quantity) AS received_quantity,
+       count(*) FILTER (WHERE actual_delivery_date > expected_delivery_date) AS delayed_count,
+       sum(actual_delivery_date - expected_delivery_date) AS delay_days_sum,
+       max(actual_delivery_date - expected_delivery_date) AS delay_days_max
+FROM supplier_data
+GROUP BY 1, 2;
+CREATE UNIQUE INDEX IF NOT EXISTS supplier_daily_kpis_key ON supplier_daily_kpis (supplier_id, bucket);
+
+-- CONCURRENTLY keeps the views readable while they refresh (needs the unique indexes)
+CREATE OR REPLACE FUNCTION refresh_kpi_views()
+RETURNS void LANGUAGE sql AS $$
+    REFRESH MATERIALIZED VIEW CONCURRENTLY machine_hourly_kpis;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY supplier_daily_kpis;
+$$;
+
+DO $$
+DECLARE
+    r TEXT;
+BEGIN
+    -- Materialized views have no row level security; expose them read-only to the API roles
+    FOREACH r IN ARRAY ARRAY['anon', 'authenticated'] LOOP
+        IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = r) THEN
+            EXECUTE format('GRANT SELECT ON machine_hourly_kpis, supplier_daily_kpis TO %I', r);
+        END IF;
+    END LOOP;
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+        PERFORM cron.schedule('refresh-kpi-views', '*/5 * * * *', 'SELECT refresh_kpi_views()');
+    END IF;
+END $$;
@@ -1,40 +1,473 @@
+"""
+Local Mock Database
+Segmented append-only store used when Supabase is unreachable.
+
+Each table lives in its own directory under ``data/mock_store`` and is made of
+NDJSON segment files named after the offset of their first record (Kafka style).
+Records are only ever appended, so an insert costs one small write instead of
+re-serialising the whole history. A per-table ``index.json`` lists the segments
+with their base offsets and record counts; it is only rewritten when a segment
+rolls over, which is also when old segments are compacted away.
+
+Several processes may append to the same table (both streams write
+risk_alerts, a backfill can run next to a stream): appends, rolls and
+compaction hold an exclusive lock on the table's ``.lock`` file and first
+catch up with whatever the other processes appended, so ids stay unique and
+increasing.
+
+Tables can also keep running totals of numeric fields in a ``totals.json``
+sidecar. The sidecar covers every sealed segment, so a reader only has to add
+up the active segment to get the cumulative value over the whole history, even
+after the records themselves were compacted away.
+"""
 import json
 import os
-from datetime import datetime
+import shutil
+import threading
+import time
 
-# Local mock database path
-MOCK_DB_PATH = os.path.join(os.path.dirname(__file__), 'data', 'mock_db.json')
-MAX_RECORDS = 500
+from file_lock import FileLock
 
-def save_mock_record(table_name, record):
-    """Save a record to the local mock database atomically."""
-    os.makedirs(os.path.dirname(MOCK_DB_PATH), exist_ok=True)
-    
-    data = {'production_data': [], 'supplier_data': []}
-    if os.path.exists(MOCK_DB_PATH):
+# Local mock database paths
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+MOCK_STORE_DIR = os.path.join(DATA_DIR, 'mock_store')
+# Legacy single-file store, imported once into the segmented store if present
+MOCK_DB_PATH = os.path.join(DATA_DIR, 'mock_db.json')
+
+MAX_RECORDS = 500            # Records retained per table after compaction
+SEGMENT_MAX_RECORDS = 100    # Records per segment before rolling to a new one
+
+# fsync policy: "always" (every append), "interval" (at most once per
+# FSYNC_INTERVAL seconds and on every roll) or "never" (leave it to the OS)
+FSYNC_POLICY = os.getenv("MOCK_FSYNC_POLICY", "interval")
+FSYNC_INTERVAL = 1.0
+
+INDEX_FILE = 'index.json'
+TOTALS_FILE = 'totals.json'
+LOCK_FILE = '.lock'
+
+# Also archive saved records into the Parquet history store (history_store.py)
+MOCK_HISTORY = os.getenv("MOCK_HISTORY", "1") != "0"
+
+# Numeric fields whose cumulative sum is maintained per table
+RUNNING_TOTAL_FIELDS = {
+    'production_data': ['actual_output'],
+}
+
+
+def _segment_name(base_offset):
+    return f"{base_offset:012d}.ndjson"
+
+
+class SegmentLog:
+    """Append-only, segmented NDJSON log for a single table.
+
+    Every record gets a monotonically increasing ``id`` (its offset in the log)
+    unless it already carries one, which mirrors the identity column Supabase
+    assigns and lets readers stop at a known watermark.
+
+    With ``max_records=None`` nothing is compacted away by retention; segments
+    are only removed by ``drop_before`` (used by the outbox once delivered).
+    """
+
+    def __init__(self, directory, max_records=MAX_RECORDS,
+                 segment_max_records=SEGMENT_MAX_RECORDS, fsync_policy=FSYNC_POLICY,
+                 sum_fields=()):
+        self.directory = directory
+        self.sum_fields = list(sum_fields)
+        self.max_records = max_records
+        self.segment_max_records = segment_max_records
+        self.fsync_policy = fsync_policy
+        self._lock = threading.Lock()
+        # Exclusive across processes; callers also hold self._lock
+        self._process_lock = FileLock(os.path.join(directory, LOCK_FILE))
+        self._file = None
+        self._last_fsync = 0.0
+        self._index = None
+        self._active_count = 0
+        self._active_size = 0
+
+    # ------------------------------------------------------------------ index
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, INDEX_FILE)
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {'segments': []}
+
+    def _write_index(self, index):
+        _write_json_atomic(self.index_path, index)
+
+    # ----------------------------------------------------------------- totals
+    @property
+    def totals_path(self):
+        return os.path.join(self.directory, TOTALS_FILE)
+
+    def _read_totals(self):
         try:
-            with open(MOCK_DB_PATH, 'r') as f:
-                data = json.load(f)
-        except Exception:
-            # If corrupted, start fresh
-            pass
-    
-    if table_name not in data:
-        data[table_name] = []
-        
-    # Add new record at the beginning (shift old ones)
-    data[table_name].insert(0, record)
-    
-    # Cap size
-    data[table_name] = data[table_name][:MAX_RECORDS]
-    
-    # Atomic write using a temp file
-    temp_path = MOCK_DB_PATH + ".tmp"
+            with open(self.totals_path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {'through_offset': 0, 'count': 0, 'sums': {}}
+
+    def _sum_segments(self, segments, totals):
+        """Add the records of the given segments into a totals dict in place."""
+        for segment in segments:
+            path = os.path.join(self.directory, _segment_name(segment['base_offset']))
+            for line in _read_lines(path):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                totals['count'] += 1
+                for field in self.sum_fields:
+                    try:
+                        value = float(record.get(field, 0))
+                    except (ValueError, TypeError):
+                        continue
+                    totals['sums'][field] = totals['sums'].get(field, 0) + value
+        return totals
+
+    def _update_totals(self, segments):
+        """Fold every sealed segment not yet covered into the totals sidecar."""
+        totals = self._read_totals()
+        active_base = segments[-1]['base_offset']
+        pending = [s for s in segments[:-1] if s['base_offset'] >= totals['through_offset']]
+        self._sum_segments(pending, totals)
+        totals['through_offset'] = active_base
+        _write_json_atomic(self.totals_path, totals)
+        return totals
+
+    # ----------------------------------------------------------------- writes
+    def _sync(self):
+        """Catch up with appends and rolls other processes made since our last write."""
+        index = self._read_index()
+        if index['segments'] and index['segments'][-1]['base_offset'] != \
+                self._index['segments'][-1]['base_offset']:
+            self._file.close()
+            self._open()
+            return
+        self._index = index if index['segments'] else self._index
+        size = os.fstat(self._file.fileno()).st_size
+        if size != self._active_size:
+            path = os.path.join(self.directory, _segment_name(self._index['segments'][-1]['base_offset']))
+            self._active_count = len(_read_lines(path))
+            self._active_size = size
+
+    def _open(self):
+        """Open (or create) the active segment for appending."""
+        os.makedirs(self.directory, exist_ok=True)
+        index = self._read_index()
+        if not index['segments']:
+            index['segments'].append({'base_offset': 0, 'records': None})
+            self._write_index(index)
+
+        active = index['segments'][-1]
+        path = os.path.join(self.directory, _segment_name(active['base_offset']))
+        self._active_count = len(_read_lines(path))
+        self._file = open(path, 'ab')
+        self._active_size = os.fstat(self._file.fileno()).st_size
+        self._index = index
+
+    def append(self, record):
+        """Append one record and return the offset assigned to it."""
+        return self.append_many([record])[-1]
+
+    def append_many(self, records):
+        """Append a batch of records with a single write per segment."""
+        offsets = []
+        with self._lock, self._process_lock:
+            if self._file is None:
+                self._open()
+            else:
+                self._sync()
+
+            pending = []
+            for record in records:
+                active = self._index['segments'][-1]
+                offset = active['base_offset'] + self._active_count
+                if 'id' not in record:
+                    record = dict(record, id=offset)
+                pending.append(json.dumps(record, default=str).encode() + b"\n")
+                offsets.append(offset)
+                self._active_count += 1
+
+                if self._active_count >= self.segment_max_records:
+                    self._file.write(b"".join(pending))
+                    pending = []
+                    self._roll()
+
+            if pending:
+                self._file.write(b"".join(pending))
+            self._file.flush()
+            self._active_size = self._file.tell()
+            self._maybe_fsync()
+        return offsets
+
+    def _maybe_fsync(self, force=False):
+        if self.fsync_policy == "never" and not force:
+            return
+        now = time.monotonic()
+        if force or self.fsync_policy == "always" or now - self._last_fsync >= FSYNC_INTERVAL:
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+    def _roll(self):
+        """Seal the active segment, start a new one and compact old segments."""
+        self._maybe_fsync(force=True)
+        self._file.close()
+
+        segments = self._index['segments']
+        sealed = segments[-1]
+        sealed['records'] = self._active_count
+        segments.append({'base_offset': sealed['base_offset'] + self._active_count,
+                         'records': None})
+        self._write_index(self._index)
+
+        # Totals must cover a segment before compaction is allowed to drop it
+        if self.sum_fields:
+            through_offset = self._update_totals(segments)['through_offset']
+        else:
+            through_offset = segments[-1]['base_offset']
+        if self._compact(segments, through_offset):
+            self._write_index(self._index)
+
+        path = os.path.join(self.directory, _segment_name(segments[-1]['base_offset']))
+        self._file = open(path, 'ab')
+        self._active_count = 0
+        self._active_size = 0
+
+    def _compact(self, segments, through_offset):
+        """Drop the oldest sealed segments that are no longer needed to hold max_records."""
+        dropped = False
+        if self.max_records is None:
+            return dropped
+        while len(segments) > 2 and segments[0]['base_offset'] < through_offset:
+            retained = sum(s['records'] for s in segments[1:-1])
+            if retained < self.max_records:
+                break
+            oldest = segments.pop(0)
+            dropped = True
+            try:
+                os.remove(os.path.join(self.directory, _segment_name(oldest['base_offset'])))
+            except FileNotFoundError:
+                pass
+        return dropped
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._maybe_fsync(force=True)
+                self._file.close()
+                self._file = None
+            self._process_lock.close()
+
+    # ------------------------------------------------------------------ reads
+    def iter_newest_first(self, limit=None, after_id=None):
+        """Yield records newest-first, reading only as many segments as needed.
+
+        With ``after_id`` the scan stops at the first record whose id is not
+        above it, so an incremental reader only touches what it has not seen.
+        """
+        index = self._read_index()
+        returned = 0
+        for segment in reversed(index['segments']):
+            path = os.path.join(self.directory, _segment_name(segment['base_offset']))
+            for line in reversed(_read_lines(path)):
+                if limit is not None and returned >= limit:
+                    return
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write at the tail of the active segment
+                    continue
+                if after_id is not None and record.get('id', after_id + 1) <= after_id:
+                    return
+                returned += 1
+                yield record
+
+    def iter_from(self, offset=0):
+        """Yield records oldest-first starting at ``offset``."""
+        index = self._read_index()
+        for segment in index['segments']:
+            if segment['records'] is not None and segment['base_offset'] + segment['records'] <= offset:
+                continue
+            path = os.path.join(self.directory, _segment_name(segment['base_offset']))
+            for position, line in enumerate(_read_lines(path)):
+                if segment['base_offset'] + position < offset:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Torn write at the tail of the active segment
+                    return
+
+    def end_offset(self):
+        """Offset the next appended record will get."""
+        index = self._read_index()
+        if not index['segments']:
+            return 0
+        active = index['segments'][-1]
+        return active['base_offset'] + len(_read_lines(
+            os.path.join(self.directory, _segment_name(active['base_offset']))))
+
+    def drop_before(self, offset):
+        """Delete sealed segments whose records all have offsets below ``offset``."""
+        with self._lock, self._process_lock:
+            index = self._read_index()
+            segments = index['segments']
+            dropped = 0
+            while len(segments) > 1 and segments[0]['base_offset'] + segments[0]['records'] <= offset:
+                oldest = segments.pop(0)
+                dropped += 1
+                try:
+                    os.remove(os.path.join(self.directory, _segment_name(oldest['base_offset'])))
+                except FileNotFoundError:
+                    pass
+            if dropped:
+                self._write_index(index)
+        return dropped
+
+    def read(self, limit=None, after_id=None):
+        return list(self.iter_newest_first(limit, after_id))
+
+    def change_marker(self):
+        """Cheap value that changes whenever a record is appended (two stats and a small read)."""
+        index = self._read_index()
+        if not index['segments']:
+            return None
+        active = index['segments'][-1]
+        try:
+            size = os.path.getsize(os.path.join(self.directory, _segment_name(active['base_offset'])))
+        except FileNotFoundError:
+            size = 0
+        return active['base_offset'], size
+
+    def running_totals(self):
+        """Cumulative count and field sums over the whole history of the table.
+
+        Starts from the sidecar watermark and only reads the segments written
+        since then (normally just the active one).
+        """
+        totals = self._read_totals()
+        index = self._read_index()
+        newer = [s for s in index['segments'] if s['base_offset'] >= totals['through_offset']]
+        return self._sum_segments(newer, totals)
+
+
+def _write_json_atomic(path, payload):
+    temp_path = path + ".tmp"
     with open(temp_path, 'w') as f:
-        json.dump(data, f, indent=2)
-    os.replace(temp_path, MOCK_DB_PATH)
+        json.dump(payload, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def _read_lines(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read().splitlines()
+    except FileNotFoundError:
+        return []
+
+
+class MockStore:
+    """Collection of per-table segment logs rooted at one directory."""
+
+    def __init__(self, root=MOCK_STORE_DIR, **log_options):
+        self.root = root
+        self.log_options = log_options
+        self._logs = {}
+        self._lock = threading.Lock()
+
+    def log(self, table_name):
+        with self._lock:
+            if table_name not in self._logs:
+                directory = os.path.join(self.root, table_name)
+                options = dict(self.log_options)
+                options.setdefault('sum_fields', RUNNING_TOTAL_FIELDS.get(table_name, ()))
+                log = SegmentLog(directory, **options)
+                self._logs[table_name] = log
+                if self.root == MOCK_STORE_DIR:
+                    _import_legacy_table(log, table_name)
+            return self._logs[table_name]
+
+    def clear(self):
+        with self._lock:
+            for log in self._logs.values():
+                log.close()
+            self._logs = {}
+        if os.path.exists(self.root):
+            shutil.rmtree(self.root)
+
+
+def _import_legacy_table(log, table_name):
+    """Seed a fresh table log from the old mock_db.json file, oldest record first."""
+    if os.path.exists(log.index_path) or not os.path.exists(MOCK_DB_PATH):
+        return
+    try:
+        with open(MOCK_DB_PATH, 'r') as f:
+            legacy = json.load(f).get(table_name, [])
+    except Exception:
+        return
+    log.append_many(list(reversed(legacy)))
+
+
+# Default store shared by the streams and the dashboard
+mock_store = MockStore()
+
+
+def _archive(table_name, records):
+    if MOCK_HISTORY:
+        from history_store import save_history_records
+        save_history_records(table_name, records)
+
+
+def save_mock_record(table_name, record):
+    """Append a record to the local mock database."""
+    mock_store.log(table_name).append(record)
+    _archive(table_name, [record])
+
+
+def save_mock_records(table_name, records):
+    """Append a batch of records to the local mock database."""
+    if records:
+        mock_store.log(table_name).append_many(records)
+        _archive(table_name, records)
+
+
+def read_mock_records(table_name, limit=None, after_id=None):
+    """Return up to ``limit`` records of a table newer than ``after_id``, newest first."""
+    return mock_store.log(table_name).read(limit, after_id)
+
+
+def iter_mock_records(table_name, after_id=None):
+    """Yield the records of a table with id > ``after_id``, oldest first."""
+    start = 0 if after_id is None else after_id + 1
+    for record in mock_store.log(table_name).iter_from(start):
+        if after_id is None or record.get('id', start) > after_id:
+            yield record
+
+
+def get_mock_running_total(table_name, field):
+    """Cumulative sum of a numeric field across every record ever saved."""
+    return mock_store.log(table_name).running_totals()['sums'].get(field, 0)
+
+
+def mock_change_probe(table_names):
+    """Probe for live_updates.ChangeFeed that changes when any of the tables grows."""
+    def probe():
+        return tuple(mock_store.log(name).change_marker() for name in table_names)
+    return probe
+
 
 def clear_mock_db():
     """Clear the local mock database."""
+    mock_store.clear()
     if os.path.exists(MOCK_DB_PATH):
         os.remove(MOCK_DB_PATH)
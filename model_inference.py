@@ -1,60 +1,507 @@
 """
 ML Model Inference Module
 Loads and uses trained models for production risk, supplier delay, and efficiency prediction.
+
+Run ``python model_inference.py`` to print a JSON startup report (import, load
+and first-prediction latency per model) for tracking cold-start regressions.
+
+Artifacts are read from the version named in models/CURRENT (written by
+retrain_models.py) or from models/ itself when no version was activated.
 """
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+import glob
+import hashlib
+import json
+import logging
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
 import joblib
 import pandas as pd
 import numpy as np
+from classification import PRODUCTION_RISK_LEVEL, SUPPLIER_DELAY_LEVEL
+from config.config import SCORING_SERVICE_ADDRESS
+
+logger = logging.getLogger(__name__)
 
 # Path to models directory
 MODELS_DIR = os.path.join(os.path.dirname(__file__), 'models')
+# Versioned artifact sets (models/versions/<version>/) and the active version pointer
+VERSIONS_DIR = os.path.join(MODELS_DIR, 'versions')
+CURRENT_FILE = os.path.join(MODELS_DIR, 'CURRENT')
+MANIFEST_FILE = 'manifest.json'
+
+# Model and encoder artifacts, loaded on first use
+MODEL_FILES = {
+    'production_risk': 'production_risk_rf_model.pkl',
+    'supplier_delay': 'supplier_delay_rf_model.pkl',
+    'efficiency': 'efficiency_lr_model.pkl',
+}
+MODEL_TYPES = {
+    'production_risk': 'RandomForestClassifier',
+    'supplier_delay': 'RandomForestClassifier',
+    'efficiency': 'LinearRegression',
+}
+ENCODER_FILES = {
+    'machine_id': 'le_machine_id.pkl',
+    'supplier_id': 'le_supplier_id.pkl',
+    'material_type': 'le_material_type.pkl',
+    'transportation_status': 'le_transportation_status.pkl',
+}
+
+# Model inputs, in the column order the models were fitted with
+FEATURE_COLUMNS = {
+    'production_risk': ['speed_rpm', 'downtime_minutes', 'temperature_c', 'target_output',
+                        'machine_id_encoded'],
+    'supplier_delay': ['supplier_id_encoded', 'material_type_encoded', 'order_quantity',
+                       'price_per_kg', 'transportation_status_encoded'],
+    'efficiency': ['speed_rpm', 'downtime_minutes', 'temperature_c', 'target_output'],
+}
+
+# Map statuses to expected labels (resilience against stream variations)
+TRANSPORT_STATUS_MAP = {
+    'in-transit': 'In Transit',
+    'arrived': 'Delivered',
+    'Delivered': 'Delivered',
+    'In Transit': 'In Transit',
+    'delayed': 'delayed'
+}
+
+
+def normalize_transport_status(values: pd.Series) -> pd.Series:
+    return values.map(lambda x: TRANSPORT_STATUS_MAP.get(x, x))
+
+
+# Random forests that are also exported as packed node arrays
+FOREST_FILES = {name: MODEL_FILES[name] for name in ('production_risk', 'supplier_delay')}
+
+# Batches above this size are scored with sklearn instead of the packed evaluator
+COMPILED_MAX_ROWS = 1_000
+
+# How often (seconds) to check models/*.pkl for changes
+MODEL_CHECK_INTERVAL = 2.0
+
+
+def active_version():
+    """Version named in models/CURRENT, or None for the artifacts in models/ itself."""
+    try:
+        with open(CURRENT_FILE) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return version if version and os.path.isdir(os.path.join(VERSIONS_DIR, version)) else None
+
+
+def version_dir(version):
+    return MODELS_DIR if version is None else os.path.join(VERSIONS_DIR, version)
+
+
+def activate_version(version):
+    """Point models/CURRENT at a version; running managers switch to it on their next check."""
+    if not os.path.exists(os.path.join(VERSIONS_DIR, version, MANIFEST_FILE)):
+        raise ValueError(f"Unknown model version: {version}")
+    tmp = CURRENT_FILE + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, CURRENT_FILE)
+
+
+def read_manifest(version):
+    """Manifest of a version (None for the unversioned artifacts in models/)."""
+    if version is None:
+        return None
+    try:
+        with open(os.path.join(VERSIONS_DIR, version, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def list_versions():
+    """Versions that have a manifest, oldest first."""
+    return sorted(os.path.basename(os.path.dirname(p))
+                  for p in glob.glob(os.path.join(VERSIONS_DIR, '*', MANIFEST_FILE)))
+
+
+def models_signature(models_dir=MODELS_DIR):
+    """Short hash of the name, size and mtime of every model artifact."""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(models_dir.encode())
+    for path in sorted(glob.glob(os.path.join(models_dir, '*.pkl'))):
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+class CompiledForest:
+    """
+    RandomForestClassifier flattened into packed NumPy node arrays.
+    
+    All trees are concatenated into one set of arrays, renumbered breadth-first
+    so the two children of a node are adjacent: the next node is always
+    ``child[node] + (x > threshold[node])``. A batch is scored by moving every
+    (tree, row) pair one level down per iteration with vectorized gathers, so a
+    call costs max_depth NumPy passes instead of sklearn's per-call validation
+    and joblib dispatch. Leaves point back to themselves with an infinite
+    threshold, which lets every path run the same number of steps.
+    
+    Thresholds are stored as float32 rounded down, which gives exactly the same
+    decisions as sklearn's float32-input-vs-float64-threshold comparison.
+    Inputs must not contain NaN (the dashboard fills missing numerics with 0).
+    """
+    
+    ROW_CHUNK = 1024
+    
+    def __init__(self, arrays: dict):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.child = arrays['child']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.max_depth = int(arrays['max_depth'])
+        self.n_features = int(arrays['n_features'])
+        self.feature_names = list(arrays['feature_names'])
+        self.feature_importances = arrays.get('feature_importances')
+        self.source = str(arrays.get('source', ''))
+    
+    @classmethod
+    def from_sklearn(cls, model, source: str = '') -> 'CompiledForest':
+        """Pack a fitted RandomForestClassifier (positive class = last class)."""
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            left, right = tree.children_left, tree.children_right
+            
+            # Breadth-first order: the children of every split get consecutive ids
+            order = [0]
+            for node in order:
+                if left[node] != -1:
+                    order.extend((left[node], right[node]))
+            order = np.asarray(order)
+            new_id = np.empty(tree.node_count, dtype=np.int64)
+            new_id[order] = np.arange(tree.node_count)
+            
+            is_leaf = left[order] == -1
+            own = np.arange(tree.node_count) + offset
+            features.append(np.where(is_leaf, 0, tree.feature[order]))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold[order]))
+            children.append(np.where(is_leaf, own, new_id[np.maximum(left[order], 0)] + offset))
+            # Per-node class distribution, normalised like DecisionTreeClassifier.predict_proba
+            value = tree.value[order, 0, :]
+            values.append(value[:, -1] / value.sum(axis=1))
+            roots.append(offset)
+            
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+        
+        threshold = np.concatenate(thresholds)
+        threshold32 = threshold.astype(np.float32)
+        rounded_up = threshold32.astype(np.float64) > threshold
+        threshold32[rounded_up] = np.nextafter(threshold32[rounded_up], np.float32(-np.inf))
+        
+        names = getattr(model, 'feature_names_in_', None)
+        return cls({
+            'feature': np.concatenate(features).astype(np.intp),
+            'threshold': threshold32,
+            'child': np.concatenate(children).astype(np.intp),
+            'value': np.concatenate(values).astype(np.float64),
+            'roots': np.asarray(roots, dtype=np.intp),
+            'max_depth': max_depth,
+            'n_features': model.n_features_in_,
+            'feature_names': [] if names is None else [str(n) for n in names],
+            'feature_importances': np.asarray(model.feature_importances_, dtype=np.float64),
+            'source': source,
+        })
+    
+    def to_arrays(self) -> dict:
+        return {
+            'feature': self.feature, 'threshold': self.threshold, 'child': self.child,
+            'value': self.value, 'roots': self.roots, 'max_depth': self.max_depth,
+            'n_features': self.n_features, 'feature_names': self.feature_names,
+            'feature_importances': self.feature_importances, 'source': self.source,
+        }
+    
+    def save(self, path: str):
+        joblib.dump(self.to_arrays(), path)
+    
+    @classmethod
+    def load(cls, path: str, mmap_mode=None) -> 'CompiledForest':
+        """Load an exported forest; with mmap_mode='r' the node arrays stay memory-mapped."""
+        return cls(joblib.load(path, mmap_mode=mmap_mode))
+    
+    def predict_positive(self, X) -> np.ndarray:
+        """Positive-class probability for each row, equal to predict_proba(X)[:, 1]."""
+        if isinstance(X, pd.DataFrame):
+            if self.feature_names:
+                X = X[self.feature_names]
+            X = X.to_numpy()
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), self.ROW_CHUNK):
+            out[start:start + self.ROW_CHUNK] = self._predict_chunk(X[start:start + self.ROW_CHUNK])
+        return out
+    
+    def _predict_chunk(self, X: np.ndarray) -> np.ndarray:
+        n = len(X)
+        flat = X.ravel()
+        row_base = np.arange(n) * self.n_features
+        node = np.repeat(self.roots[:, None], n, axis=1)
+        for _ in range(self.max_depth):
+            x = flat[row_base + self.feature[node]]
+            node = self.child[node] + (x > self.threshold[node])
+        return self.value[node].mean(axis=0)
+
+
+def compiled_path(model_file: str, models_dir: str = MODELS_DIR) -> str:
+    """Location of the compiled artifact exported for a forest pickle."""
+    return os.path.join(models_dir, model_file.replace('.pkl', '_compiled.pkl'))
+
+
+def file_digest(path: str) -> str:
+    """Content hash of a model file, used to tie compiled artifacts to their source."""
+    with open(path, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+class InferenceCache:
+    """
+    LRU cache of per-row model scores.
+    
+    Keys are a hash of the encoded feature row plus the model name and version,
+    so only rows that have not been seen by the current model are scored.
+    """
+    
+    def __init__(self, max_entries: int = 50_000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._row_cost = {}     # model -> smoothed seconds per scored row
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.time_saved = 0.0
+    
+    def score(self, model_name: str, version: str, features: pd.DataFrame, scorer) -> np.ndarray:
+        """Per-row scores for ``features``, calling ``scorer`` only on cache misses."""
+        rows = np.ascontiguousarray(features.to_numpy(dtype=np.float64))
+        prefix = f"{model_name}:{version}:".encode()
+        keys = [hashlib.blake2b(prefix + row.tobytes(), digest_size=16).digest() for row in rows]
+        
+        scores = np.empty(len(keys), dtype=np.float64)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                value = self._entries.get(key)
+                if value is None:
+                    missing.append(i)
+                else:
+                    self._entries.move_to_end(key)
+                    scores[i] = value
+            hit_count = len(keys) - len(missing)
+            self.hits += hit_count
+            self.misses += len(missing)
+            self.time_saved += hit_count * self._row_cost.get(model_name, 0.0)
+        
+        if missing:
+            start = time.perf_counter()
+            fresh = scorer(features.iloc[missing])
+            per_row = (time.perf_counter() - start) / len(missing)
+            scores[missing] = fresh
+            with self._lock:
+                previous = self._row_cost.get(model_name)
+                self._row_cost[model_name] = per_row if previous is None else 0.8 * previous + 0.2 * per_row
+                for i, value in zip(missing, fresh):
+                    self._entries[keys[i]] = float(value)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return scores
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0.0,
+                'entries': len(self._entries),
+                'time_saved_ms': round(self.time_saved * 1000, 1),
+            }
+
 
 class MLModelManager:
-    """Manager class to load and use trained ML models."""
+    """
+    Manager class to load and use trained ML models.
+    
+    Models and encoders are loaded lazily on first use, so importing this
+    module is cheap. Compiled forests and the sklearn forests are loaded with
+    joblib's mmap_mode, letting several dashboard worker processes share the
+    same read-only pages of the node arrays.
+
+    When models/CURRENT points at a new version, the new models and encoders
+    are loaded completely and then swapped in together, without a restart.
+    """
     
     def __init__(self):
         self.models = {}
         self.encoders = {}
-        self._load_models()
+        self.compiled = {}
+        self.inference_cache = InferenceCache()
+        self.timings = {}
+        # encoder name -> {value unseen in training: rows encoded as -1}
+        self.unseen = {}
+        self.load_error = None
+        self.artifact_version = active_version()
+        self.models_dir = version_dir(self.artifact_version)
+        self.model_version = models_signature(self.models_dir)
+        self._last_model_check = time.monotonic()
+        self._lock = threading.RLock()
+        self._executor = None
+        self.scoring_client = None
     
-    def _load_models(self):
-        """Load all trained models and encoders."""
+    @property
+    def models_loaded(self) -> bool:
+        """True while every model artifact is available and none failed to load."""
+        if self.load_error is not None:
+            return False
+        files = list(MODEL_FILES.values()) + list(ENCODER_FILES.values())
+        return all(os.path.exists(os.path.join(self.models_dir, f)) for f in files)
+    
+    def _check_model_files(self):
+        """Switch models when models/CURRENT or the active model files change."""
+        now = time.monotonic()
+        if now - self._last_model_check < MODEL_CHECK_INTERVAL:
+            return
+        self._last_model_check = now
+        version = active_version()
+        models_dir = version_dir(version)
+        signature = models_signature(models_dir)
+        if signature == self.model_version:
+            return
+        if version == self.artifact_version:
+            # Files replaced in place: reload lazily, as before versioning
+            print("Model files changed, reloading models on next use...")
+            with self._lock:
+                self.models.clear()
+                self.encoders.clear()
+                self.compiled.clear()
+                self.load_error = None
+                self.model_version = signature
+            self.inference_cache.clear()
+            return
+        self.swap_version(version, models_dir, signature)
+
+    def swap_version(self, version, models_dir=None, signature=None):
+        """Load every model and encoder of a version, then switch to it in one step.
+
+        Scoring keeps using the current version while the new one loads; if
+        any artifact fails to load, the current version stays active.
+        """
+        models_dir = models_dir or version_dir(version)
+        signature = signature or models_signature(models_dir)
+        start = time.perf_counter()
         try:
-            # Load ML models
-            self.models['production_risk'] = joblib.load(
-                os.path.join(MODELS_DIR, 'production_risk_rf_model.pkl')
-            )
-            self.models['supplier_delay'] = joblib.load(
-                os.path.join(MODELS_DIR, 'supplier_delay_rf_model.pkl')
-            )
-            self.models['efficiency'] = joblib.load(
-                os.path.join(MODELS_DIR, 'efficiency_lr_model.pkl')
-            )
-            
-            # Load label encoders
-            self.encoders['machine_id'] = joblib.load(
-                os.path.join(MODELS_DIR, 'le_machine_id.pkl')
-            )
-            self.encoders['supplier_id'] = joblib.load(
-                os.path.join(MODELS_DIR, 'le_supplier_id.pkl')
-            )
-            self.encoders['material_type'] = joblib.load(
-                os.path.join(MODELS_DIR, 'le_material_type.pkl')
-            )
-            self.encoders['transportation_status'] = joblib.load(
-                os.path.join(MODELS_DIR, 'le_transportation_status.pkl')
-            )
-            
-            print("All ML models loaded successfully!")
-            self.models_loaded = True
-            
-        except FileNotFoundError as e:
-            print(f"Model file not found: {e}")
-            self.models_loaded = False
+            models = {name: joblib.load(os.path.join(models_dir, f), mmap_mode='r')
+                      for name, f in MODEL_FILES.items()}
+            encoders = {name: joblib.load(os.path.join(models_dir, f))
+                        for name, f in ENCODER_FILES.items()}
         except Exception as e:
-            print(f"Error loading models: {e}")
-            self.models_loaded = False
+            print(f"Model version {version} not activated: {e}")
+            self.model_version = signature   # do not retry until the files change again
+            return False
+        with self._lock:
+            self.models, self.encoders, self.compiled = models, encoders, {}
+            self.models_dir = models_dir
+            self.artifact_version = version
+            self.model_version = signature
+            self.load_error = None
+        self.inference_cache.clear()
+        print(f"Switched to model version {version or 'models/'} "
+              f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return True
+    
+    def _record_timing(self, name: str, key: str, seconds: float):
+        self.timings.setdefault(name, {})[key] = round(seconds * 1000, 2)
+    
+    def _load_artifact(self, store: dict, name: str, filename: str, mmap: bool = False):
+        """Load one joblib artifact into ``store`` the first time it is needed."""
+        artifact = store.get(name)
+        if artifact is not None:
+            return artifact
+        with self._lock:
+            if name not in store:
+                start = time.perf_counter()
+                try:
+                    store[name] = joblib.load(os.path.join(self.models_dir, filename),
+                                              mmap_mode='r' if mmap else None)
+                except Exception as e:
+                    self.load_error = f"{filename}: {e}"
+                    print(f"Error loading {filename}: {e}")
+                    raise
+                self._record_timing(name, 'load_ms', time.perf_counter() - start)
+            return store[name]
+    
+    def _model(self, name: str):
+        return self._load_artifact(self.models, name, MODEL_FILES[name], mmap=True)
+    
+    def _encoder(self, name: str):
+        return self._load_artifact(self.encoders, name, ENCODER_FILES[name])
+    
+    def _compiled_forest(self, name: str) -> CompiledForest:
+        """Exported packed forest, compiled in memory if it is missing or stale."""
+        compiled = self.compiled.get(name)
+        if compiled is not None:
+            return compiled
+        with self._lock:
+            if name not in self.compiled:
+                start = time.perf_counter()
+                model_file = FOREST_FILES[name]
+                source = file_digest(os.path.join(self.models_dir, model_file))
+                path = compiled_path(model_file, self.models_dir)
+                compiled = None
+                if os.path.exists(path):
+                    compiled = CompiledForest.load(path, mmap_mode='r')
+                    if compiled.source != source:
+                        print(f"{os.path.basename(path)} is stale, recompiling in memory.")
+                        compiled = None
+                if compiled is None:
+                    compiled = CompiledForest.from_sklearn(self._model(name), source=source)
+                self.compiled[name] = compiled
+                self._record_timing(name, 'compiled_load_ms', time.perf_counter() - start)
+            return self.compiled[name]
+    
+    def warm_up(self):
+        """Load every model and run one prediction each (fills the startup report)."""
+        production = pd.DataFrame([{
+            'machine_id': self._encoder('machine_id').classes_[0], 'speed_rpm': 850,
+            'downtime_minutes': 0.0, 'temperature_c': 33.0, 'target_output': 90, 'actual_output': 85
+        }])
+        supplier = pd.DataFrame([{
+            'supplier_id': self._encoder('supplier_id').classes_[0],
+            'material_type': self._encoder('material_type').classes_[0],
+            'order_quantity': 1000, 'price_per_kg': 150.0,
+            'transportation_status': self._encoder('transportation_status').classes_[0]
+        }])
+        self._positive_proba('production_risk', self._production_features(production))
+        self._positive_proba('supplier_delay', self._supplier_features(supplier))
+        self.predict_efficiency(850, 0.0, 33.0, 90)
+    
+    def get_startup_report(self) -> dict:
+        """Import, load and first-prediction latency (ms) per model and encoder."""
+        return {
+            'import_ms': round(IMPORT_SECONDS * 1000, 2),
+            'models': {name: dict(t) for name, t in self.timings.items()},
+        }
     
     def predict_production_risk(self, df: pd.DataFrame) -> dict:
         """
@@ -67,57 +514,7 @@ class MLModelManager:
         Returns:
             dict with risk_score (0-100), risk_level, and contributing_factors
         """
-        if not self.models_loaded or df.empty:
-            return self._fallback_production_risk(df)
-        
-        try:
-            # Prepare features
-            features = df[['speed_rpm', 'downtime_minutes', 'temperature_c', 'target_output']].copy()
-            
-            # Encode machine_id
-            machine_encoded = self.encoders['machine_id'].transform(df['machine_id'])
-            features['machine_id_encoded'] = machine_encoded
-            
-            # Get predictions (probability of risk)
-            risk_probs = self.models['production_risk'].predict_proba(features)
-            
-            # Average risk probability across all records (class 1 = risk)
-            if risk_probs.shape[1] > 1:
-                avg_risk_score = risk_probs[:, 1].mean() * 100
-            else:
-                avg_risk_score = risk_probs[:, 0].mean() * 100
-            
-            # Determine risk level
-            if avg_risk_score > 70:
-                risk_level = "CRITICAL"
-            elif avg_risk_score > 50:
-                risk_level = "HIGH"
-            elif avg_risk_score > 30:
-                risk_level = "MEDIUM"
-            else:
-                risk_level = "LOW"
-            
-            # Feature importance for explainability
-            if hasattr(self.models['production_risk'], 'feature_importances_'):
-                importances = self.models['production_risk'].feature_importances_
-                feature_names = ['speed_rpm', 'downtime_minutes', 'temperature_c', 'target_output', 'machine_id']
-                contributing_factors = {
-                    name: f"{imp*100:.1f}% impact" 
-                    for name, imp in zip(feature_names, importances)
-                }
-            else:
-                contributing_factors = self._get_heuristic_factors(df)
-            
-            return {
-                'risk_score': round(avg_risk_score, 1),
-                'risk_level': risk_level,
-                'contributing_factors': contributing_factors,
-                'model_used': 'Random Forest Classifier'
-            }
-            
-        except Exception as e:
-            print(f"Prediction error: {e}")
-            return self._fallback_production_risk(df)
+        return self.score_production(df)['summary']
     
     def predict_supplier_delay(self, df: pd.DataFrame) -> dict:
         """
@@ -130,66 +527,302 @@ class MLModelManager:
         Returns:
             dict with delay_probability, risk_level, and breakdown by supplier
         """
-        if not self.models_loaded or df.empty:
-            return self._fallback_supplier_delay(df)
+        return self.score_suppliers(df)['summary']
+
+    def score_production(self, df: pd.DataFrame) -> dict:
+        """
+        Score every production record in one pass.
+        
+        Args:
+            df: DataFrame with the columns listed in predict_production_risk
+        
+        Returns:
+            dict with
+              rows: DataFrame aligned with df.index [risk_probability (0-100), risk_level]
+              entities: per-machine DataFrame [machine_id, records, mean_risk,
+                        max_risk, latest_risk, risk_level]
+              summary: the predict_production_risk result
+        """
+        return self._score('production', df)
+
+    def score_suppliers(self, df: pd.DataFrame) -> dict:
+        """
+        Score every supplier order in one pass.
         
+        Args:
+            df: DataFrame with the columns listed in predict_supplier_delay
+        
+        Returns:
+            dict with
+              rows: DataFrame aligned with df.index [risk_probability (0-100), risk_level]
+              entities: per-supplier DataFrame [supplier_id, records, mean_risk,
+                        max_risk, latest_risk, risk_level]
+              summary: the predict_supplier_delay result
+        """
+        return self._score('supplier', df)
+
+    def submit_scores(self, kind: str, df: pd.DataFrame) -> Future:
+        """
+        Score asynchronously.
+        
+        Args:
+            kind: 'production' or 'supplier'
+            df: frame to score
+        
+        Returns:
+            Future resolving to the score_production / score_suppliers result
+        """
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='scoring')
+        return self._executor.submit(self._score, kind, df)
+
+    def use_scoring_service(self, address: str, authkey: bytes = None, timeout: float = 5.0):
+        """Send scoring requests to a scoring_service.py worker pool, falling back to in-process."""
+        from scoring_service import ScoringClient, AUTHKEY
         try:
-            # Prepare features
-            features = pd.DataFrame()
-            features['supplier_id_encoded'] = self.encoders['supplier_id'].transform(df['supplier_id'])
-            features['material_type_encoded'] = self.encoders['material_type'].transform(df['material_type'])
-            features['order_quantity'] = df['order_quantity']
-            features['price_per_kg'] = df['price_per_kg']
-            # Map statuses to expected labels (resilience against stream variations)
-            status_map = {
-                'in-transit': 'In Transit',
-                'arrived': 'Delivered',
-                'Delivered': 'Delivered',
-                'In Transit': 'In Transit',
-                'delayed': 'delayed'
-            }
-            mapped_status = df['transportation_status'].map(lambda x: status_map.get(x, x))
-            
-            features['transportation_status_encoded'] = self.encoders['transportation_status'].transform(
-                mapped_status
-            )
-            
-            # Get predictions
-            delay_probs = self.models['supplier_delay'].predict_proba(features)
-            
-            # Average delay probability
-            if delay_probs.shape[1] > 1:
-                avg_delay_prob = delay_probs[:, 1].mean() * 100
-            else:
-                avg_delay_prob = delay_probs[:, 0].mean() * 100
-            
-            # Risk level
-            if avg_delay_prob > 60:
-                risk_level = "HIGH RISK"
-            elif avg_delay_prob > 40:
-                risk_level = "MODERATE"
-            else:
-                risk_level = "LOW RISK"
-            
-            # Per-supplier breakdown
-            df_copy = df.copy()
-            if delay_probs.shape[1] > 1:
-                df_copy['delay_prob'] = delay_probs[:, 1] * 100
+            self.scoring_client = ScoringClient(address, authkey or AUTHKEY, timeout=timeout)
+        except ValueError as e:
+            print(f"Scoring service disabled: {e}")
+
+    def _score(self, kind: str, df: pd.DataFrame) -> dict:
+        if self.scoring_client is not None and not df.empty:
+            result = self.scoring_client.try_score(kind, df)
+            if result is not None:
+                return result
+        return self.score_many(kind, [df])[0]
+
+    def score_many(self, kind: str, frames: list) -> list:
+        """
+        Score several frames of the same kind with a single model call.
+        
+        Used by the scoring service to batch requests from many sessions.
+        Returns one score_* result per frame, in input order.
+        """
+        (model_name, entity_col, classifier, make_features, summarize,
+         heuristic_scores, fallback, error_label) = self._kind_spec(kind)
+        
+        results = [None] * len(frames)
+        pending = []
+        for i, frame in enumerate(frames):
+            if frame.empty:
+                results[i] = self._scores(frame, np.array([]), entity_col, classifier, fallback(frame))
             else:
-                df_copy['delay_prob'] = delay_probs[:, 0] * 100
-            
-            supplier_risk = df_copy.groupby('supplier_id')['delay_prob'].mean().to_dict()
-            
-            return {
-                'delay_probability': round(avg_delay_prob, 1),
-                'risk_level': risk_level,
-                'supplier_breakdown': {k: f"{v:.1f}%" for k, v in supplier_risk.items()},
-                'model_used': 'Random Forest Classifier'
+                pending.append(i)
+        if not pending:
+            return results
+        
+        def model_scores(frame, frame_probs):
+            # The forest only knows the ids it was trained on; anything else gets the heuristic
+            unseen = ~frame[entity_col].isin(self._encoder(entity_col).classes_).to_numpy()
+            if unseen.any():
+                frame_probs = np.where(unseen, heuristic_scores(frame), frame_probs)
+            return self._scores(frame, frame_probs, entity_col, classifier,
+                                summarize(frame, frame_probs), unseen)
+
+        if self.models_loaded:
+            try:
+                combined = pd.concat([frames[i] for i in pending], ignore_index=True)
+                probs = self._cached_proba(model_name, make_features(combined)) * 100
+                offset = 0
+                scored = {}
+                for i in pending:
+                    scored[i] = model_scores(frames[i], probs[offset:offset + len(frames[i])])
+                    offset += len(frames[i])
+                for i, result in scored.items():
+                    results[i] = result
+                return results
+            except Exception as e:
+                print(f"{error_label} (batch of {len(pending)}), retrying frame by frame: {e}")
+
+        # One bad frame must not send the whole batch (every session) to the heuristic
+        for i in pending:
+            if self.models_loaded:
+                try:
+                    probs = self._cached_proba(model_name, make_features(frames[i])) * 100
+                    results[i] = model_scores(frames[i], probs)
+                    continue
+                except Exception as e:
+                    print(f"{error_label}: {e}")
+            results[i] = self._scores(frames[i], heuristic_scores(frames[i]), entity_col,
+                                      classifier, fallback(frames[i]))
+        return results
+
+    def _kind_spec(self, kind: str) -> tuple:
+        """Model, entity column, classifier and helper methods for a scoring kind."""
+        if kind == 'production':
+            return ('production_risk', 'machine_id', PRODUCTION_RISK_LEVEL,
+                    self._production_features, self._summarize_production,
+                    self._heuristic_production_scores, self._fallback_production_risk,
+                    "Prediction error")
+        if kind == 'supplier':
+            return ('supplier_delay', 'supplier_id', SUPPLIER_DELAY_LEVEL,
+                    self._supplier_features, self._summarize_suppliers,
+                    self._heuristic_supplier_scores, self._fallback_supplier_delay,
+                    "Supplier prediction error")
+        raise ValueError(f"Unknown scoring kind: {kind}")
+
+    def _production_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Model input for the production risk forest."""
+        features = df[['speed_rpm', 'downtime_minutes', 'temperature_c', 'target_output']].copy()
+        
+        # Encode machine_id
+        features['machine_id_encoded'] = self._encode('machine_id', df['machine_id'])
+        return features
+
+    def _supplier_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Model input for the supplier delay forest."""
+        features = pd.DataFrame(index=df.index)
+        features['supplier_id_encoded'] = self._encode('supplier_id', df['supplier_id'])
+        features['material_type_encoded'] = self._encode('material_type', df['material_type'])
+        features['order_quantity'] = df['order_quantity']
+        features['price_per_kg'] = df['price_per_kg']
+        mapped_status = normalize_transport_status(df['transportation_status'])
+        features['transportation_status_encoded'] = self._encode('transportation_status', mapped_status)
+        return features
+
+    def _encode(self, name: str, values: pd.Series) -> np.ndarray:
+        """LabelEncoder codes; values unseen in training (e.g. extra simulated machines) map to -1.
+
+        Unseen values are counted in ``unseen`` and each one is logged the
+        first time it appears. Rows with an unseen machine or supplier id are
+        rescored by the heuristic in score_many.
+        """
+        classes = self._encoder(name).classes_
+        codes = pd.Categorical(values, categories=classes).codes.astype(np.int64)
+        missing = (codes < 0) & pd.notna(values).to_numpy()
+        if missing.any():
+            counts = pd.Series(values.to_numpy()[missing]).value_counts()
+            with self._lock:
+                seen = self.unseen.setdefault(name, {})
+                new = [value for value in counts.index if value not in seen]
+                for value, rows in counts.items():
+                    seen[value] = seen.get(value, 0) + int(rows)
+            if new:
+                logger.warning("Unseen %s values %s encoded as -1: not in the training data, "
+                               "retrain to score them properly", name, sorted(map(str, new)))
+        return codes
+
+    def _cached_proba(self, model_name: str, features: pd.DataFrame) -> np.ndarray:
+        """_positive_proba through the inference cache, scoring only unseen rows."""
+        self._check_model_files()
+        return self.inference_cache.score(
+            model_name, self.model_version, features,
+            lambda missing: self._positive_proba(model_name, missing)
+        )
+
+    def _positive_proba(self, model_name: str, features: pd.DataFrame) -> np.ndarray:
+        """Probability of the positive class (class 1 = risk / delay) for every row."""
+        # The packed evaluator wins at dashboard batch sizes; sklearn's Cython
+        # traversal is faster again for very large batches
+        if len(features) <= COMPILED_MAX_ROWS:
+            predict = self._compiled_forest(model_name).predict_positive
+        else:
+            model = self._model(model_name)
+            predict = lambda X: model.predict_proba(X)[:, -1]
+        start = time.perf_counter()
+        probs = predict(features)
+        if 'first_prediction_ms' not in self.timings.get(model_name, {}):
+            self._record_timing(model_name, 'first_prediction_ms', time.perf_counter() - start)
+        return probs
+
+    def _summarize_production(self, df: pd.DataFrame, probs: np.ndarray) -> dict:
+        """predict_production_risk result from per-row risk scores (0-100)."""
+        # Average risk probability across all records
+        avg_risk_score = float(probs.mean())
+        
+        # Feature importance for explainability
+        importances = self._compiled_forest('production_risk').feature_importances
+        if importances is None:
+            importances = getattr(self._model('production_risk'), 'feature_importances_', None)
+        if importances is not None:
+            feature_names = ['speed_rpm', 'downtime_minutes', 'temperature_c', 'target_output', 'machine_id']
+            contributing_factors = {
+                name: f"{imp*100:.1f}% impact" 
+                for name, imp in zip(feature_names, importances)
             }
-            
-        except Exception as e:
-            print(f"Supplier prediction error: {e}")
-            return self._fallback_supplier_delay(df)
+        else:
+            contributing_factors = self._get_heuristic_factors(df)
+        
+        return {
+            'risk_score': round(avg_risk_score, 1),
+            'risk_level': PRODUCTION_RISK_LEVEL.label(avg_risk_score),
+            'contributing_factors': contributing_factors,
+            'model_used': 'Random Forest Classifier'
+        }
+
+    def _summarize_suppliers(self, df: pd.DataFrame, probs: np.ndarray) -> dict:
+        """predict_supplier_delay result from per-row delay probabilities (0-100)."""
+        avg_delay_prob = float(probs.mean())
+        
+        # Per-supplier breakdown
+        supplier_risk = pd.Series(probs, index=df.index).groupby(df['supplier_id']).mean().to_dict()
+        
+        return {
+            'delay_probability': round(avg_delay_prob, 1),
+            'risk_level': SUPPLIER_DELAY_LEVEL.label(avg_delay_prob),
+            'supplier_breakdown': {k: f"{v:.1f}%" for k, v in supplier_risk.items()},
+            'model_used': 'Random Forest Classifier'
+        }
+
+    def scores_from_alerts(self, kind: str, alerts: pd.DataFrame, df: pd.DataFrame) -> dict:
+        """
+        score_* result from the streams' latest risk_alerts row per entity.
+        
+        The streams score every record once at ingestion and each alert holds
+        the entity's smoothed score (0-1), so here every entity counts as one
+        row whose mean, max and latest risk are that score. ``df`` is the live
+        window; it only feeds the heuristic factors when no model is loaded.
+        """
+        _, entity_col, classifier = self._kind_spec(kind)[:3]
+        latest = alerts[alerts['risk_type'] == kind]
+        frame = pd.DataFrame({entity_col: latest['entity_id'].to_numpy()})
+        probs = latest['risk_score'].to_numpy(dtype=float) * 100
+        if kind == 'production':
+            summary = self._summarize_production(df, probs)
+        else:
+            summary = self._summarize_suppliers(frame, probs)
+        summary['model_used'] = 'Stream risk alerts (scored at ingestion)'
+        return self._scores(frame, probs, entity_col, classifier, summary)
+
+    def _scores(self, df: pd.DataFrame, probs: np.ndarray, entity_col: str,
+                classifier, summary: dict, unseen: np.ndarray = None) -> dict:
+        """Assemble the columnar score_* result from per-row scores.
+
+        ``unseen`` flags rows whose id the model never saw in training; they
+        were scored by the heuristic and are marked ``unseen_id``.
+        """
+        rows = pd.DataFrame({'risk_probability': probs}, index=df.index)
+        rows['risk_level'] = classifier.classify(rows['risk_probability'])
+        rows['unseen_id'] = np.zeros(len(df), dtype=bool) if unseen is None else unseen
+        
+        if df.empty:
+            entities = pd.DataFrame(columns=[entity_col, 'records', 'mean_risk', 'max_risk',
+                                             'latest_risk', 'risk_level', 'unseen_id'])
+        else:
+            # Input frames are newest-first, so "first" is the latest record per entity
+            entities = rows[['risk_probability', 'unseen_id']].groupby(df[entity_col].to_numpy()).agg(
+                records=('risk_probability', 'size'), mean_risk=('risk_probability', 'mean'),
+                max_risk=('risk_probability', 'max'), latest_risk=('risk_probability', 'first'),
+                unseen_id=('unseen_id', 'any')
+            ).rename_axis(entity_col).reset_index()
+            entities['risk_level'] = classifier.classify(entities['mean_risk'])
+            entities = entities[[entity_col, 'records', 'mean_risk', 'max_risk',
+                                 'latest_risk', 'risk_level', 'unseen_id']]
+        
+        return {'rows': rows, 'entities': entities, 'summary': summary}
+
+    def _heuristic_supplier_scores(self, df: pd.DataFrame) -> np.ndarray:
+        """Per-row version of the supplier fallback: 100 for delayed shipments, else 0."""
+        return (df['transportation_status'] == 'delayed').to_numpy(dtype=float) * 100
+
+    def _heuristic_production_scores(self, df: pd.DataFrame) -> np.ndarray:
+        """Per-row version of the causal fallback heuristic (0-99)."""
+        stress = (df['temperature_c'] - 30) * (df['speed_rpm'] / 1000)
+        downtime = df['downtime_minutes']
+        scores = 15 + (stress - 5).clip(lower=0) * 8 + downtime.where(downtime > 0.5, 0) * 15
+        return scores.clip(0, 99).to_numpy(dtype=float)
     
     def predict_efficiency(self, speed_rpm: float, downtime_minutes: float, 
                           temperature_c: float, target_output: int) -> dict:
@@ -210,7 +843,11 @@ class MLModelManager:
         
         try:
             features = np.array([[speed_rpm, downtime_minutes, temperature_c, target_output]])
-            predicted = self.models['efficiency'].predict(features)[0]
+            model = self._model('efficiency')
+            start = time.perf_counter()
+            predicted = model.predict(features)[0]
+            if 'first_prediction_ms' not in self.timings.get('efficiency', {}):
+                self._record_timing('efficiency', 'first_prediction_ms', time.perf_counter() - start)
             
             # Clamp to realistic range
             predicted = max(min(predicted, 120), 40)
@@ -228,10 +865,17 @@ class MLModelManager:
         """Get information about loaded models."""
         info = {
             'models_loaded': self.models_loaded,
-            'production_risk_model': type(self.models.get('production_risk', None)).__name__,
-            'supplier_delay_model': type(self.models.get('supplier_delay', None)).__name__,
-            'efficiency_model': type(self.models.get('efficiency', None)).__name__,
-            'encoders_loaded': list(self.encoders.keys())
+            'production_risk_model': MODEL_TYPES['production_risk'],
+            'supplier_delay_model': MODEL_TYPES['supplier_delay'],
+            'efficiency_model': MODEL_TYPES['efficiency'],
+            'models_in_memory': list(self.models.keys()) + [f"{k} (compiled)" for k in self.compiled],
+            'encoders_loaded': list(self.encoders.keys()),
+            'model_version': self.model_version,
+            'artifact_version': self.artifact_version,
+            'manifest': read_manifest(self.artifact_version),
+            'inference_cache': self.inference_cache.stats(),
+            'scoring_service': self.scoring_client.stats() if self.scoring_client else None,
+            'unseen_categories': {name: dict(values) for name, values in self.unseen.items() if values},
         }
         return info
     
@@ -265,7 +909,7 @@ class MLModelManager:
         # Cap at 99
         risk_score = min(max(risk_score, 0), 99)
         
-        risk_level = "CRITICAL" if risk_score > 70 else "HIGH" if risk_score > 50 else "MEDIUM" if risk_score > 30 else "LOW"
+        risk_level = PRODUCTION_RISK_LEVEL.label(risk_score)
         
         return {
             'risk_score': round(risk_score, 1),
@@ -289,7 +933,7 @@ class MLModelManager:
         
         return {
             'delay_probability': round(delay_prob, 1),
-            'risk_level': 'HIGH RISK' if delay_prob > 60 else 'MODERATE' if delay_prob > 40 else 'LOW RISK',
+            'risk_level': SUPPLIER_DELAY_LEVEL.label(delay_prob),
             'supplier_breakdown': {},
             'model_used': 'Heuristic Fallback'
         }
@@ -306,8 +950,12 @@ class MLModelManager:
         }
 
 
-# Singleton instance for easy import
+# Singleton instance for easy import (cheap: models load on first use)
 model_manager = MLModelManager()
+if SCORING_SERVICE_ADDRESS:
+    model_manager.use_scoring_service(SCORING_SERVICE_ADDRESS)
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
 
 
 # Legacy compatibility functions
@@ -320,3 +968,9 @@ def predict_supplier_risk(df):
     """Legacy function for backward compatibility."""
     result = model_manager.predict_supplier_delay(df)
     return result['delay_probability'], result['risk_level']
+
+
+if __name__ == '__main__':
+    import json
+    model_manager.warm_up()
+    print(json.dumps(model_manager.get_startup_report(), indent=2))
@@ -1,102 +1,394 @@
 """
-Retrain and re-save all ML models using the current sklearn version.
-Run this once to eliminate InconsistentVersionWarning on model load.
+Retrain the ML models and save them as a new versioned artifact set.
+
+Training rows are streamed from the Parquet history (history_store.py) in
+chunks and uniformly sampled down to --max-rows per table, so the full
+history never has to fit in memory. Labels:
+
+- production risk: thermal stress ((temperature_c - 30) * speed_rpm / 1000)
+  above 5 or downtime above 2 minutes, the same target as the original models
+- supplier delay: delivered after the expected date. The original target
+  (status 'delayed' or order_quantity > 350) is not used: the streams order
+  500-2000 units, so every row would be labelled delayed
+- efficiency: actual / target output in percent
+
+Each model's label is recorded in the manifest and shown on the dashboard.
+
+The newest --holdout fraction of rows (by timestamp) is kept out of training
+and used for the metrics in the manifest. Forest hyperparameters are searched
+in a process pool (workers read the search arrays memory-mapped), and the
+final forests are fitted with n_jobs across cores.
+
+Each run writes models/versions/<version>/ with every model, encoder and
+compiled forest plus a manifest.json (metrics, feature schema, training
+time), then points models/CURRENT at it. Running dashboards and scoring
+workers switch to the new version on their next model check.
+
+Usage:
+    python retrain_models.py [--days 30] [--max-rows 1000000] [--workers 4]
+    python retrain_models.py --source synthetic --rows 200000
+    python retrain_models.py --list
+    python retrain_models.py --activate 20261017T031500Z
+    python retrain_models.py --export-only
 """
+import argparse
+import json
 import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import product
+
 import joblib
 import numpy as np
 import pandas as pd
+import sklearn
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LinearRegression
+from sklearn.metrics import (accuracy_score, f1_score, mean_absolute_error, mean_squared_error,
+                             precision_score, r2_score, recall_score, roc_auc_score)
 from sklearn.preprocessing import LabelEncoder
 
-MODELS_DIR = os.path.join(os.path.dirname(__file__), 'models')
-os.makedirs(MODELS_DIR, exist_ok=True)
-
-np.random.seed(42)
-N = 2000
-
-# ── PRODUCTION RISK DATASET ──────────────────────────────────────────────────
-machine_ids = ['M1', 'M2', 'M3']
-le_machine = LabelEncoder().fit(machine_ids)
-
-speed_rpm      = np.random.uniform(700, 1000, N)
-temperature_c  = np.random.uniform(28, 42, N)
-downtime_min   = np.random.exponential(1.2, N)
-target_output  = np.random.randint(80, 150, N)
-machine_id_raw = np.random.choice(machine_ids, N)
-machine_enc    = le_machine.transform(machine_id_raw)
-
-# label: risk when thermal stress is high or downtime > 2 min
-thermal_stress = (temperature_c - 30) * (speed_rpm / 1000)
-at_risk = ((thermal_stress > 5) | (downtime_min > 2.0)).astype(int)
-
-# Use DataFrame to keep feature names
-X_prod = pd.DataFrame({
-    'speed_rpm': speed_rpm,
-    'downtime_minutes': downtime_min,
-    'temperature_c': temperature_c,
-    'target_output': target_output,
-    'machine_id_encoded': machine_enc
-})
-
-rf_prod = RandomForestClassifier(n_estimators=200, max_depth=10,
-                                  class_weight='balanced', random_state=42)
-rf_prod.fit(X_prod, at_risk)
-joblib.dump(rf_prod, os.path.join(MODELS_DIR, 'production_risk_rf_model.pkl'))
-joblib.dump(le_machine, os.path.join(MODELS_DIR, 'le_machine_id.pkl'))
-print("  [OK] production_risk_rf_model.pkl  +  le_machine_id.pkl")
-
-# ── SUPPLIER DELAY DATASET ───────────────────────────────────────────────────
-supplier_ids   = ['S1', 'S2', 'S3']
-material_types = ['Cotton', 'Yarn', 'Dyes']
-trans_statuses = ["in-transit", "delayed", "arrived"]
-
-le_sup  = LabelEncoder().fit(supplier_ids)
-le_mat  = LabelEncoder().fit(material_types)
-le_trans = LabelEncoder().fit(trans_statuses)
-
-sup_id_raw   = np.random.choice(supplier_ids,   N)
-mat_raw      = np.random.choice(material_types, N)
-trans_raw    = np.random.choice(trans_statuses, N)
-order_qty    = np.random.randint(50, 500, N)
-price_per_kg = np.random.uniform(2.0, 15.0, N)
-
-sup_enc   = le_sup.transform(sup_id_raw)
-mat_enc   = le_mat.transform(mat_raw)
-trans_enc = le_trans.transform(trans_raw)
-
-# delayed if status is 'delayed' or order_qty > 350
-delayed = ((trans_raw == 'delayed') | (order_qty > 350)).astype(int)
-
-# Use DataFrame to keep feature names
-X_sup = pd.DataFrame({
-    'supplier_id_encoded': sup_enc,
-    'material_type_encoded': mat_enc,
-    'order_quantity': order_qty,
-    'price_per_kg': price_per_kg,
-    'transportation_status_encoded': trans_enc
-})
-
-rf_sup = RandomForestClassifier(n_estimators=200, max_depth=10,
-                                 class_weight='balanced', random_state=42)
-rf_sup.fit(X_sup, delayed)
-joblib.dump(rf_sup, os.path.join(MODELS_DIR, 'supplier_delay_rf_model.pkl'))
-joblib.dump(le_sup,   os.path.join(MODELS_DIR, 'le_supplier_id.pkl'))
-joblib.dump(le_mat,   os.path.join(MODELS_DIR, 'le_material_type.pkl'))
-joblib.dump(le_trans, os.path.join(MODELS_DIR, 'le_transportation_status.pkl'))
-print("  [OK] supplier_delay_rf_model.pkl  +  encoders")
-
-# ── EFFICIENCY DATASET ───────────────────────────────────────────────────────
-actual_output = target_output * (0.7 + 0.35 * np.random.rand(N))
-actual_output -= downtime_min * 3
-efficiency = np.clip((actual_output / target_output) * 100, 40, 120)
-
-X_eff = np.column_stack([speed_rpm, downtime_min, temperature_c, target_output])
-lr_eff = LinearRegression()
-lr_eff.fit(X_eff, efficiency)
-joblib.dump(lr_eff, os.path.join(MODELS_DIR, 'efficiency_lr_model.pkl'))
-print("  [OK] efficiency_lr_model.pkl")
-
-print("\n[DONE] All models retrained and saved with sklearn", end=" ")
-import sklearn; print(sklearn.__version__)
+from model_inference import (CompiledForest, ENCODER_FILES, FEATURE_COLUMNS, FOREST_FILES,
+                             MANIFEST_FILE, MODEL_FILES, MODEL_TYPES, VERSIONS_DIR, activate_version,
+                             active_version, compiled_path, file_digest, list_versions,
+                             normalize_transport_status, read_manifest, version_dir)
+
+# Raw columns read from the history for each table
+HISTORY_COLUMNS = {
+    'production_data': ['timestamp', 'machine_id', 'speed_rpm', 'downtime_minutes', 'temperature_c',
+                        'target_output', 'actual_output'],
+    'supplier_data': ['timestamp', 'supplier_id', 'material_type', 'order_quantity', 'price_per_kg',
+                      'transportation_status', 'expected_delivery_date', 'actual_delivery_date'],
+}
+
+# Forest search space; candidates use SEARCH_TREES trees, the final fit FINAL_TREES
+SEARCH_GRID = {'max_depth': [8, 12, None], 'min_samples_leaf': [1, 5]}
+SEARCH_TREES = 100
+FINAL_TREES = 200
+
+
+def export_compiled_forest(model, model_file, models_dir):
+    """Flatten a fitted forest into packed node arrays next to its pickle."""
+    source = file_digest(os.path.join(models_dir, model_file))
+    CompiledForest.from_sklearn(model, source=source).save(compiled_path(model_file, models_dir))
+    print(f"  [OK] {model_file.replace('.pkl', '_compiled.pkl')}")
+
+
+# ── TRAINING DATA ────────────────────────────────────────────────────────────
+def sample_history(table, start=None, max_rows=1_000_000, batch_rows=250_000, seed=42):
+    """Uniform sample of at most ~max_rows history rows, read chunk by chunk."""
+    from history_store import history_store
+    total = history_store.count_rows(table, start)
+    if total == 0:
+        return pd.DataFrame(columns=HISTORY_COLUMNS[table]), 0
+    fraction = min(1.0, max_rows / total)
+    rng = np.random.default_rng(seed)
+    parts = []
+    for batch in history_store.iter_batches(table, start=start, columns=HISTORY_COLUMNS[table],
+                                            batch_size=batch_rows):
+        if fraction < 1.0:
+            batch = batch[rng.random(len(batch)) < fraction]
+        parts.append(batch)
+    return pd.concat(parts, ignore_index=True), total
+
+
+def synthetic_frames(rows, seed=42):
+    """Production and supplier rows from the bulk generator, shaped like the history."""
+    from streaming.bulk_generator import BulkGenerator
+    generator = BulkGenerator(seed)
+    return generator.production(rows), generator.supplier(rows)
+
+
+def _encoder(values):
+    return LabelEncoder().fit(pd.Series(values).astype(str).unique())
+
+
+def production_dataset(df):
+    """Features, risk labels, efficiency targets and the machine encoder for production rows."""
+    df = df.dropna(subset=['machine_id'])
+    numeric = {col: pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy(np.float32)
+               for col in ['speed_rpm', 'downtime_minutes', 'temperature_c', 'target_output',
+                           'actual_output']}
+    le_machine = _encoder(df['machine_id'])
+    efficiency = numeric['actual_output'] / np.where(numeric['target_output'] == 0, 1,
+                                                     numeric['target_output']) * 100
+    X = np.column_stack([numeric[c] for c in FEATURE_COLUMNS['efficiency']] +
+                        [le_machine.transform(df['machine_id'].astype(str))]).astype(np.float32)
+    thermal_stress = (numeric['temperature_c'] - 30) * (numeric['speed_rpm'] / 1000)
+    at_risk = ((thermal_stress > 5) | (numeric['downtime_minutes'] > 2)).astype(np.int8)
+    return X, at_risk, efficiency, _timestamps(df), {'machine_id': le_machine}
+
+
+def supplier_dataset(df):
+    """Features, delay labels and encoders for supplier rows."""
+    df = df.dropna(subset=['supplier_id', 'expected_delivery_date', 'actual_delivery_date'])
+    status = normalize_transport_status(df['transportation_status'])
+    encoders = {'supplier_id': _encoder(df['supplier_id']),
+                'material_type': _encoder(df['material_type']),
+                'transportation_status': _encoder(status)}
+    X = np.column_stack([
+        encoders['supplier_id'].transform(df['supplier_id'].astype(str)),
+        encoders['material_type'].transform(df['material_type'].astype(str)),
+        pd.to_numeric(df['order_quantity'], errors='coerce').fillna(0),
+        pd.to_numeric(df['price_per_kg'], errors='coerce').fillna(0),
+        encoders['transportation_status'].transform(status.astype(str)),
+    ]).astype(np.float32)
+    delay = (pd.to_datetime(df['actual_delivery_date']) - pd.to_datetime(df['expected_delivery_date'])).dt.days
+    delayed = (delay > 0).to_numpy(dtype=np.int8)
+    return X, delayed, _timestamps(df), encoders
+
+
+def _timestamps(df):
+    return pd.to_datetime(df['timestamp'], utc=True, format='ISO8601').to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+
+def time_split(timestamps, holdout):
+    """Boolean mask of training rows: everything older than the newest ``holdout`` fraction."""
+    cutoff = np.quantile(timestamps, 1 - holdout)
+    train = timestamps < cutoff
+    if train.all() or not train.any():   # constant timestamps: fall back to row order
+        train = np.arange(len(timestamps)) < int(len(timestamps) * (1 - holdout))
+    return train
+
+
+# ── HYPERPARAMETER SEARCH ────────────────────────────────────────────────────
+def _fit_candidate(data_path, params, seed):
+    """Fit one search candidate on the memory-mapped search split; returns its validation AUC."""
+    data = joblib.load(data_path, mmap_mode='r')
+    model = RandomForestClassifier(n_estimators=SEARCH_TREES, class_weight='balanced',
+                                   random_state=seed, n_jobs=1, **params)
+    start = time.perf_counter()
+    model.fit(data['X_fit'], data['y_fit'])
+    score = _auc(data['y_val'], model.predict_proba(data['X_val'])[:, -1])
+    return {'params': params, 'val_roc_auc': score, 'fit_seconds': round(time.perf_counter() - start, 2)}
+
+
+def _auc(y, proba):
+    return round(float(roc_auc_score(y, proba)), 4) if len(np.unique(y)) == 2 else None
+
+
+def submit_search(pool, name, X, y, timestamps, workdir, search_rows, seed):
+    """Queue one job per grid point; the candidates share one memory-mapped dataset."""
+    fit = time_split(timestamps, 0.2)
+    rng = np.random.default_rng(seed)
+    fit_idx, val_idx = np.flatnonzero(fit), np.flatnonzero(~fit)
+    if len(fit_idx) > search_rows:
+        fit_idx = np.sort(rng.choice(fit_idx, search_rows, replace=False))
+    if len(val_idx) > search_rows // 4:
+        val_idx = np.sort(rng.choice(val_idx, search_rows // 4, replace=False))
+    data_path = os.path.join(workdir, f"{name}_search.joblib")
+    joblib.dump({'X_fit': X[fit_idx], 'y_fit': y[fit_idx], 'X_val': X[val_idx], 'y_val': y[val_idx]},
+                data_path)
+    grid = [dict(zip(SEARCH_GRID, values)) for values in product(*SEARCH_GRID.values())]
+    return [pool.submit(_fit_candidate, data_path, params, seed) for params in grid]
+
+
+def best_params(futures):
+    results = [f.result() for f in futures]
+    ranked = sorted(results, key=lambda r: -1 if r['val_roc_auc'] is None else r['val_roc_auc'], reverse=True)
+    return ranked[0]['params'], results
+
+
+# ── FINAL FIT AND METRICS ────────────────────────────────────────────────────
+def fit_forest(name, X, y, train, params, n_jobs, seed):
+    model = RandomForestClassifier(n_estimators=FINAL_TREES, class_weight='balanced',
+                                   random_state=seed, n_jobs=n_jobs, **params)
+    start = time.perf_counter()
+    model.fit(pd.DataFrame(X[train], columns=FEATURE_COLUMNS[name]), y[train])
+    fit_seconds = time.perf_counter() - start
+    X_test, y_test = pd.DataFrame(X[~train], columns=FEATURE_COLUMNS[name]), y[~train]
+    proba = model.predict_proba(X_test)[:, -1]
+    predicted = (proba >= 0.5).astype(int)
+    metrics = {
+        'accuracy': round(float(accuracy_score(y_test, predicted)), 4),
+        'precision': round(float(precision_score(y_test, predicted, zero_division=0)), 4),
+        'recall': round(float(recall_score(y_test, predicted, zero_division=0)), 4),
+        'f1': round(float(f1_score(y_test, predicted, zero_division=0)), 4),
+        'roc_auc': _auc(y_test, proba),
+        'positive_rate': round(float(y.mean()), 4),
+    }
+    # Serving runs without a pool: keep the artifact single-threaded
+    model.set_params(n_jobs=None)
+    return model, metrics, fit_seconds
+
+
+def fit_efficiency(X, efficiency, train):
+    X = X[:, :len(FEATURE_COLUMNS['efficiency'])]
+    model = LinearRegression()
+    start = time.perf_counter()
+    model.fit(X[train], efficiency[train])
+    fit_seconds = time.perf_counter() - start
+    predicted = model.predict(X[~train])
+    actual = efficiency[~train]
+    metrics = {
+        'r2': round(float(r2_score(actual, predicted)), 4),
+        'rmse': round(float(np.sqrt(mean_squared_error(actual, predicted))), 4),
+        'mae': round(float(mean_absolute_error(actual, predicted)), 4),
+    }
+    return model, metrics, fit_seconds
+
+
+def feature_schema(name, X):
+    return [{'name': col, 'dtype': str(X.dtype)} for col in FEATURE_COLUMNS[name]]
+
+
+# ── VERSIONED ARTIFACTS ──────────────────────────────────────────────────────
+def write_version(version, models, encoders, manifest):
+    """Write every artifact into a temporary directory, then rename it into place."""
+    os.makedirs(VERSIONS_DIR, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f".{version}-", dir=VERSIONS_DIR)
+    try:
+        for name, model in models.items():
+            joblib.dump(model, os.path.join(staging, MODEL_FILES[name]))
+            if name in FOREST_FILES:
+                export_compiled_forest(model, MODEL_FILES[name], staging)
+        for name, encoder in encoders.items():
+            joblib.dump(encoder, os.path.join(staging, ENCODER_FILES[name]))
+        manifest['files'] = {f: file_digest(os.path.join(staging, f)) for f in sorted(os.listdir(staging))}
+        with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2, default=str)
+        os.replace(staging, os.path.join(VERSIONS_DIR, version))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def train(args):
+    started = time.perf_counter()
+    created = datetime.now(timezone.utc)
+    version = created.strftime('%Y%m%dT%H%M%SZ')
+
+    if args.source == 'history':
+        start = created - pd.Timedelta(days=args.days) if args.days else None
+        prod_df, prod_total = sample_history('production_data', start, args.max_rows, seed=args.seed)
+        sup_df, sup_total = sample_history('supplier_data', start, args.max_rows, seed=args.seed)
+        source = {'kind': 'history', 'start': start, 'rows_available': {
+            'production_data': prod_total, 'supplier_data': sup_total}}
+    else:
+        prod_df, sup_df = synthetic_frames(args.rows, args.seed)
+        source = {'kind': 'synthetic', 'seed': args.seed}
+    source['rows_used'] = {'production_data': len(prod_df), 'supplier_data': len(sup_df)}
+    print(f"Training rows: {len(prod_df):,} production, {len(sup_df):,} supplier "
+          f"({time.perf_counter() - started:.1f}s to load)")
+    if len(prod_df) < args.min_rows or len(sup_df) < args.min_rows:
+        sys.exit(f"Not enough training rows (need {args.min_rows:,} per table). "
+                 "Backfill with `python -m streaming.bulk_generator --history` or use --source synthetic.")
+
+    X_prod, y_risk, efficiency, ts_prod, encoders = production_dataset(prod_df)
+    X_sup, y_delay, ts_sup, sup_encoders = supplier_dataset(sup_df)
+    encoders.update(sup_encoders)
+    del prod_df, sup_df
+    train_prod, train_sup = time_split(ts_prod, args.holdout), time_split(ts_sup, args.holdout)
+
+    # Both searches share one pool; each candidate is a single-threaded fit
+    search = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.no_search:
+            best = {name: {'max_depth': 10, 'min_samples_leaf': 1} for name in FOREST_FILES}
+        else:
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                jobs = {
+                    'production_risk': submit_search(pool, 'production_risk', X_prod[train_prod],
+                                                     y_risk[train_prod], ts_prod[train_prod], workdir,
+                                                     args.search_rows, args.seed),
+                    'supplier_delay': submit_search(pool, 'supplier_delay', X_sup[train_sup],
+                                                    y_delay[train_sup], ts_sup[train_sup], workdir,
+                                                    args.search_rows, args.seed),
+                }
+                best = {}
+                for name, futures in jobs.items():
+                    best[name], search[name] = best_params(futures)
+                    print(f"  {name}: best {best[name]} of {len(futures)} candidates")
+
+    models, entries = {}, {}
+    for name, X, y, train_mask, label in (
+            ('production_risk', X_prod, y_risk, train_prod,
+             "thermal stress (temperature_c - 30) * speed_rpm / 1000 > 5 or downtime_minutes > 2"),
+            ('supplier_delay', X_sup, y_delay, train_sup, "actual_delivery_date after expected_delivery_date")):
+        model, metrics, fit_seconds = fit_forest(name, X, y, train_mask, best[name], args.n_jobs, args.seed)
+        models[name] = model
+        entries[name] = {'file': MODEL_FILES[name], 'type': MODEL_TYPES[name], 'label': label,
+                         'params': {**best[name], 'n_estimators': FINAL_TREES, 'class_weight': 'balanced'},
+                         'features': feature_schema(name, X), 'train_rows': int(train_mask.sum()),
+                         'holdout_rows': int((~train_mask).sum()), 'metrics': metrics,
+                         'fit_seconds': round(fit_seconds, 2), 'search': search.get(name, [])}
+        print(f"  [OK] {MODEL_FILES[name]}  {metrics}")
+
+    model, metrics, fit_seconds = fit_efficiency(X_prod, efficiency, train_prod)
+    models['efficiency'] = model
+    entries['efficiency'] = {'file': MODEL_FILES['efficiency'], 'type': MODEL_TYPES['efficiency'],
+                             'label': "actual_output / target_output * 100",
+                             'features': feature_schema('efficiency', X_prod),
+                             'train_rows': int(train_prod.sum()), 'holdout_rows': int((~train_prod).sum()),
+                             'metrics': metrics, 'fit_seconds': round(fit_seconds, 4)}
+    print(f"  [OK] {MODEL_FILES['efficiency']}  {metrics}")
+
+    manifest = {
+        'version': version,
+        'created': created.isoformat(),
+        'sklearn': sklearn.__version__,
+        'source': source,
+        'holdout': args.holdout,
+        'models': entries,
+        'encoders': {name: {'file': ENCODER_FILES[name], 'classes': [str(c) for c in enc.classes_]}
+                     for name, enc in encoders.items()},
+        'training_seconds': round(time.perf_counter() - started, 2),
+    }
+    write_version(version, models, encoders, manifest)
+    print(f"\n[DONE] Version {version} written to {os.path.join(VERSIONS_DIR, version)} "
+          f"in {manifest['training_seconds']:.1f}s")
+    if args.no_activate:
+        print(f"Activate it with: python retrain_models.py --activate {version}")
+    else:
+        activate_version(version)
+        print(f"Activated {version}; running dashboards switch on their next model check.")
+
+
+def show_versions():
+    current = active_version()
+    for version in list_versions():
+        manifest = read_manifest(version) or {}
+        models = manifest.get('models', {})
+        auc = {name: m['metrics'].get('roc_auc') for name, m in models.items() if 'roc_auc' in m.get('metrics', {})}
+        marker = '*' if version == current else ' '
+        print(f"{marker} {version}  {manifest.get('source', {}).get('kind', '?'):<9} "
+              f"{manifest.get('training_seconds', '?')}s  roc_auc={auc}")
+    if current is None:
+        print("* models/ (unversioned artifacts)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Retrain the models into a new versioned artifact set.")
+    parser.add_argument('--source', choices=['history', 'synthetic'], default='history')
+    parser.add_argument('--days', type=float, default=None, help='only train on the last N days of history')
+    parser.add_argument('--max-rows', type=int, default=1_000_000, help='rows sampled per table from the history')
+    parser.add_argument('--rows', type=int, default=200_000, help='rows per table for --source synthetic')
+    parser.add_argument('--min-rows', type=int, default=500)
+    parser.add_argument('--holdout', type=float, default=0.2, help='newest fraction of rows kept for metrics')
+    parser.add_argument('--search-rows', type=int, default=100_000, help='rows per search candidate fit')
+    parser.add_argument('--no-search', action='store_true', help='skip the hyperparameter search')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='search processes')
+    parser.add_argument('--n-jobs', type=int, default=-1, help='cores used by the final forest fits')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-activate', action='store_true', help='write the version without switching to it')
+    parser.add_argument('--activate', metavar='VERSION', help='switch to an existing version (rollback)')
+    parser.add_argument('--list', action='store_true', help='list versions; * marks the active one')
+    parser.add_argument('--export-only', action='store_true',
+                        help='re-export the compiled forests of the active version')
+    args = parser.parse_args()
+
+    if args.list:
+        show_versions()
+    elif args.activate:
+        activate_version(args.activate)
+        print(f"Activated {args.activate}")
+    elif args.export_only:
+        models_dir = version_dir(active_version())
+        for model_file in FOREST_FILES.values():
+            export_compiled_forest(joblib.load(os.path.join(models_dir, model_file)), model_file, models_dir)
+    else:
+        train(args)
@@ -0,0 +1,334 @@
+"""
+Rollups
+Per-machine and per-supplier aggregates at minute, hour and shift granularity.
+
+Every ingested batch is reduced to partial aggregates (count, sums, min/max)
+per (bucket, entity) and merged into the stored buckets, so the rollups stay
+current without ever rescanning raw rows. Partial aggregates are mergeable:
+a late or replayed batch simply adds into the bucket it belongs to.
+
+Each grain of a table is stored as one small Parquet file per day under
+data/rollups/<table>/<grain>/<YYYY-MM-DD>.parquet. Only the days touched by
+a batch are rewritten (at most every ``persist_seconds``), and long-horizon
+charts read a few hundred rollup rows instead of the raw history.
+
+Several processes may update a table's rollups (the streams, a history import,
+a backfill). Each keeps only the partial aggregates it has not written yet.
+To persist, it takes the table's lock file, merges them into the day files
+as they are on disk and rewrites those files. Every batch is therefore counted
+exactly once, whichever process wrote it.
+
+Usage:
+    python rollups.py rebuild --table production_data   # recompute from the Parquet history
+"""
+import argparse
+import atexit
+import glob
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from file_lock import FileLock
+
+ROLLUP_DIR = os.path.join(os.path.dirname(__file__), 'data', 'rollups')
+
+GRAINS = ('minute', 'hour', 'shift')
+# Three 8-hour shifts starting at 06:00, 14:00 and 22:00 plant time
+SHIFT_START_HOUR = 6
+SHIFT_HOURS = 8
+SHIFT_TIMEZONE = os.getenv("SHIFT_TIMEZONE", "UTC")
+
+# Days of buckets kept per grain (None keeps everything)
+RETENTION_DAYS = {'minute': 7, 'hour': 180, 'shift': None}
+
+ENTITY_COLUMNS = {'production_data': 'machine_id', 'supplier_data': 'supplier_id'}
+
+# Aggregate columns per table and how two partial aggregates combine
+MEASURES = {
+    'production_data': {
+        'count': 'sum',
+        'output_sum': 'sum', 'output_min': 'min', 'output_max': 'max',
+        'target_sum': 'sum',
+        'efficiency_sum': 'sum', 'efficiency_min': 'min', 'efficiency_max': 'max',
+        'downtime_minutes': 'sum', 'downtime_events': 'sum',
+        'temperature_max': 'max',
+    },
+    'supplier_data': {
+        'count': 'sum',
+        'order_quantity': 'sum', 'received_quantity': 'sum',
+        'delayed_count': 'sum', 'delay_days_sum': 'sum', 'delay_days_max': 'max',
+    },
+}
+
+
+def bucket_start(timestamps, grain):
+    """UTC start of the minute, hour or shift each timestamp falls in."""
+    ts = pd.to_datetime(pd.Series(timestamps), utc=True, format='ISO8601').reset_index(drop=True)
+    if grain == 'minute':
+        return ts.dt.floor('min')
+    if grain == 'hour':
+        return ts.dt.floor('h')
+    # Shifts follow the wall clock: floor the naive local time, then localize the
+    # start again, so a DST change moves the UTC start instead of the shift
+    offset = pd.Timedelta(hours=SHIFT_START_HOUR)
+    wall = ts.dt.tz_convert(SHIFT_TIMEZONE).dt.tz_localize(None)
+    start = (wall - offset).dt.floor(f'{SHIFT_HOURS}h') + offset
+    # An ambiguous start (clocks going back) is its first occurrence, a skipped
+    # one (clocks going forward) the first instant after the gap
+    return start.dt.tz_localize(SHIFT_TIMEZONE, ambiguous=np.ones(len(start), dtype=bool),
+                                nonexistent='shift_forward').dt.tz_convert('UTC')
+
+
+def row_measures(table, records):
+    """One single-row partial aggregate per record (timestamp, entity, measures)."""
+    df = records if isinstance(records, pd.DataFrame) else pd.DataFrame.from_records(records)
+    entity = ENTITY_COLUMNS[table]
+
+    def num(col):
+        return pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy()
+
+    # Parsed once here rather than once per grain
+    timestamps = pd.to_datetime(df['timestamp'], utc=True, format='ISO8601')
+    rows = {'timestamp': timestamps.to_numpy(), entity: df[entity].to_numpy(), 'count': 1}
+    if table == 'production_data':
+        actual, target, downtime = num('actual_output'), num('target_output'), num('downtime_minutes')
+        efficiency = actual / pd.Series(target).replace(0, 1).to_numpy() * 100
+        rows.update(output_sum=actual, output_min=actual, output_max=actual, target_sum=target,
+                    efficiency_sum=efficiency, efficiency_min=efficiency, efficiency_max=efficiency,
+                    downtime_minutes=downtime, downtime_events=(downtime > 0).astype(int),
+                    temperature_max=num('temperature_c'))
+    else:
+        delay = (pd.to_datetime(df['actual_delivery_date']) -
+                 pd.to_datetime(df['expected_delivery_date'])).dt.days.fillna(0).to_numpy()
+        late = delay > 0
+        rows.update(order_quantity=num('order_quantity'), received_quantity=num('received_quantity'),
+                    delayed_count=late.astype(int), delay_days_sum=delay * late,
+                    delay_days_max=delay)
+    return pd.DataFrame(rows)
+
+
+def _reduce(table, grouped):
+    """Apply MEASURES to a groupby with one sum, one min and one max pass."""
+    measures = MEASURES[table]
+    parts = []
+    for how in ('sum', 'min', 'max'):
+        columns = [col for col, op in measures.items() if op == how]
+        if columns:
+            parts.append(getattr(grouped[columns], how)())
+    return pd.concat(parts, axis=1)[list(measures)]
+
+
+def aggregate(table, rows, grain):
+    """Partial aggregates of row_measures output per (bucket, entity)."""
+    keyed = rows.drop(columns='timestamp').assign(bucket=bucket_start(rows['timestamp'], grain).to_numpy())
+    return _reduce(table, keyed.groupby(['bucket', ENTITY_COLUMNS[table]]))
+
+
+def combine(table, *frames):
+    """Merge partial aggregates that may share (bucket, entity) keys."""
+    frames = [f for f in frames if f is not None and not f.empty]
+    if len(frames) == 1:
+        return frames[0]
+    return _reduce(table, pd.concat(frames).groupby(level=[0, 1]))
+
+
+def with_means(table, df):
+    """Add the ratio columns derived from sums and counts."""
+    count = df['count'].where(df['count'] > 0)
+    if table == 'production_data':
+        df['mean_output'] = df['output_sum'] / count
+        df['mean_efficiency'] = df['efficiency_sum'] / count
+    else:
+        df['delay_rate'] = df['delayed_count'] / count
+        df['mean_delay_days'] = df['delay_days_sum'] / df['delayed_count'].where(df['delayed_count'] > 0)
+    return df
+
+
+class RollupStore:
+    """Incrementally maintained minute/hour/shift rollups, one Parquet file per day.
+
+    Args:
+        root: directory holding one folder per table and grain
+        persist_seconds: minimum time between writes of the touched days
+        retention_days: days of buckets kept per grain
+    """
+
+    def __init__(self, root=ROLLUP_DIR, persist_seconds=5.0, retention_days=RETENTION_DAYS):
+        self.root = root
+        self.persist_seconds = persist_seconds
+        self.retention_days = dict(retention_days)
+        self._lock = threading.Lock()
+        self._pending = {}     # (table, grain, day) -> unwritten aggregates indexed by (bucket, entity)
+        self._file_locks = {}  # table -> FileLock shared with the other writing processes
+        self._last_persist = 0.0
+        self._read_cache = {}  # path -> (mtime_ns, frame)
+
+    def path(self, table, grain, day=None):
+        directory = os.path.join(self.root, table, grain)
+        return directory if day is None else os.path.join(directory, f"{day}.parquet")
+
+    def _file_lock(self, table):
+        # Next to the table directory, so clearing a table keeps its lock
+        if table not in self._file_locks:
+            self._file_locks[table] = FileLock(os.path.join(self.root, f"{table}.lock"))
+        return self._file_locks[table]
+
+    # ----------------------------------------------------------------- writes
+    def update(self, table, records):
+        """Fold a batch of raw records (dicts or a DataFrame) into every grain."""
+        if table not in MEASURES or len(records) == 0:
+            return 0
+        rows = row_measures(table, records)
+        with self._lock:
+            for grain in GRAINS:
+                partial = aggregate(table, rows, grain)
+                days = partial.index.get_level_values('bucket').strftime('%Y-%m-%d')
+                for day, part in partial.groupby(days):
+                    key = (table, grain, day)
+                    self._pending[key] = combine(table, self._pending.get(key), part)
+            if time.monotonic() - self._last_persist >= self.persist_seconds:
+                self._persist()
+        return len(rows)
+
+    def flush(self):
+        """Merge every pending aggregate into the files on disk."""
+        with self._lock:
+            self._persist()
+
+    def _load(self, table, grain, day):
+        path = self.path(table, grain, day)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path).set_index(['bucket', ENTITY_COLUMNS[table]])
+
+    def _persist(self):
+        pending, self._pending = self._pending, {}
+        self._last_persist = time.monotonic()
+        for table in sorted({key[0] for key in pending}):
+            touched = {}
+            # Read, merge and replace under the table lock so no other writer's update is lost
+            with self._file_lock(table):
+                for key in sorted(k for k in pending if k[0] == table):
+                    _, grain, day = key
+                    path = self.path(table, grain, day)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp = path + ".tmp"
+                    combine(table, self._load(table, grain, day), pending[key]).reset_index().to_parquet(
+                        tmp, index=False)
+                    os.replace(tmp, path)
+                    touched[grain] = max(day, touched.get(grain, day))
+                for grain, newest in touched.items():
+                    self._apply_retention(table, grain, newest)
+
+    def _apply_retention(self, table, grain, newest):
+        days = self.retention_days.get(grain)
+        if days is None:
+            return
+        cutoff = (pd.Timestamp(newest) - pd.Timedelta(days=days)).strftime('%Y-%m-%d')
+        for path in glob.glob(os.path.join(self.path(table, grain), '*.parquet')):
+            if os.path.basename(path)[:-len('.parquet')] < cutoff:
+                os.remove(path)
+
+    # ------------------------------------------------------------------ reads
+    def _read_file(self, path):
+        """Parquet file contents, re-read only when the file changed."""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        cached = self._read_cache.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, pd.read_parquet(path))
+            self._read_cache[path] = cached
+        return cached[1]
+
+    def read(self, table, grain, start=None, end=None, entity_ids=None):
+        """Buckets with start <= bucket < end, oldest first, with mean columns added."""
+        entity = ENTITY_COLUMNS[table]
+        start = _utc(start)
+        end = _utc(end)
+        frames = []
+        for path in sorted(glob.glob(os.path.join(self.path(table, grain), '*.parquet'))):
+            day = os.path.basename(path)[:-len('.parquet')]
+            if (start is not None and day < start.strftime('%Y-%m-%d')) or \
+                    (end is not None and day > end.strftime('%Y-%m-%d')):
+                continue
+            frame = self._read_file(path)
+            if frame is not None:
+                frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=['bucket', entity] + list(MEASURES[table]))
+
+        df = pd.concat(frames, ignore_index=True)
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= df['bucket'] >= start
+        if end is not None:
+            mask &= df['bucket'] < end
+        if entity_ids is not None:
+            mask &= df[entity].isin(list(entity_ids))
+        df = df[mask].sort_values(['bucket', entity]).reset_index(drop=True)
+        return with_means(table, df)
+
+    def clear(self, table=None):
+        with self._lock:
+            self._pending = {k: v for k, v in self._pending.items() if table is not None and k[0] != table}
+            self._read_cache = {}
+            if table is None:
+                for lock in self._file_locks.values():
+                    lock.close()
+                self._file_locks = {}
+        target = os.path.join(self.root, table) if table else self.root
+        if os.path.exists(target):
+            shutil.rmtree(target)
+
+    def rebuild(self, table, batch_size=500_000):
+        """Recompute a table's rollups from the Parquet history.
+
+        Run it with ingestion stopped: rows archived during the rebuild may be
+        counted both from the history and by their writer.
+        """
+        from history_store import history_store
+        self.clear(table)
+        rows = 0
+        for batch in history_store.iter_batches(table, batch_size=batch_size):
+            rows += self.update(table, batch)
+        self.flush()
+        return rows
+
+
+def _utc(value):
+    if value is None:
+        return None
+    value = pd.Timestamp(value)
+    return value.tz_localize('UTC') if value.tzinfo is None else value.tz_convert('UTC')
+
+
+# Default rollups shared by the streams, the mock manager and the dashboard
+rollup_store = RollupStore()
+atexit.register(rollup_store.flush)
+
+
+def save_rollup_records(table_name, records):
+    """Fold records into the rollups (ignored for tables without measures)."""
+    try:
+        return rollup_store.update(table_name, records)
+    except Exception as e:
+        print(f"Rollup update error: {e}. {len(records)} {table_name} records not aggregated.")
+        return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Manage the minute/hour/shift rollups.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    reb = sub.add_parser('rebuild', help='recompute rollups from the Parquet history')
+    reb.add_argument('--table', choices=sorted(MEASURES), required=True)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    rows = rollup_store.rebuild(args.table)
+    print(f"Rolled up {rows:,} {args.table} rows in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,274 @@
+"""
+Scoring Service
+Standalone process pool that scores production and supplier frames for every
+dashboard session, so model work never runs inside a Streamlit rerun.
+
+Requests arriving within a short window are grouped per kind and scored by a
+worker process with one model call (MLModelManager.score_many). Each worker
+loads the models once and keeps its own inference cache warm across requests.
+
+Run:
+    SCORING_SERVICE_AUTHKEY=<secret> python scoring_service.py --workers 4
+and point the dashboard at it with SCORING_SERVICE_ADDRESS=<address> and the
+same SCORING_SERVICE_AUTHKEY. The service refuses to start without a key, and
+its Unix socket lives in a directory only the service's user can open.
+"""
+import argparse
+import itertools
+import os
+import queue
+import stat
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing.connection import Client, Listener
+
+DEFAULT_ADDRESS = (r'\\.\pipe\textile-scoring' if sys.platform == 'win32' else
+                   os.path.join(tempfile.gettempdir(), f'textile-scoring-{os.getuid()}', 'scoring.sock'))
+# Shared secret of server and clients; there is deliberately no default
+AUTHKEY = os.getenv("SCORING_SERVICE_AUTHKEY", "").encode()
+BATCH_WINDOW = 0.005     # seconds to wait for more requests of the same kind
+MAX_BATCH_ROWS = 20_000
+RECONNECT_DELAY = 10.0   # seconds before a client retries a dead service
+
+
+def _is_pipe(address):
+    return address.startswith('\\\\')
+
+
+def _private_socket_dir(address):
+    """Create the socket's directory as 0700 and refuse one other users can open."""
+    directory = os.path.dirname(os.path.abspath(address))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) & 0o077:
+        raise PermissionError(f"{directory} must be owned by this user with mode 0700 "
+                              f"to hold the scoring socket")
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+_worker_manager = None
+
+
+def _init_worker():
+    global _worker_manager
+    from model_inference import MLModelManager
+    _worker_manager = MLModelManager()
+    _worker_manager.warm_up()
+
+
+def _score_batch(kind, frames):
+    return _worker_manager.score_many(kind, frames)
+
+
+class ScoringServer:
+    """Accepts scoring requests from any number of clients and batches them per kind.
+
+    Args:
+        address: Unix socket path or Windows pipe name to listen on
+        workers: number of scoring processes
+        authkey: shared secret clients must present
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, workers=2, authkey=AUTHKEY,
+                 batch_window=BATCH_WINDOW):
+        if not authkey:
+            raise ValueError("Set SCORING_SERVICE_AUTHKEY before starting the scoring service")
+        self.address = address
+        self.authkey = authkey
+        self.batch_window = batch_window
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        self._pending = queue.Queue()
+        self.requests = 0
+        self.batches = 0
+
+    def serve_forever(self):
+        if _is_pipe(self.address):
+            listener = Listener(self.address, authkey=self.authkey)
+        else:
+            _private_socket_dir(self.address)
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            previous_umask = os.umask(0o077)   # socket file created as 0600
+            try:
+                listener = Listener(self.address, authkey=self.authkey)
+            finally:
+                os.umask(previous_umask)
+        threading.Thread(target=self._batcher, name='scoring-batcher', daemon=True).start()
+        print(f"Scoring service listening on {self.address}")
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"Rejected scoring client: {e}")
+                    continue
+                threading.Thread(target=self._reader, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+            self.pool.shutdown(cancel_futures=True)
+
+    def _reader(self, conn):
+        """Queue every request from one client connection until it closes."""
+        send_lock = threading.Lock()
+        try:
+            while True:
+                request_id, kind, df = conn.recv()
+                self._pending.put((conn, send_lock, request_id, kind, df))
+        except (EOFError, OSError):
+            conn.close()
+
+    def _batcher(self):
+        while True:
+            first = self._pending.get()
+            batches = {first[3]: [first]}
+            rows = len(first[4])
+            deadline = time.monotonic() + self.batch_window
+            while rows < MAX_BATCH_ROWS:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batches.setdefault(item[3], []).append(item)
+                rows += len(item[4])
+            for kind, items in batches.items():
+                self.requests += len(items)
+                self.batches += 1
+                future = self.pool.submit(_score_batch, kind, [item[4] for item in items])
+                future.add_done_callback(lambda f, items=items: self._reply(items, f))
+
+    def _reply(self, items, future):
+        try:
+            results = [('ok', result) for result in future.result()]
+        except Exception as e:
+            results = [('error', repr(e))] * len(items)
+        for (conn, send_lock, request_id, _, _), (status, payload) in zip(items, results):
+            try:
+                with send_lock:
+                    conn.send((request_id, status, payload))
+            except (OSError, ValueError):
+                pass   # client went away
+
+
+# ---------------------------------------------------------------------------
+# Client side
+# ---------------------------------------------------------------------------
+
+class ScoringClient:
+    """Thread-safe connection to a ScoringServer shared by all sessions of a process.
+
+    Failures never raise: ``try_score`` returns None and the caller scores
+    in-process. After a failure the service is not retried for RECONNECT_DELAY
+    seconds so a stopped service does not slow every rerun.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, authkey=AUTHKEY, timeout=5.0):
+        if not authkey:
+            raise ValueError("Set SCORING_SERVICE_AUTHKEY to use the scoring service")
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self._conn = None
+        self._futures = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._retry_at = 0.0
+        self.remote_calls = 0
+        self.fallbacks = 0
+
+    def _connect(self):
+        if self._conn is not None:
+            return self._conn
+        if time.monotonic() < self._retry_at:
+            return None
+        try:
+            self._conn = Client(self.address, authkey=self.authkey)
+        except Exception as e:
+            print(f"Scoring service unavailable ({e}), scoring in-process.")
+            self._retry_at = time.monotonic() + RECONNECT_DELAY
+            return None
+        threading.Thread(target=self._receiver, args=(self._conn,), daemon=True).start()
+        return self._conn
+
+    def _receiver(self, conn):
+        try:
+            while True:
+                request_id, status, payload = conn.recv()
+                future = self._futures.pop(request_id, None)
+                if future is None:
+                    continue
+                if status == 'ok':
+                    future.set_result(payload)
+                else:
+                    future.set_exception(RuntimeError(payload))
+        except (EOFError, OSError):
+            self._disconnect(conn)
+
+    def _disconnect(self, conn):
+        with self._lock:
+            if self._conn is conn:
+                self._conn = None
+                self._retry_at = time.monotonic() + RECONNECT_DELAY
+            pending, self._futures = self._futures, {}
+        conn.close()
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("scoring service disconnected"))
+
+    def submit(self, kind, df):
+        """Send a request; returns a Future, or None when the service is unreachable."""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            request_id = next(self._ids)
+            future = Future()
+            self._futures[request_id] = future
+            try:
+                conn.send((request_id, kind, df))
+            except (OSError, ValueError):
+                self._futures.pop(request_id, None)
+                self._conn = None
+                self._retry_at = time.monotonic() + RECONNECT_DELAY
+                return None
+        return future
+
+    def try_score(self, kind, df):
+        """Score remotely, returning None on any failure or timeout."""
+        future = self.submit(kind, df)
+        if future is not None:
+            try:
+                result = future.result(timeout=self.timeout)
+                self.remote_calls += 1
+                return result
+            except Exception as e:
+                print(f"Scoring service error: {e}")
+        self.fallbacks += 1
+        return None
+
+    def stats(self):
+        return {
+            'address': self.address,
+            'connected': self._conn is not None,
+            'remote_calls': self.remote_calls,
+            'fallbacks': self.fallbacks,
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the shared model scoring service.')
+    parser.add_argument('--address', default=os.getenv("SCORING_SERVICE_ADDRESS") or DEFAULT_ADDRESS)
+    parser.add_argument('--workers', type=int, default=max(1, min(4, (os.cpu_count() or 2) - 1)))
+    parser.add_argument('--batch-window', type=float, default=BATCH_WINDOW)
+    args = parser.parse_args()
+    if not AUTHKEY:
+        parser.error('set SCORING_SERVICE_AUTHKEY to a shared secret (clients need the same value)')
+    ScoringServer(args.address, args.workers, batch_window=args.batch_window).serve_forever()
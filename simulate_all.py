@@ -1,51 +1,85 @@
-import threading
-import time
+import argparse
+import asyncio
 import sys
 import os
 
 # Ensure we can import from the streaming directory
-sys.path.append(os.path.join(os.path.dirname(__file__), 'streaming'))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-try:
-    from streaming.machine_stream import start_streaming as start_machine_stream
-    from streaming.supplier_stream import start_streaming as start_supplier_stream
-except ImportError:
-    # Fallback if running from a different context
-    from machine_stream import start_streaming as start_machine_stream
-    from supplier_stream import start_streaming as start_supplier_stream
+from streaming.machine_stream import generate_machine_record
+from streaming.supplier_stream import generate_supplier_record
+from streaming.async_runner import (AsyncStreamRunner, mock_sink, report_stats,
+                                    shared_http_client, spread_ids, supabase_async_insert)
+from streaming.buffered_writer import supabase_bulk_insert
+from streaming.outbox import Outbox, OutboxReplayer, spool_failures
+from mock_db_manager import save_mock_records
+from history_store import with_history
 
-import traceback
 
-def run_machine_stream():
-    try:
-        print("Starting Machine Stream...")
-        start_machine_stream(interval_seconds=3)
-    except Exception as e:
-        print(f"Machine Stream Error: {e}")
-        traceback.print_exc()
+async def simulate(args):
+    """Run every virtual machine and supplier on one event loop."""
+    alerts = None
+    if not args.no_alerts:
+        from streaming.risk_alerts import RiskAlertStage
+        alerts = RiskAlertStage(None)
+
+    http = replayer = None
+    if args.sink == "mock":
+        insert_batch, on_failure = mock_sink(), None
+    else:
+        from supabase import create_client
+        from config.config import SUPABASE_URL, SUPABASE_KEY
+        http = shared_http_client()
+        insert_batch = with_history(supabase_async_insert(http))
+        outbox = Outbox("simulate_all")
+        on_failure = spool_failures(outbox, also=save_mock_records)
+        replayer = OutboxReplayer(outbox, supabase_bulk_insert(create_client(SUPABASE_URL, SUPABASE_KEY)),
+                                  rows_per_second=args.replay_rate).start()
 
+    runner = AsyncStreamRunner(insert_batch, on_failure=on_failure, batch_size=args.batch_size,
+                               flush_interval=args.flush_interval, alerts=alerts)
+    runner.add_devices("production_data", spread_ids("M", args.machines),
+                       args.machine_interval, generate_machine_record)
+    runner.add_devices("supplier_data", spread_ids("S", args.suppliers),
+                       args.supplier_interval, generate_supplier_record)
 
-def run_supplier_stream():
+    reporter = asyncio.create_task(report_stats(runner, args.stats_every))
     try:
-        print("Starting Supplier Stream...")
-        start_supplier_stream(interval_seconds=5)
-    except Exception as e:
-        print(f"Supplier Stream Error: {e}")
+        await runner.run(args.duration)
+    finally:
+        reporter.cancel()
+        if http is not None:
+            await http.aclose()
+        print("Runner stats:", runner.get_stats())
+        if replayer is not None:
+            replayer.stop()
+            print("Outbox stats:", replayer.get_stats())
+        if alerts is not None:
+            print("Alert stats:", alerts.get_stats())
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate machines and suppliers streaming data.")
+    parser.add_argument("--machines", type=int, default=3, help="number of virtual machines")
+    parser.add_argument("--suppliers", type=int, default=3, help="number of virtual suppliers")
+    parser.add_argument("--machine-interval", type=float, default=9.0, help="seconds between records per machine")
+    parser.add_argument("--supplier-interval", type=float, default=15.0, help="seconds between records per supplier")
+    parser.add_argument("--sink", choices=["supabase", "mock"], default="supabase",
+                        help="write to Supabase (outbox and mock store on failure) or only to the mock store")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--flush-interval", type=float, default=5.0)
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--stats-every", type=float, default=30.0)
+    parser.add_argument("--replay-rate", type=float, default=5_000,
+                        help="rows per second the outbox replayer sends while catching up")
+    parser.add_argument("--no-alerts", action="store_true", help="skip risk scoring at ingestion")
+    args = parser.parse_args()
+
     print("Initializing Manufacturing Simulation...")
-    print("This script runs data streams in background threads.")
+    print(f"{args.machines} machines and {args.suppliers} suppliers on one event loop.")
     print("Press Ctrl+C to stop all simulations.")
-
-    t1 = threading.Thread(target=run_machine_stream, daemon=True)
-    t2 = threading.Thread(target=run_supplier_stream, daemon=True)
-
-    t1.start()
-    t2.start()
-
     try:
-        while True:
-            time.sleep(1)
+        asyncio.run(simulate(args))
     except KeyboardInterrupt:
         print("\nStopping simulation...")
         sys.exit(0)
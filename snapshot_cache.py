@@ -0,0 +1,132 @@
+"""
+Snapshot Cache
+Process-wide cache of dashboard data snapshots shared by every browser session.
+
+Entries expire after a TTL and the least recently used ones are evicted once
+the entry or memory budget is exceeded. Concurrent misses for the same key are
+coalesced (single flight): the first caller runs the loader while the others
+wait for its result, so N viewers refreshing at once cost one backend fetch.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def estimate_size(value):
+    """Approximate memory footprint in bytes of a snapshot (DataFrames dominate)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, dict):
+        return sum(estimate_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value)
+    return 64
+
+
+class _Flight:
+    """A load in progress that other callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SnapshotCache:
+    """TTL + LRU cache with single-flight loading and hit/miss counters.
+
+    Args:
+        ttl: seconds an entry stays fresh
+        max_entries: maximum number of cached snapshots
+        max_bytes: approximate memory budget across all entries
+    """
+
+    def __init__(self, ttl=15.0, max_entries=16, max_bytes=64 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key -> (value, created_at, size)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key, loader, cacheable=None):
+        """Return the fresh cached value for ``key`` or load it exactly once.
+
+        ``cacheable(value)`` returning False hands the loaded value to the
+        current callers without storing it, so the next lookup loads again.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            if cacheable is None or cacheable(flight.value):
+                self._store(key, flight.value)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+        return flight.value
+
+    def _store(self, key, value):
+        size = estimate_size(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (value, time.monotonic(), size)
+            self._bytes += size
+            while len(self._entries) > 1 and (
+                    len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self):
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hit_rate': round((self.hits + self.coalesced) / lookups * 100, 1) if lookups else 0.0,
+            }
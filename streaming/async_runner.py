@@ -0,0 +1,258 @@
+"""
+Async Stream Runner
+Simulates many machines and suppliers on a single asyncio event loop.
+
+Each virtual device fires on its own interval. Devices are kept in a heap keyed
+by their next due time, and every due time is computed from the device's ideal
+schedule (previous due + interval) rather than from when it actually ran, so
+scheduling jitter never accumulates into drift. A device that falls more than
+``max_missed`` intervals behind skips the missed ticks instead of bursting.
+
+Generated records are buffered per table and written in batches by background
+tasks, through either the local mock store or the Supabase REST API over one
+shared httpx.AsyncClient (pooled keep-alive connections for every device).
+"""
+import asyncio
+import heapq
+import time
+from collections import deque
+
+import httpx
+
+from config.config import SUPABASE_URL, SUPABASE_KEY
+from streaming.buffered_writer import WriterStats
+from streaming.outbox import CONFLICT_COLUMNS, with_ingest_keys
+
+try:
+    from mock_db_manager import save_mock_records
+except ImportError:
+    def save_mock_records(*args): pass
+
+
+class VirtualDevice:
+    """One simulated machine or supplier emitting a record every ``interval`` seconds."""
+
+    __slots__ = ('table', 'entity_id', 'interval', 'generate')
+
+    def __init__(self, table, entity_id, interval, generate):
+        self.table = table
+        self.entity_id = entity_id
+        self.interval = interval
+        self.generate = generate
+
+
+def mock_sink(store=None):
+    """Async insert_batch writing to the local mock store.
+
+    The shared store goes through save_mock_records so batches are archived
+    to the history too; a custom ``store`` is written directly.
+    """
+    async def insert_batch(table, records):
+        # Appends fsync and the shared store also archives: keep both off the event loop
+        if store is None:
+            await asyncio.to_thread(save_mock_records, table, records)
+        else:
+            await asyncio.to_thread(store.log(table).append_many, records)
+    return insert_batch
+
+
+def supabase_async_insert(http, url=SUPABASE_URL, key=SUPABASE_KEY):
+    """Async insert_batch posting idempotent bulk inserts to PostgREST over a shared client.
+
+    Rows whose ``ingest_key`` already exists are ignored (see supabase_bulk_insert).
+    """
+    headers = {
+        'apikey': key,
+        'Authorization': f'Bearer {key}',
+        'Content-Type': 'application/json',
+        'Prefer': 'resolution=ignore-duplicates,return=minimal',
+    }
+
+    async def insert_batch(table, records):
+        response = await http.post(f"{url}/rest/v1/{table}", params={'on_conflict': CONFLICT_COLUMNS},
+                                   json=with_ingest_keys(table, records), headers=headers)
+        response.raise_for_status()
+    return insert_batch
+
+
+def shared_http_client(max_connections=20):
+    """httpx.AsyncClient reused by every device so connections stay pooled."""
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(10.0, connect=5.0),
+        limits=httpx.Limits(max_connections=max_connections,
+                            max_keepalive_connections=max_connections),
+    )
+
+
+class AsyncStreamRunner:
+    """Schedules virtual devices on one event loop and batches their records.
+
+    Args:
+        insert_batch: async callable taking (table, records)
+        on_failure: callable taking (table, records) for batches that failed
+        batch_size: flush a table once this many records are buffered
+        flush_interval: flush buffered records at least this often (seconds)
+        max_inflight: concurrent batch writes before the scheduler waits (backpressure)
+        max_missed: intervals a device may fall behind before skipping ticks
+        alerts: optional RiskAlertStage scoring each batch before it is written
+    """
+
+    def __init__(self, insert_batch, on_failure=save_mock_records, batch_size=500,
+                 flush_interval=1.0, max_inflight=4, max_missed=3, alerts=None):
+        self.insert_batch = insert_batch
+        self.on_failure = on_failure
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_missed = max_missed
+        self.alerts = alerts
+        self.stats = WriterStats()
+        self.generated = 0
+        self.skipped_ticks = 0
+        self._lateness = deque(maxlen=5000)
+        self._heap = []
+        self._seq = 0
+        self._buffers = {}
+        self._buffered = 0
+        self._inflight = set()
+        self._slots = asyncio.Semaphore(max_inflight)
+
+    def add_devices(self, table, entity_ids, interval, generate, start=None):
+        """Register devices; their first ticks are spread evenly over one interval."""
+        start = time.monotonic() if start is None else start
+        entity_ids = list(entity_ids)
+        for i, entity_id in enumerate(entity_ids):
+            device = VirtualDevice(table, entity_id, interval, generate)
+            due = start + interval * i / max(len(entity_ids), 1)
+            heapq.heappush(self._heap, (due, self._seq, device))
+            self._seq += 1
+        self._buffers.setdefault(table, [])
+
+    async def run(self, duration=None):
+        """Run until ``duration`` seconds have passed (forever if None), then flush."""
+        loop = asyncio.get_running_loop()
+        self.stats = WriterStats()
+        stop_at = None if duration is None else loop.time() + duration
+        last_flush = loop.time()
+        try:
+            while self._heap:
+                now = loop.time()
+                if stop_at is not None and now >= stop_at:
+                    break
+                if now - last_flush >= self.flush_interval:
+                    await self._flush_all()
+                    last_flush = now
+
+                next_due = self._heap[0][0]
+                if next_due > now:
+                    wake = min(next_due, last_flush + self.flush_interval)
+                    if stop_at is not None:
+                        wake = min(wake, stop_at)
+                    await asyncio.sleep(wake - now)
+                    continue
+
+                self._tick(now)
+                if self._buffered >= self.batch_size:
+                    await self._flush_full()
+                    last_flush = loop.time()
+                else:
+                    await asyncio.sleep(0)
+        finally:
+            # Scored batches can queue alert rows, so drain until nothing is left
+            while True:
+                await self._flush_all()
+                if not self._inflight:
+                    break
+                await asyncio.gather(*self._inflight, return_exceptions=True)
+            # Archives buffered by the insert callable (see with_history)
+            flush = getattr(self.insert_batch, 'flush', None)
+            if flush is not None:
+                await asyncio.to_thread(flush)
+
+    def _tick(self, now):
+        """Emit a record for every device that is due and reschedule it."""
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            due, seq, device = heapq.heappop(heap)
+            self._lateness.append(now - due)
+            self._buffers[device.table].append(device.generate(device.entity_id))
+            self._buffered += 1
+            self.generated += 1
+
+            due += device.interval
+            behind = now - due
+            if behind > device.interval * self.max_missed:
+                missed = int(behind // device.interval)
+                due += missed * device.interval
+                self.skipped_ticks += missed
+            heapq.heappush(heap, (due, seq, device))
+
+    async def _flush_full(self):
+        for table, buffer in list(self._buffers.items()):
+            if len(buffer) >= self.batch_size:
+                await self._flush(table)
+
+    async def _flush_all(self):
+        for table in list(self._buffers):
+            if self._buffers[table]:
+                await self._flush(table)
+
+    async def _flush(self, table):
+        batch = self._buffers[table]
+        self._buffers[table] = []
+        self._buffered -= len(batch)
+        await self._slots.acquire()   # backpressure when the sink falls behind
+        task = asyncio.create_task(self._write(table, batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _write(self, table, batch):
+        try:
+            if self.alerts is not None:
+                try:
+                    alerts = await asyncio.to_thread(self.alerts.process, table, batch)
+                    if alerts:
+                        self._buffers.setdefault('risk_alerts', []).extend(alerts)
+                        self._buffered += len(alerts)
+                except Exception as e:
+                    print(f"Risk scoring error: {e}. {len(batch)} {table} records not scored.")
+
+            start = time.monotonic()
+            try:
+                await self.insert_batch(table, batch)
+                self.stats.record_flush(len(batch), time.monotonic() - start)
+            except Exception as e:
+                self.stats.record_flush(len(batch), time.monotonic() - start, ok=False)
+                print(f"Supabase Error: {e}. {len(batch)} {table} records not inserted.")
+                if self.on_failure is not None:
+                    try:
+                        # Spooling fsyncs to disk: keep it off the event loop
+                        await asyncio.to_thread(self.on_failure, table, batch)
+                    except Exception as le:
+                        print(f"Local save error: {le}")
+        finally:
+            self._slots.release()
+
+    def get_stats(self):
+        stats = self.stats.snapshot(self._buffered)
+        lateness = sorted(self._lateness)
+        stats.update({
+            'devices': len(self._heap),
+            'records_generated': self.generated,
+            'skipped_ticks': self.skipped_ticks,
+            'schedule_lag_avg_ms': round(sum(lateness) / len(lateness) * 1000, 2) if lateness else 0.0,
+            'schedule_lag_p99_ms': round(lateness[int(0.99 * (len(lateness) - 1))] * 1000, 2) if lateness else 0.0,
+        })
+        return stats
+
+
+async def report_stats(runner, every):
+    """Print runner stats every ``every`` seconds."""
+    while True:
+        await asyncio.sleep(every)
+        print("Runner stats:", runner.get_stats())
+
+
+def spread_ids(prefix, count):
+    """Entity ids M1..Mn / S1..Sn for ``count`` virtual devices."""
+    return [f"{prefix}{i}" for i in range(1, count + 1)]
+
@@ -0,0 +1,152 @@
+"""
+Buffered Writer
+Groups generated records into bulk inserts instead of one HTTP round trip each.
+
+Producers call ``put`` which places the record on a bounded queue. When the
+queue is full ``put`` blocks (backpressure) so a slow backend throttles the
+generator rather than growing memory. A background thread drains the queue and
+flushes a batch whenever ``batch_size`` records are waiting or ``flush_interval``
+seconds have passed since the first record of the batch arrived.
+"""
+import queue
+import threading
+import time
+from collections import deque
+
+from postgrest.types import ReturnMethod
+
+from streaming.outbox import CONFLICT_COLUMNS, with_ingest_keys
+
+_STOP = object()
+
+
+class WriterStats:
+    """Throughput and flush latency counters for a BufferedWriter."""
+
+    def __init__(self, window=200):
+        self.started = time.monotonic()
+        self.records_written = 0
+        self.records_failed = 0
+        self.flushes = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record_flush(self, count, latency, ok=True):
+        with self._lock:
+            self.flushes += 1
+            if ok:
+                self.records_written += count
+            else:
+                self.records_failed += count
+            self._latencies.append(latency)
+
+    def snapshot(self, queue_depth=0):
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            latencies = sorted(self._latencies)
+        p95 = latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0
+        return {
+            'records_written': self.records_written,
+            'records_failed': self.records_failed,
+            'flushes': self.flushes,
+            'records_per_sec': round(self.records_written / elapsed, 2),
+            'flush_latency_avg_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+            'flush_latency_p95_ms': round(p95 * 1000, 2),
+            'flush_latency_max_ms': round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            'queue_depth': queue_depth,
+        }
+
+
+class BufferedWriter:
+    """Batches records for one table and writes them with bulk inserts.
+
+    Args:
+        table: Supabase table name
+        insert_batch: callable taking (table, records) that performs the bulk insert
+        on_failure: optional callable taking (table, records) for batches that failed
+        batch_size: flush once this many records are buffered
+        flush_interval: flush at least this often (seconds) while records are waiting
+        max_queue: bound of the in-memory queue; ``put`` blocks when it is full
+    """
+
+    def __init__(self, table, insert_batch, on_failure=None, batch_size=50,
+                 flush_interval=2.0, max_queue=1000):
+        self.table = table
+        self.insert_batch = insert_batch
+        self.on_failure = on_failure
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats = WriterStats()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name=f"writer-{table}", daemon=True)
+        self._thread.start()
+
+    def put(self, record, timeout=None):
+        """Queue a record, blocking while the queue is full (backpressure)."""
+        self._queue.put(record, timeout=timeout)
+
+    def close(self, timeout=None):
+        """Flush everything still buffered and stop the background thread.
+
+        Also flushes what ``insert_batch`` buffers itself (see with_history).
+        """
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        flush = getattr(self.insert_batch, 'flush', None)
+        if flush is not None:
+            flush()
+
+    def get_stats(self):
+        return self.stats.snapshot(self._queue.qsize())
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._flush(batch)
+                return
+            if item is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._flush(batch)
+                batch = []
+                deadline = None
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        start = time.monotonic()
+        try:
+            self.insert_batch(self.table, batch)
+            self.stats.record_flush(len(batch), time.monotonic() - start)
+        except Exception as e:
+            self.stats.record_flush(len(batch), time.monotonic() - start, ok=False)
+            print(f"Supabase Error: {e}. {len(batch)} {self.table} records not inserted.")
+            if self.on_failure is not None:
+                try:
+                    self.on_failure(self.table, batch)
+                except Exception as le:
+                    print(f"Local save error: {le}")
+
+
+def supabase_bulk_insert(client):
+    """Build an insert_batch callable that sends one idempotent bulk insert per batch.
+
+    Rows carry an ``ingest_key`` and rows whose key already exists are skipped,
+    so a batch re-sent after a lost response or by the outbox replayer is
+    stored once.
+    """
+    def insert_batch(table, records):
+        client.table(table).upsert(with_ingest_keys(table, records), on_conflict=CONFLICT_COLUMNS,
+                                   ignore_duplicates=True, returning=ReturnMethod.minimal).execute()
+    return insert_batch
@@ -0,0 +1,200 @@
+"""
+Bulk Generator
+Vectorized version of generate_machine_record / generate_supplier_record.
+
+Produces N records at once as columnar DataFrames (or Arrow tables) with the
+same causal model as the streams: speed drives temperature, temperature and
+speed drive downtime, and temperature, speed and downtime drive output. Runs
+are reproducible for a given seed and end time, so months of history can be backfilled for
+load tests in seconds.
+
+Usage:
+    python -m streaming.bulk_generator --days 90 --machines 20 --interval 60 --out history.parquet
+    python -m streaming.bulk_generator --seed 7 --end 2026-01-01 --supabase
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MATERIALS = ["Cotton", "Yarn", "Dyes"]
+STATUS_OPTIONS = ["In Transit", "delayed", "Delivered"]
+
+
+def entity_ids(prefix, count):
+    """M1..Mn / S1..Sn, or the given ids unchanged."""
+    if isinstance(count, int):
+        return [f"{prefix}{i}" for i in range(1, count + 1)]
+    return list(count)
+
+
+class BulkGenerator:
+    """Seedable columnar generator for production and supplier records.
+
+    Args:
+        seed: seed for numpy's Generator; None for a fresh random run
+        machines: number of machines (M1..Mn) or explicit machine ids
+        suppliers: number of suppliers (S1..Sn) or explicit supplier ids
+    """
+
+    def __init__(self, seed=None, machines=3, suppliers=3):
+        self.rng = np.random.default_rng(seed)
+        self.machines = np.array(entity_ids("M", machines))
+        self.suppliers = np.array(entity_ids("S", suppliers))
+
+    def _timestamps(self, n, start, end):
+        """n sorted UTC timestamps spread uniformly over [start, end)."""
+        end = pd.Timestamp(end or datetime.now(timezone.utc))
+        start = pd.Timestamp(start) if start is not None else end - pd.Timedelta(days=1)
+        if start.tzinfo is None:
+            start = start.tz_localize("UTC")
+        if end.tzinfo is None:
+            end = end.tz_localize("UTC")
+        # Microsecond resolution, like timestamps coming back from Postgres
+        offsets = np.sort(self.rng.integers(0, max((end - start).value // 1000, 1), n)) * 1000
+        return pd.DatetimeIndex(start.value + offsets, tz="UTC")
+
+    def production(self, n, start=None, end=None):
+        """DataFrame of n production records between start and end (default: the last day)."""
+        rng = self.rng
+        speed = rng.integers(700, 1001, n)
+        target = rng.integers(80, 101, n)
+
+        # Temperature is partially dependent on speed
+        base_temp = 28 + (speed - 700) / 300 * 10
+        temp = np.round(base_temp + rng.uniform(-2, 5, n), 2)
+
+        # Downtime is more likely when hot or fast
+        downtime_prob = 0.05 + 0.2 * (temp > 38) + 0.15 * (speed > 950)
+        downtime_minutes = np.round(rng.uniform(0.5, 5.0, n), 2)
+        downtime = np.where(rng.random(n) < downtime_prob, downtime_minutes, 0.0)
+
+        # Output depends on target, downtime and thermal/speed efficiency
+        thermal_efficiency = np.where(temp > 35, 1.0 - (temp - 35) * 0.05, 1.0)
+        speed_efficiency = np.where(speed < 750, 0.9, 1.0)
+        uptime_ratio = np.maximum(0, (60 - downtime) / 60)
+        actual = target * uptime_ratio * thermal_efficiency * speed_efficiency * rng.uniform(0.95, 1.02, n)
+        actual = np.maximum(0, actual.astype(np.int64))
+
+        return pd.DataFrame({
+            "timestamp": self._timestamps(n, start, end),
+            "machine_id": rng.choice(self.machines, n),
+            "target_output": target,
+            "actual_output": actual,
+            "speed_rpm": speed,
+            "downtime_minutes": downtime,
+            "temperature_c": temp,
+        })
+
+    def supplier(self, n, start=None, end=None):
+        """DataFrame of n supplier orders between start and end (default: the last day)."""
+        rng = self.rng
+        timestamps = self._timestamps(n, start, end)
+        expected = timestamps.tz_localize(None).normalize() + pd.to_timedelta(rng.integers(2, 11, n), unit="D")
+        actual = expected + pd.to_timedelta(rng.integers(-1, 6, n), unit="D")
+        order_qty = rng.integers(500, 2001, n)
+
+        return pd.DataFrame({
+            "timestamp": timestamps,
+            "supplier_id": rng.choice(self.suppliers, n),
+            "material_type": rng.choice(MATERIALS, n),
+            "expected_delivery_date": expected,
+            "actual_delivery_date": actual,
+            "order_quantity": order_qty,
+            "received_quantity": order_qty - rng.integers(0, 201, n),
+            "price_per_kg": np.round(rng.uniform(120, 200, n), 2),
+            "transportation_status": rng.choice(STATUS_OPTIONS, n),
+        })
+
+    def backfill(self, days, interval, end=None):
+        """Production and supplier history covering ``days`` up to ``end``.
+
+        Every machine and supplier contributes one record per ``interval``
+        seconds on average, like a device streaming for that long.
+        """
+        end = pd.Timestamp(end or datetime.now(timezone.utc))
+        start = end - pd.Timedelta(days=days)
+        per_entity = int(days * 86400 / interval)
+        return (self.production(per_entity * len(self.machines), start, end),
+                self.supplier(per_entity * len(self.suppliers), start, end))
+
+
+def to_records(df):
+    """Row dicts shaped like the streams' records (ISO timestamps, date strings)."""
+    out = df.copy()
+    out["timestamp"] = out["timestamp"].map(pd.Timestamp.isoformat)
+    for col in ("expected_delivery_date", "actual_delivery_date"):
+        if col in out.columns:
+            out[col] = out[col].dt.strftime("%Y-%m-%d")
+    return out.to_dict("records")
+
+
+def to_arrow(df):
+    """Arrow table of a generated frame (requires pyarrow)."""
+    import pyarrow as pa
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _write(df, path):
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill synthetic production and supplier history.")
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--interval", type=float, default=60.0, help="seconds between records per entity")
+    parser.add_argument("--machines", type=int, default=3)
+    parser.add_argument("--suppliers", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--end", default=None, help="ISO end of the history (default: now; required with --seed)")
+    parser.add_argument("--out", default="history.parquet",
+                        help="output file; production_/supplier_ prefixes are added (.parquet or .csv)")
+    parser.add_argument("--history", action="store_true", help="also append the rows to the Parquet history store and its rollups")
+    parser.add_argument("--supabase", action="store_true",
+                        help="also bulk insert the rows into Supabase (re-running a seeded backfill skips rows already stored)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+    if args.seed is not None and args.end is None:
+        # With a moving "now" the same seed gives different timestamps every run
+        parser.error("--seed needs a fixed --end to reproduce a dataset")
+
+    started = time.perf_counter()
+    generator = BulkGenerator(args.seed, args.machines, args.suppliers)
+    prod_df, sup_df = generator.backfill(args.days, args.interval, args.end)
+    print(f"Generated {len(prod_df):,} production and {len(sup_df):,} supplier records "
+          f"in {time.perf_counter() - started:.2f}s")
+
+    directory, name = os.path.split(args.out)
+    for table, df in (("production", prod_df), ("supplier", sup_df)):
+        path = os.path.join(directory, f"{table}_{name}")
+        _write(df, path)
+        print(f"Wrote {path}")
+
+    if args.history:
+        from history_store import history_store
+        from rollups import rollup_store
+        for table, df in (("production_data", prod_df), ("supplier_data", sup_df)):
+            history_store.write(table, df)
+            rollup_store.update(table, df)
+            print(f"Archived {len(df):,} rows in {history_store.path(table)}")
+        rollup_store.flush()
+
+    if args.supabase:
+        from supabase import create_client
+        from config.config import SUPABASE_URL, SUPABASE_KEY
+        from streaming.buffered_writer import supabase_bulk_insert
+        # Same ingest_key upsert as the streams, so a re-run or a retried chunk is stored once
+        insert_batch = supabase_bulk_insert(create_client(SUPABASE_URL, SUPABASE_KEY))
+        for table, df in (("production_data", prod_df), ("supplier_data", sup_df)):
+            for i in range(0, len(df), args.chunk_size):
+                insert_batch(table, to_records(df.iloc[i:i + args.chunk_size]))
+            print(f"Inserted {len(df):,} rows into {table}")
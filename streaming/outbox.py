@@ -0,0 +1,272 @@
+"""
+Outbox
+Durable local queue of records that could not be inserted into Supabase.
+
+Failed batches are appended to a segmented NDJSON log (the mock store's
+SegmentLog, fsynced on every append and never trimmed by retention) together
+with the target table and an idempotency key. A background replayer drains
+the log oldest-first in bulk upserts once Supabase answers again and commits
+a read cursor after each delivered batch; delivered segments are deleted.
+
+Every insert carries an ``ingest_key`` (a hash of the table and the record),
+and inserts ignore rows whose key already exists. A batch that reached
+Supabase before its response was lost, or that is replayed twice after a
+crash, is therefore written only once.
+
+Each producing process owns one outbox directory under data/outbox/<name>/.
+
+Usage:
+    python -m streaming.outbox status
+    python -m streaming.outbox replay --name machine_stream   # while that stream is stopped
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mock_db_manager import DATA_DIR, SegmentLog, _write_json_atomic
+
+OUTBOX_DIR = os.path.join(DATA_DIR, 'outbox')
+CURSOR_FILE = 'cursor.json'
+# Outbox segments are sealed (and become deletable) after this many entries
+OUTBOX_SEGMENT_RECORDS = 1_000
+# Unique index rows are deduplicated on (migrations/002_ingest_keys.sql)
+CONFLICT_COLUMNS = 'ingest_key,timestamp'
+
+
+def ingest_key(table, record):
+    """Deterministic idempotency key of a record (ignores id and any existing key)."""
+    payload = {k: v for k, v in record.items() if k not in ('id', 'ingest_key')}
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(table.encode() + b'\0' + encoded, digest_size=16).hexdigest()
+
+
+def with_ingest_keys(table, records):
+    """Copies of the records carrying their ingest_key."""
+    return [dict(record, ingest_key=record.get('ingest_key') or ingest_key(table, record))
+            for record in records]
+
+
+class Outbox:
+    """Append-only, crash-safe queue of (table, record) entries with a delivery cursor.
+
+    Args:
+        name: directory name under ``root``; one per producing process
+        root: parent directory of every outbox
+    """
+
+    def __init__(self, name, root=OUTBOX_DIR):
+        self.name = name
+        self.directory = os.path.join(root, name)
+        self.log = SegmentLog(self.directory, max_records=None,
+                              segment_max_records=OUTBOX_SEGMENT_RECORDS, fsync_policy='always')
+        self._cursor_path = os.path.join(self.directory, CURSOR_FILE)
+        self.acked = self._read_cursor()
+
+    def _read_cursor(self):
+        try:
+            with open(self._cursor_path) as f:
+                return int(json.load(f)['acked'])
+        except (FileNotFoundError, ValueError, KeyError):
+            return 0
+
+    def put(self, table, records):
+        """Durably queue records for ``table``; returns once they are on disk."""
+        if not records:
+            return
+        queued_at = time.time()
+        self.log.append_many([{'table': table, 'key': ingest_key(table, record),
+                               'queued_at': queued_at, 'record': record} for record in records])
+
+    def pending(self, limit):
+        """Up to ``limit`` undelivered entries, oldest first."""
+        entries = []
+        for entry in self.log.iter_from(self.acked):
+            entries.append(entry)
+            if len(entries) >= limit:
+                break
+        return entries
+
+    def ack(self, offset):
+        """Mark every entry below ``offset`` as delivered and delete finished segments."""
+        os.makedirs(self.directory, exist_ok=True)
+        _write_json_atomic(self._cursor_path, {'acked': offset})
+        self.acked = offset
+        self.log.drop_before(offset)
+
+    def depth(self):
+        return max(self.log.end_offset() - self.acked, 0)
+
+    def close(self):
+        self.log.close()
+
+
+def spool_failures(outbox, also=None):
+    """on_failure callable queueing failed batches in the outbox (and calling ``also``)."""
+    def on_failure(table, records):
+        outbox.put(table, records)
+        if also is not None:
+            also(table, records)
+    return on_failure
+
+
+class RateLimiter:
+    """Token bucket of ``rate`` rows per second with bursts of up to ``burst`` rows."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or rate
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def acquire(self, rows, stop=None):
+        """Block until ``rows`` tokens are available (or ``stop`` is set)."""
+        rows = min(rows, self.burst)
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= rows:
+                self._tokens -= rows
+                return True
+            wait = (rows - self._tokens) / self.rate
+            if stop is not None:
+                if stop.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+
+class OutboxReplayer:
+    """Background thread delivering outbox entries with bulk, idempotent inserts.
+
+    Args:
+        outbox: Outbox to drain
+        insert_batch: callable taking (table, records) that performs the insert
+        batch_size: entries read and delivered per round
+        rows_per_second: replay rate limit, so catching up does not swamp Supabase
+        poll_interval: seconds between checks while the outbox is empty
+        max_backoff: upper bound of the exponential backoff after failures
+    """
+
+    def __init__(self, outbox, insert_batch, batch_size=500, rows_per_second=5_000,
+                 poll_interval=1.0, max_backoff=30.0):
+        self.outbox = outbox
+        self.insert_batch = insert_batch
+        self.batch_size = batch_size
+        self.limiter = RateLimiter(rows_per_second, burst=max(batch_size, rows_per_second))
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self.replayed = 0
+        self.batches = 0
+        self.failures = 0
+        self.last_error = None
+        self.busy_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"outbox-{self.outbox.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def replay_once(self):
+        """Deliver the oldest pending round; returns the number of entries acknowledged.
+
+        The cursor only moves once every table in the round was inserted, so a
+        failure part-way re-sends the round later (the ingest keys drop repeats).
+        """
+        entries = self.outbox.pending(self.batch_size)
+        if not entries:
+            return 0
+        started = time.monotonic()
+        by_table = {}
+        for entry in entries:
+            record = dict(entry['record'], ingest_key=entry['key'])
+            by_table.setdefault(entry['table'], []).append(record)
+        for table, records in by_table.items():
+            if not self.limiter.acquire(len(records), self._stop):
+                return 0
+            self.insert_batch(table, records)
+        self.outbox.ack(entries[-1]['id'] + 1)
+        self.replayed += len(entries)
+        self.batches += 1
+        self.busy_seconds += time.monotonic() - started
+        return len(entries)
+
+    def drain(self):
+        """Replay until the outbox is empty; raises on the first failed round."""
+        delivered = 0
+        while not self._stop.is_set():
+            count = self.replay_once()
+            if count == 0:
+                break
+            delivered += count
+        return delivered
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                if self.replay_once():
+                    backoff = 1.0
+                    continue
+                wait = self.poll_interval
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                # Jittered exponential backoff while Supabase is still unreachable
+                wait = backoff * random.uniform(0.5, 1.0)
+                backoff = min(backoff * 2, self.max_backoff)
+            self._stop.wait(wait)
+
+    def get_stats(self):
+        oldest = self.outbox.pending(1)
+        return {
+            'pending': self.outbox.depth(),
+            'replayed': self.replayed,
+            'batches': self.batches,
+            'failures': self.failures,
+            'replay_rows_per_sec': round(self.replayed / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+            'oldest_pending_age_s': round(time.time() - oldest[0]['queued_at'], 1) if oldest else 0.0,
+            'last_error': self.last_error,
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Inspect or replay the local outboxes.')
+    parser.add_argument('command', choices=['status', 'replay'])
+    parser.add_argument('--name', default=None, help='outbox to use (default: all)')
+    parser.add_argument('--batch-size', type=int, default=1_000)
+    parser.add_argument('--rate', type=float, default=10_000, help='rows per second')
+    args = parser.parse_args()
+
+    names = [args.name] if args.name else sorted(
+        os.path.basename(d) for d in glob.glob(os.path.join(OUTBOX_DIR, '*')) if os.path.isdir(d))
+    client = None
+    for name in names:
+        outbox = Outbox(name)
+        if args.command == 'status':
+            print(f"{name}: {outbox.depth()} pending (cursor at {outbox.acked})")
+            continue
+        if client is None:
+            from supabase import create_client
+            from config.config import SUPABASE_URL, SUPABASE_KEY
+            from streaming.buffered_writer import supabase_bulk_insert
+            client = supabase_bulk_insert(create_client(SUPABASE_URL, SUPABASE_KEY))
+        replayer = OutboxReplayer(outbox, client, batch_size=args.batch_size, rows_per_second=args.rate)
+        started = time.perf_counter()
+        delivered = replayer.drain()
+        print(f"{name}: replayed {delivered} records in {time.perf_counter() - started:.1f}s",
+              replayer.get_stats())
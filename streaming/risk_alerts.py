@@ -0,0 +1,138 @@
+"""
+Risk Alerts
+Scores records once, as they are ingested, and writes risk_alerts rows.
+
+A RiskAlertStage sits in front of a stream's bulk insert: every flushed batch is
+scored with a single model call before it is written. Each entity (machine or
+supplier) then goes through a hysteresis filter so an alert is only emitted
+when its state actually changes:
+
+- per-record scores are smoothed per entity with an exponential moving average
+  (``smoothing`` is the weight of the newest record), so one outlier reading
+  does not change the state on its own;
+- the alert raises when the risk score reaches ``raise_at`` and clears only once
+  it drops to ``clear_at``, so a score hovering around one threshold does not
+  flap between states;
+- while the state is unchanged, a new row is written only if the score moved by
+  at least ``min_delta`` or ``refresh_seconds`` passed since the last row, which
+  keeps the latest score per entity fresh without repeating identical alerts.
+
+Alert rows match the risk_alerts table: risk_score is a 0-1 probability and
+risk_label is 1 while the alert is raised.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+ALERT_KINDS = {
+    'production_data': ('production', 'machine_id'),
+    'supplier_data': ('supplier', 'supplier_id'),
+}
+
+
+class RiskAlertStage:
+    """Scores ingested batches and forwards deduplicated alerts to a writer.
+
+    Args:
+        alert_writer: BufferedWriter (or anything with ``put``) for the risk_alerts table;
+            None to only return the alerts from ``process``
+        scorer: object with ``score_many(kind, frames)``; defaults to the shared model_manager
+        raise_at: score (0-1) at which an entity's alert is raised
+        clear_at: score (0-1) at or below which a raised alert clears
+        min_delta: score change that is worth a new row while the state is unchanged
+        refresh_seconds: re-emit the current state at least this often per entity
+        smoothing: EWMA weight (0-1] of each new score; 1 disables smoothing
+    """
+
+    def __init__(self, alert_writer, scorer=None, raise_at=0.6, clear_at=0.4,
+                 min_delta=0.25, refresh_seconds=300.0, smoothing=0.2):
+        if clear_at > raise_at:
+            raise ValueError("clear_at must not be above raise_at")
+        if scorer is None:
+            from model_inference import model_manager as scorer
+        self.alert_writer = alert_writer
+        self.scorer = scorer
+        self.raise_at = raise_at
+        self.clear_at = clear_at
+        self.min_delta = min_delta
+        self.refresh_seconds = refresh_seconds
+        self.smoothing = smoothing
+        self._smoothed = {}   # (risk_type, entity_id) -> smoothed score
+        self._state = {}      # (risk_type, entity_id) -> (label, last_emitted_score, emitted_at)
+        self._lock = threading.Lock()
+        self.scored = 0
+        self.emitted = 0
+        self.suppressed = 0
+
+    def wrap(self, insert_batch):
+        """insert_batch callable that scores each batch before inserting it."""
+        def scored_insert(table, records):
+            try:
+                self.process(table, records)
+            except Exception as e:
+                print(f"Risk scoring error: {e}. {len(records)} {table} records not scored.")
+            insert_batch(table, records)
+        return scored_insert
+
+    def process(self, table, records):
+        """Score a batch of ``table`` records and queue the alerts it produces."""
+        if table not in ALERT_KINDS or not records:
+            return []
+        risk_type, entity_col = ALERT_KINDS[table]
+        df = pd.DataFrame(records)
+        scores = self.scorer.score_many(risk_type, [df])[0]['rows']['risk_probability'] / 100
+        self.scored += len(df)
+
+        alerts = []
+        now = time.monotonic()
+        with self._lock:
+            for entity_id, timestamp, score in zip(df[entity_col], df['timestamp'], scores):
+                alert = self._update(risk_type, entity_id, float(score), now)
+                if alert is None:
+                    self.suppressed += 1
+                    continue
+                alert['timestamp'] = timestamp or datetime.now(timezone.utc).isoformat()
+                alerts.append(alert)
+        if self.alert_writer is not None:
+            for alert in alerts:
+                self.alert_writer.put(alert)
+        self.emitted += len(alerts)
+        return alerts
+
+    def _update(self, risk_type, entity_id, score, now):
+        """Smooth one score and apply hysteresis; return the alert row to write, or None."""
+        key = (risk_type, entity_id)
+        if key in self._smoothed:
+            score = self.smoothing * score + (1 - self.smoothing) * self._smoothed[key]
+        self._smoothed[key] = score
+        previous = self._state.get(key)
+        if previous is None:
+            label = int(score >= self.raise_at)
+        else:
+            label = previous[0]
+            if label == 0 and score >= self.raise_at:
+                label = 1
+            elif label == 1 and score <= self.clear_at:
+                label = 0
+            elif (abs(score - previous[1]) < self.min_delta
+                    and now - previous[2] < self.refresh_seconds):
+                return None
+        self._state[key] = (label, score, now)
+        return {
+            'risk_type': risk_type,
+            'entity_id': entity_id,
+            'risk_score': round(score, 4),
+            'risk_label': label,
+        }
+
+    def get_stats(self):
+        with self._lock:
+            raised = sum(1 for label, _, _ in self._state.values() if label)
+        return {
+            'records_scored': self.scored,
+            'alerts_written': self.emitted,
+            'alerts_suppressed': self.suppressed,
+            'entities_raised': raised,
+        }
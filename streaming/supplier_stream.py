@@ -8,9 +8,13 @@ import os
 # Import mock manager
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 try:
-    from mock_db_manager import save_mock_record
+    from mock_db_manager import save_mock_records
 except ImportError:
-    def save_mock_record(*args): pass
+    def save_mock_records(*args): pass
+from streaming.buffered_writer import BufferedWriter, supabase_bulk_insert
+from streaming.outbox import Outbox, OutboxReplayer, spool_failures
+from streaming.risk_alerts import RiskAlertStage
+from history_store import with_history
 
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
@@ -18,8 +22,8 @@ suppliers = ["S1", "S2", "S3"]
 materials = ["Cotton", "Yarn", "Dyes"]
 status_options = ["In Transit", "delayed", "Delivered"]
 
-def generate_supplier_record():
-    supplier = random.choice(suppliers)
+def generate_supplier_record(supplier=None):
+    supplier = supplier or random.choice(suppliers)
     material = random.choice(materials)
     expected_date = datetime.utcnow() + timedelta(days=random.randint(2, 10))
     actual_date = expected_date + timedelta(days=random.randint(-1, 5))
@@ -40,25 +44,59 @@ def generate_supplier_record():
         "transportation_status": status
     }
 
-def start_streaming(interval_seconds: int = 8):
+def start_streaming(interval_seconds: float = 8, batch_size: int = 50,
+                    flush_interval: float = 5.0, max_queue: int = 1000, stats_every: int = 12,
+                    score_alerts: bool = True):
+    """Generate records forever and write them through a BufferedWriter.
+
+    Records are grouped into bulk inserts of up to ``batch_size`` rows or every
+    ``flush_interval`` seconds. Failed batches are queued in a durable outbox
+    that a background replayer delivers once Supabase is reachable again, and
+    saved to the local mock DB for display; either way every record is also
+    archived in the Parquet history store.
+    With ``score_alerts`` every batch is scored once before it is written and
+    state changes are recorded in the risk_alerts table.
+    """
     print("Streaming supplier data to Supabase... (press Ctrl+C to stop)\n")
-    while True:
-        try:
+    outbox = Outbox("supplier_stream")
+    on_failure = spool_failures(outbox, also=save_mock_records)
+    # Replayed batches skip with_history: they were archived via the mock store
+    replayer = OutboxReplayer(outbox, supabase_bulk_insert(supabase)).start()
+    insert_batch = with_history(supabase_bulk_insert(supabase))
+    alert_writer = alerts = None
+    if score_alerts:
+        alert_writer = BufferedWriter("risk_alerts", insert_batch, on_failure=on_failure,
+                                      batch_size=batch_size, flush_interval=flush_interval,
+                                      max_queue=max_queue)
+        alerts = RiskAlertStage(alert_writer)
+        insert_batch = alerts.wrap(insert_batch)
+    writer = BufferedWriter("supplier_data", insert_batch,
+                            on_failure=on_failure, batch_size=batch_size,
+                            flush_interval=flush_interval, max_queue=max_queue)
+    generated = 0
+    try:
+        while True:
             record = generate_supplier_record()
-            supabase.table("supplier_data").insert(record).execute()
-            print("Inserted:", record)
-            time.sleep(interval_seconds)
-        except KeyboardInterrupt:
-            print("\nStopped supplier stream by user.")
-            break
-        except Exception as e:
-            print(f"Supabase Error: {e}. Saving to local mock DB...")
-            try:
-                save_mock_record("supplier_data", record)
-                print("Saved to local mock DB instead.")
-            except Exception as le:
-                print(f"Local save error: {le}")
+            writer.put(record)
+            generated += 1
+            print("Queued:", record)
+            if generated % stats_every == 0:
+                print("Writer stats:", writer.get_stats())
+                print("Outbox stats:", replayer.get_stats())
+                if alerts is not None:
+                    print("Alert stats:", alerts.get_stats())
             time.sleep(interval_seconds)
+    except KeyboardInterrupt:
+        print("\nStopped supplier stream by user.")
+    finally:
+        writer.close()
+        print("Writer stats:", writer.get_stats())
+        if alert_writer is not None:
+            alert_writer.close()
+            print("Alert stats:", alerts.get_stats())
+        replayer.stop()
+        outbox.close()
+        print("Outbox stats:", replayer.get_stats())
 
 if __name__ == '__main__':
     start_streaming()